@@ -0,0 +1,420 @@
+"""Benchmark every route in core/urls.py through the DRF test client.
+
+Seeds a throwaway database with a parameterized dataset, then records per endpoint the p50/p95 latency,
+the number of SQL queries and the peak memory allocated while handling one request. Results are written
+as JSON; given a baseline written by an earlier run, regressions are reported and the exit status is 1.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.endpoints --output baseline.json
+    python -m benchmarks.endpoints --baseline baseline.json --output current.json
+"""
+import argparse
+import itertools
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.common import BACKEND_DIR, setup_django
+
+PASSWORD = "benchmark-password"
+
+
+# One request to benchmark: a route with fixed URL arguments and body, or make(i) returning (args, data) for
+# request i. make runs untimed before every request, so write endpoints get fresh objects to create, change
+# or delete.
+class Case:
+    def __init__(self, name, method, route, args=(), data=None, query="", make=None, expected=200):
+        self.name = name
+        self.method = method
+        self.route = route
+        self.args = args
+        self.data = data
+        self.query = query
+        self.make = make
+        self.expected = expected
+        self.headers = {}
+
+    def prepare(self, i):
+        from django.urls import reverse
+
+        args, data = self.make(i) if self.make else (self.args, self.data)
+        return reverse(self.route, args=args) + self.query, data
+
+
+def seed(users, books_per_user, follows_per_user, rng):
+    from django.contrib.auth.models import User
+    from django.db import transaction
+    from core import feed
+    from core.models import (Activity, Book, Comment, Following, LibraryVersion, ReadingProgress, Review,
+                             Shelf)
+
+    with transaction.atomic():
+        User.objects.bulk_create([User(username=f"bench{i}") for i in range(users)])
+        people = list(User.objects.order_by("id"))
+        people[0].set_password(PASSWORD)
+        people[0].save()
+        LibraryVersion.objects.bulk_create([LibraryVersion(user=user) for user in people], ignore_conflicts=True)
+
+        Shelf.objects.bulk_create([Shelf(user=user, title=f"Shelf {i}") for user in people for i in range(5)])
+        shelves = {}
+        for shelf in Shelf.objects.all():
+            shelves.setdefault(shelf.user_id, []).append(shelf)
+        Book.objects.bulk_create(
+            [
+                Book(
+                    user=user,
+                    isbn=f"978{user.id:05d}{i:05d}",
+                    title=f"Book {i} of {user.username}",
+                    author=f"Author {rng.randint(1, 500)}",
+                    total_pages=rng.randint(80, 900),
+                    release_year=rng.randint(1900, 2024),
+                    shelf=rng.choice(shelves[user.id]),
+                )
+                for user in people
+                for i in range(books_per_user)
+            ]
+        )
+        books = list(Book.objects.select_related("user"))
+        # Half of the books get reading progress and a quarter a shared review; the rest stay free for creates.
+        ReadingProgress.objects.bulk_create(
+            [ReadingProgress(book=book, status="R", current_page=10, shared=True) for book in books[::2]]
+        )
+        Review.objects.bulk_create([Review(book=book, text="A review.", shared=True) for book in books[::4]])
+        reviews = list(Review.objects.select_related("book"))
+        Comment.objects.bulk_create(
+            [Comment(user=rng.choice(people), book=review.book, review=review, text="A comment.") for review in reviews]
+        )
+
+        for user in people:
+            following = Following.objects.create(user=user)
+            # Everyone leaves at least one other user unfollowed, so the follow cases have someone to follow.
+            others = [other for other in people if other != user]
+            following.followed_users.add(*rng.sample(others, max(0, min(follows_per_user, len(others) - 1))))
+        Activity.objects.bulk_create(
+            [
+                Activity(user=book.user, book=book, text=f"{book.user} added {book.title}", backlink="/books")
+                for book in books[::3]
+            ]
+        )
+        for user in people:
+            feed.rebuild(user)
+    return people
+
+
+def build_cases(user):
+    from django.contrib.auth.models import User
+    from django.core.cache import caches
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from core.models import Book, Comment, Following, ImageAsset, ImportJob, ReadingProgress, Review, Shelf
+    from core.openlibrary import search_cache
+
+    counter = itertools.count()
+    books = Book.objects.filter(user=user)
+    book = books.filter(reading_progress__isnull=False, review__isnull=False).first()
+    review = book.review
+    comment = Comment.objects.filter(review=review).first()
+    shelf = Shelf.objects.filter(user=user).first()
+    asset = ImageAsset.objects.create(book=book, file=SimpleUploadedFile("cover.jpg", b"image"))
+    import_job = ImportJob.objects.create(user=user, format="csv")
+    strangers = User.objects.exclude(pk=user.pk).exclude(followers__user=user)
+    not_followed = strangers.values_list("username", flat=True)[0]
+
+    # Open Library searches are answered from the primed result cache; nothing goes over the network.
+    caches["openlibrary"].clear()
+    isbns = list(books.values_list("isbn", flat=True)[:50])
+    for isbn in isbns:
+        search_cache.set({"isbn": isbn}, [{"isbn": isbn, "title": "Cached", "author": "Someone"}])
+    search_cache.set({"title": "cached"}, [{"title": "Cached", "author": "Someone"}])
+
+    def new_book(**fields):
+        i = next(counter)
+        return Book.objects.create(user=user, isbn=f"979{i:010d}", title=f"Benchmark {i}", author="Someone", **fields)
+
+    def follow(i):
+        Following.objects.get(user=user).followed_users.remove(User.objects.get(username=not_followed))
+        return [not_followed], None
+
+    def unfollow(i):
+        Following.objects.get(user=user).followed_users.add(User.objects.get(username=not_followed))
+        return [not_followed], None
+
+    def csv_upload(i):
+        content = "title,author,isbn\n" + "".join(f"Import {i}-{n},Someone,\n" for n in range(10))
+        return (), {"file": SimpleUploadedFile("books.csv", content.encode())}
+
+    def image_upload(i):
+        return (), {"file": SimpleUploadedFile("cover.jpg", b"image"), "book": new_book().id}
+
+    def new_comment():
+        return Comment.objects.create(user=user, book=book, review=review, text="Gone")
+
+    progress = book.reading_progress
+    return [
+        Case("login", "post", "token_obtain_pair", data={"username": user.username, "password": PASSWORD}),
+        Case("signup", "post", "register_user", make=lambda i: ((), {"username": f"new{i}", "password": PASSWORD}),
+             expected=201),
+        Case("books list", "get", "book-list-create"),
+        Case("books list, search", "get", "book-list-create", query="?search=book"),
+        Case("books list, sparse fields", "get", "book-list-create", query="?fields=id,title,author,image"),
+        Case("books create", "post", "book-list-create", expected=201,
+             make=lambda i: ((), {"isbn": f"977{i:010d}", "title": "New", "author": "Someone"})),
+        Case("book detail", "get", "book-detail", args=[book.id]),
+        Case("book update", "patch", "book-detail", args=[book.id], data={"title": book.title}),
+        Case("book delete", "delete", "book-detail", make=lambda i: ([new_book().id], None), expected=204),
+        Case("book search", "get", "book-search", query=f"?isbn={isbns[0]}"),
+        Case("book search, async", "get", "book-search-async", query="?title=cached"),
+        Case("book search, batch of 50", "post", "book-search-batch", data={"isbns": isbns}),
+        Case("shelves list", "get", "shelf-list-create"),
+        Case("shelves list, sparse fields", "get", "shelf-list-create", query="?fields=id,title,books.id,books.title"),
+        Case("shelves create", "post", "shelf-list-create", data={"title": "New shelf"}, expected=201),
+        Case("shelf detail", "get", "shelf-detail", args=[shelf.id]),
+        Case("shelf update", "patch", "shelf-detail", args=[shelf.id], data={"title": shelf.title}),
+        Case("shelf delete", "delete", "shelf-detail", expected=204,
+             make=lambda i: ([Shelf.objects.create(user=user, title="Gone").id], None)),
+        Case("users list", "get", "user-list"),
+        Case("users list, followed", "get", "user-list", query="?relationship=followed"),
+        Case("user name", "get", "user-name"),
+        Case("follow", "post", "user-follow", make=follow),
+        Case("unfollow", "delete", "user-follow", make=unfollow),
+        Case("reading list", "get", "reading-list-create"),
+        Case("reading create", "post", "reading-list-create", expected=201,
+             make=lambda i: ((), {"book": new_book().id, "status": "R"})),
+        Case("reading detail", "get", "reading-detail", args=[progress.id]),
+        Case("reading update", "patch", "reading-detail", args=[progress.id], data={"current_page": 20}),
+        Case("reading delete", "delete", "reading-detail", expected=204,
+             make=lambda i: ([ReadingProgress.objects.create(book=new_book(), status="R").id], None)),
+        Case("reading history", "get", "reading-history", args=[book.id]),
+        Case("reading stats", "get", "reading-stats"),
+        Case("library export, jsonl", "get", "library-export", args=["jsonl"]),
+        Case("library export, csv", "get", "library-export", args=["csv"]),
+        Case("reviews list", "get", "review-list-create"),
+        Case("reviews create", "post", "review-list-create", expected=201,
+             make=lambda i: ((), {"book": new_book().id, "text": "New review"})),
+        Case("review detail", "get", "review-detail", args=[review.id]),
+        Case("review update", "patch", "review-detail", args=[review.id], data={"text": review.text}),
+        Case("review delete", "delete", "review-detail", expected=204,
+             make=lambda i: ([Review.objects.create(book=new_book(), text="Gone").id], None)),
+        Case("comments list", "get", "comment-list-create", args=[review.id]),
+        Case("comments create", "post", "comment-list-create", args=[review.id], expected=201,
+             data={"book": book.id, "review": review.id, "text": "New comment"}),
+        Case("comment detail", "get", "comment-detail", args=[review.id, comment.id]),
+        Case("comment update", "patch", "comment-detail", args=[review.id, comment.id], data={"text": comment.text}),
+        Case("comment delete", "delete", "comment-detail", make=lambda i: ([review.id, new_comment().id], None),
+             expected=204),
+        Case("uploads list", "get", "upload"),
+        Case("upload create", "post", "upload", make=image_upload, expected=201),
+        Case("upload detail", "get", "upload-detail", args=[asset.id]),
+        Case("activities", "get", "activity-list"),
+        Case("imports list", "get", "import-list-create"),
+        Case("imports create", "post", "import-list-create", make=csv_upload, expected=202),
+        Case("import detail", "get", "import-detail", args=[import_job.id]),
+    ]
+
+
+def add_not_modified_cases(client, cases):
+    # Conditional requests revalidating a cached list, answered with 304 Not Modified.
+    from django.urls import reverse
+
+    def revalidate(case):
+        def make(i):
+            # Fetch the current ETag untimed, as the browser would have it cached.
+            case.headers["HTTP_IF_NONE_MATCH"] = client.get(reverse(case.route))["ETag"]
+            return (), None
+
+        return make
+
+    for name, route in (("books list", "book-list-create"), ("activities", "activity-list")):
+        case = Case(f"{name}, not modified", "get", route, expected=304)
+        case.make = revalidate(case)
+        cases.append(case)
+
+
+def request(client, case, i):
+    path, data = case.prepare(i)
+    multipart = isinstance(data, dict) and any(hasattr(value, "read") for value in data.values())
+    kwargs = {"format": "multipart" if multipart else "json"} if data is not None else {}
+
+    def send():
+        response = getattr(client, case.method)(path, data, **kwargs, **case.headers)
+        if response.streaming:
+            b"".join(response.streaming_content)  # Producing a streamed body is part of the request.
+        return response
+
+    return send
+
+
+def run_case(client, case, repeat, warmup):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    for i in range(warmup):
+        request(client, case, i)()
+
+    timings, queries = [], []
+    for i in range(warmup, warmup + repeat):
+        send = request(client, case, i)
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = send()
+            timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code != case.expected:
+            raise RuntimeError(
+                f"{case.name}: expected {case.expected}, got {response.status_code}: {response.getvalue()[:200]!r}"
+            )
+        queries.append(len(captured))
+
+    # Memory is measured on separate requests, since tracing allocations slows everything down.
+    peaks = []
+    for i in range(warmup + repeat, warmup + repeat + 3):
+        send = request(client, case, i)
+        tracemalloc.start()
+        send()
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "route": case.route,
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "queries": max(queries),
+        "peak_kib": round(statistics.median(peaks) / 1024, 1),
+    }
+
+
+def check_coverage(cases):
+    # Fail loudly when a route was added to core/urls.py without a benchmark.
+    from core.urls import urlpatterns
+
+    missing = {pattern.name for pattern in urlpatterns} - {case.route for case in cases}
+    if missing:
+        raise SystemExit(f"No benchmark for routes: {', '.join(sorted(missing))}")
+
+
+def compare(results, baseline, threshold):
+    # Print the change of every metric against the baseline and return the regressed endpoints.
+    regressions = []
+    print(f"\n{'endpoint':<30}{'p50 ms':>16}{'p95 ms':>16}{'queries':>12}{'peak KiB':>18}")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"{name:<30}{'(new)':>16}")
+            continue
+
+        def change(metric):
+            before, after = previous[metric], current[metric]
+            return f"{after:.1f} ({(after - before) / before * 100 if before else 0:+.0f}%)"
+
+        slower = current["p95_ms"] > previous["p95_ms"] * (1 + threshold) and current["p95_ms"] - previous["p95_ms"] > 1
+        more_queries = current["queries"] > previous["queries"]
+        more_memory = (
+            current["peak_kib"] > previous["peak_kib"] * (1 + threshold)
+            and current["peak_kib"] - previous["peak_kib"] > 64
+        )
+        flag = "  REGRESSION" if slower or more_queries or more_memory else ""
+        if flag:
+            regressions.append(name)
+        queries = f"{previous['queries']}->{current['queries']}"
+        print(f"{name:<30}{change('p50_ms'):>16}{change('p95_ms'):>16}{queries:>12}{change('peak_kib'):>18}{flag}")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--books-per-user", type=int, default=200)
+    parser.add_argument("--follows-per-user", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--only", nargs="*", help="Only run endpoints whose name contains one of these strings.")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", type=Path, help="Compare against results written by an earlier run.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown reported as a regression.")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if args.users < 2:
+        parser.error("--users must be at least 2, so there is a user to follow")
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(Path(directory) / "bench.sqlite3")
+        import django
+        from django.conf import settings
+        from rest_framework.test import APIClient
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        settings.DEBUG = False
+        settings.ALLOWED_HOSTS = ["testserver"]
+        settings.MEDIA_ROOT = str(Path(directory) / "media")
+        settings.PRIVATE_MEDIA_ROOT = str(Path(directory) / "private_media")
+
+        print(f"Seeding {args.users} users with {args.books_per_user} books each...")
+        people = seed(args.users, args.books_per_user, args.follows_per_user, random.Random(args.seed))
+        user = people[0]
+
+        # Authenticate like the frontend does, so token validation is part of every request.
+        client = APIClient()
+        client.cookies["access_token"] = str(RefreshToken.for_user(user).access_token)
+
+        cases = build_cases(user)
+        check_coverage(cases)
+        add_not_modified_cases(client, cases)
+        if args.only:
+            cases = [case for case in cases if any(part in case.name for part in args.only)]
+
+        results = {}
+        print(f"{'endpoint':<30}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}{'peak KiB':>10}")
+        for case in cases:
+            result = results[case.name] = run_case(client, case, args.repeat, args.warmup)
+            print(
+                f"{case.name:<30}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+                f"{result['queries']:>9}{result['peak_kib']:>10.1f}"
+            )
+
+        output = {
+            "meta": {
+                "revision": git_revision(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "dataset": {
+                    "users": args.users,
+                    "books_per_user": args.books_per_user,
+                    "follows_per_user": args.follows_per_user,
+                    "seed": args.seed,
+                },
+                "repeat": args.repeat,
+            },
+            "results": results,
+        }
+        if args.output:
+            args.output.write_text(json.dumps(output, indent=2) + "\n")
+            print(f"\nWrote {args.output}")
+
+        if args.baseline:
+            baseline = json.loads(args.baseline.read_text())
+            if baseline["meta"]["dataset"] != output["meta"]["dataset"]:
+                print("Warning: the baseline was recorded with a different dataset", file=sys.stderr)
+            regressions = compare(results, baseline["results"], args.threshold)
+            if regressions:
+                print(f"\n{len(regressions)} regressions: {', '.join(regressions)}")
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
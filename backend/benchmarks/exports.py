@@ -0,0 +1,46 @@
+"""Check that streaming a library export keeps memory flat as libraries grow.
+
+Seeds one library per size (with shelves, reading progress and reviews), then streams its JSON Lines and CSV
+exports chunk by chunk, as the export endpoint does, recording the time and the peak memory allocated.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.exports --books 100 1000 10000 100000
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.common import setup_django
+from benchmarks.renderers import seed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, nargs="+", default=[100, 1000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(Path(directory) / "bench.sqlite3")
+        from django.conf import settings
+        from core.exports import FORMATS, LibraryExporter
+
+        settings.DEBUG = False  # Otherwise every query is kept in connection.queries.
+
+        print(f"{'books':>8}{'format':>8}{'MiB':>10}{'seconds':>10}{'peak KiB':>10}")
+        for books in args.books:
+            user = seed(books, shelves=max(1, books // 100), username=f"bench{books}")
+            for file_format in FORMATS:
+                tracemalloc.start()
+                start = time.perf_counter()
+                size = sum(len(chunk) for chunk in LibraryExporter(user).chunks(file_format))
+                elapsed = time.perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f"{books:>8}{file_format:>8}{size / 2**20:>10.1f}{elapsed:>10.2f}{peak / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Compare response encodings and compressions on large library payloads.
+
+Seeds one library (5,000 books on 50 shelves by default, with reading progress and reviews) and measures:
+
+* encoding: rendering the serialized books/ and shelves/ payloads of the whole library with DRF's stock
+  JSONRenderer, the orjson renderer and the MessagePack renderer, each uncompressed, gzipped and brotli
+  compressed (time and bytes);
+* requests: GET books/?limit=200 and shelves/ (all books nested) through the full middleware stack per
+  Accept / Accept-Encoding combination.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.renderers --books 5000
+"""
+import argparse
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import measure, setup_django
+
+ACCEPTS = {"json": "application/json", "msgpack": "application/msgpack"}
+ENCODINGS = ("identity", "gzip", "br")
+
+
+def seed(books, shelves, username="bench"):
+    from django.contrib.auth.models import User
+    from core.models import Book, ReadingProgress, Review, Shelf
+
+    user = User.objects.create_user(username=username, password="benchmark-password")
+    shelf_ids = [shelf.id for shelf in Shelf.objects.bulk_create(
+        [Shelf(user=user, title=f"Shelf {number}", description="Books to read next") for number in range(shelves)]
+    )]
+    created = Book.objects.bulk_create([
+        Book(user=user, isbn=f"978{number:010d}", title=f"A moderately long book title {number}",
+             author=f"Author {number % 700}", total_pages=200 + number % 500, release_year=1950 + number % 75,
+             shelf_id=shelf_ids[number % shelves])
+        for number in range(books)
+    ])
+    ReadingProgress.objects.bulk_create(
+        [ReadingProgress(book=book, status="R", current_page=book.id % 200, shared=True) for book in created]
+    )
+    Review.objects.bulk_create(
+        [Review(book=book, text="An enjoyable read with a slow start. " * 3, shared=True) for book in created[::3]]
+    )
+    return user
+
+
+def encoding_results(payloads, repeat):
+    from rest_framework.renderers import JSONRenderer
+    from core.compression import COMPRESSORS, DEFAULT_COMPRESSION_SETTINGS
+    from core.renderers import MessagePackRenderer, ORJSONRenderer
+
+    renderers = {"json (stock)": JSONRenderer(), "json (orjson)": ORJSONRenderer(), "msgpack": MessagePackRenderer()}
+    print(f"{'payload':<10}{'renderer':<16}{'encoding':<10}{'KiB':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for payload_name, data in payloads.items():
+        for renderer_name, renderer in renderers.items():
+            for encoding in ENCODINGS:
+                compress = COMPRESSORS.get(encoding, lambda content, config: content)
+
+                def run():
+                    return compress(renderer.render(data), DEFAULT_COMPRESSION_SETTINGS)
+
+                size = len(run())
+                result = measure(run, repeat=repeat, warmup=1)
+                print(
+                    f"{payload_name:<10}{renderer_name:<16}{encoding:<10}{size / 1024:>10.1f}"
+                    f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+                )
+
+
+def request_results(client, urls, repeat):
+    print(f"\n{'request':<22}{'accept':<10}{'encoding':<10}{'KiB':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, url in urls.items():
+        for accept_name, accept in ACCEPTS.items():
+            for encoding in ENCODINGS:
+                headers = {"HTTP_ACCEPT": accept, "HTTP_ACCEPT_ENCODING": encoding}
+                size = len(client.get(url, **headers).content)
+                result = measure(lambda: client.get(url, **headers), repeat=repeat, warmup=1)
+                print(
+                    f"{name:<22}{accept_name:<10}{encoding:<10}{size / 1024:>10.1f}"
+                    f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=5000)
+    parser.add_argument("--shelves", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(Path(directory) / "bench.sqlite3")
+        from django.conf import settings
+        from rest_framework.test import APIClient, APIRequestFactory
+        from rest_framework.request import Request
+        from core.models import Book, Shelf
+        from core.serializers import BookSerializer, ShelfSerializer
+
+        settings.DEBUG = False
+        settings.ALLOWED_HOSTS = ["testserver"]
+
+        print(f"Seeding {args.books} books on {args.shelves} shelves...")
+        user = seed(args.books, args.shelves)
+
+        request = Request(APIRequestFactory().get("/"))
+        request.user = user
+        context = {"request": request}
+        payloads = {
+            "books": BookSerializer(Book.objects.for_user(user).with_related(), many=True, context=context).data,
+            "shelves": ShelfSerializer(Shelf.objects.for_user(user).with_books(), many=True, context=context).data,
+        }
+        encoding_results(payloads, args.repeat)
+
+        client = APIClient()
+        client.force_authenticate(user)
+        urls = {"books/?limit=200": "/api/books/?limit=200", "shelves/": "/api/shelves/?limit=200"}
+        request_results(client, urls, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
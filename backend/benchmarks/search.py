@@ -0,0 +1,82 @@
+"""Compare the FTS5 book search with the LIKE scan it replaced.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.search --books 1000000
+"""
+import argparse
+import itertools
+import random
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import measure, setup_django
+
+SYLLABLES = "ka lo mi ra sen tor vel dra gon sha dow riv er gar den win ter em pire sil ent king dom".split()
+QUERIES = ("dragon", "kalo", "tor", "author:riv", "author:sen year:1984", "9780000012")
+
+
+def seed(books, users, batch_size=50_000):
+    from django.contrib.auth.models import User
+    from django.db import connection, transaction
+
+    rng = random.Random(42)
+    # Pseudo-words drawn with a Zipf-like skew, so some title words are common and most are rare.
+    vocabulary = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3))) for _ in range(20_000)]
+    vocabulary[:1] = ["dragon"]
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    surnames = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))) for _ in range(5_000)]
+
+    User.objects.bulk_create([User(username=f"bench{i}") for i in range(users)])
+    user_ids = list(User.objects.values_list("id", flat=True))
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, books, batch_size):
+            rows = []
+            for i in range(start, min(start + batch_size, books)):
+                title = " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(1, 5))).title()
+                author = f"{rng.choice(vocabulary).title()} {rng.choice(surnames).title()}"
+                rows.append((user_ids[i % users], f"978{i:010d}", title, author, rng.randint(80, 900), rng.randint(1900, 2024), i))
+            cursor.executemany(
+                "INSERT INTO core_book (user_id, isbn, title, author, total_pages, release_year, version) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                rows,
+            )
+    return user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(Path(directory) / "bench.sqlite3")
+        from django.contrib.auth.models import User
+        from core.models import Book
+        from core.search import LikeSearchBackend, SqliteSearchBackend
+
+        print(f"Seeding {args.books} books for {args.users} users...")
+        user_ids = seed(args.books, args.users)
+        backends = {"like": LikeSearchBackend(), "fts5": SqliteSearchBackend()}
+
+        # "library" returns every match within one user's library (what BookListView does),
+        # "global" returns the first 50 matches across all books.
+        print(f"{'query':<24}{'scope':<10}{'backend':<8}{'rows':>8}{'p50 ms':>10}{'p95 ms':>10}")
+        for query in QUERIES:
+            for scope in ("library", "global"):
+                for name, backend in backends.items():
+                    if scope == "library":
+                        user = User.objects.get(pk=user_ids[0])
+                        run = lambda: len(backend.search(Book.objects.filter(user=user), query, user=user))
+                    else:
+                        run = lambda: len(backend.search(Book.objects.all(), query)[:50])
+
+                    rows = run()
+                    result = measure(run, repeat=args.repeat)
+                    print(f"{query:<24}{scope:<10}{name:<8}{rows:>8}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Compare read/write throughput of the default and production SQLite profiles under concurrency.
+
+Every client is a thread with its own connection running a mix of library reads and small write
+transactions, and opening/closing its connection around each operation like a request would.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.sqlite_profile --clients 1 8 32 --seconds 5
+"""
+import argparse
+import random
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmarks.common import setup_django
+
+PROFILES = {
+    "default": {"SQLITE_PROFILE": "default", "CONN_MAX_AGE": 0, "OPTIONS": {}},
+    "production": {"SQLITE_PROFILE": "production", "CONN_MAX_AGE": 600, "OPTIONS": {"timeout": 5}},
+}
+
+
+def seed(users, books_per_user):
+    from django.contrib.auth.models import User
+    from django.db import transaction
+    from core.models import Book, LibraryVersion
+
+    with transaction.atomic():
+        User.objects.bulk_create([User(username=f"bench{i}") for i in range(users)])
+        user_ids = list(User.objects.values_list("id", flat=True))
+        LibraryVersion.objects.bulk_create([LibraryVersion(user_id=user_id) for user_id in user_ids])
+        Book.objects.bulk_create(
+            [
+                Book(user_id=user_id, isbn=f"978{user_id:05d}{i:05d}", title=f"Book {i}", author="Someone")
+                for user_id in user_ids
+                for i in range(books_per_user)
+            ]
+        )
+    return user_ids
+
+
+def client(user_ids, write_ratio, deadline, counts, lock, seed_value):
+    from django.db import OperationalError, close_old_connections, transaction
+    from core.models import Book, Shelf
+
+    rng = random.Random(seed_value)
+    reads = writes = errors = 0
+    while time.perf_counter() < deadline:
+        user_id = rng.choice(user_ids)
+        try:
+            if rng.random() < write_ratio:
+                with transaction.atomic():
+                    Shelf.objects.create(user_id=user_id, title="Shelf")  # Also bumps the library version.
+                writes += 1
+            else:
+                len(Book.objects.filter(user_id=user_id).select_related("shelf").order_by("id")[:50])
+                reads += 1
+        except OperationalError:
+            errors += 1  # "database is locked"
+        finally:
+            close_old_connections()  # What request_finished does after every request.
+    close_old_connections()
+    with lock:
+        counts["reads"] += reads
+        counts["writes"] += writes
+        counts["errors"] += errors
+
+
+def run(profile, clients, seconds, user_ids, write_ratio):
+    from django.conf import settings
+    from django.db import connections
+
+    connections.close_all()
+    settings.SQLITE_PROFILE = profile["SQLITE_PROFILE"]
+    settings.DATABASES["default"]["CONN_MAX_AGE"] = profile["CONN_MAX_AGE"]
+    settings.DATABASES["default"]["OPTIONS"] = profile["OPTIONS"]
+
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    threads = [
+        threading.Thread(target=client, args=(user_ids, write_ratio, deadline, counts, lock, i)) for i in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {name: count / seconds for name, count in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--books-per-user", type=int, default=100)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        seeded = Path(directory) / "seeded.sqlite3"
+        setup_django(seeded)
+        from django.conf import settings
+        from django.db import connections
+
+        print(f"Seeding {args.users} users with {args.books_per_user} books each...")
+        user_ids = seed(args.users, args.books_per_user)
+        connections.close_all()
+
+        print(f"{'profile':<12}{'clients':>8}{'reads/s':>12}{'writes/s':>12}{'locked/s':>12}")
+        for name, profile in PROFILES.items():
+            for clients in args.clients:
+                # Every run starts from a fresh copy, since WAL mode is persisted in the database file.
+                database = Path(directory) / f"{name}-{clients}.sqlite3"
+                shutil.copy(seeded, database)
+                settings.DATABASES["default"]["NAME"] = str(database)
+                result = run(profile, clients, args.seconds, user_ids, args.write_ratio)
+                print(
+                    f"{name:<12}{clients:>8}{result['reads']:>12.0f}{result['writes']:>12.0f}{result['errors']:>12.1f}"
+                )
+                connections.close_all()
+
+
+if __name__ == "__main__":
+    main()
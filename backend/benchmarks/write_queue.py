@@ -0,0 +1,94 @@
+"""Compare write throughput of concurrent threads writing directly with writes funnelled through the write queue.
+
+Both modes use the production SQLite profile (WAL, busy timeout). Every write is a small transaction like a
+reading progress update: one row written plus the library version bump from the signals. With --synchronous
+FULL every commit is synced to disk, which is where committing many writes together pays off most.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.write_queue --clients 1 8 32 --seconds 5
+"""
+import argparse
+import random
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmarks.common import setup_django
+from benchmarks.sqlite_profile import seed
+
+
+def client(run_write, user_ids, deadline, counts, lock, seed_value):
+    from django.db import OperationalError, close_old_connections
+    from core.models import Shelf
+
+    rng = random.Random(seed_value)
+    writes = errors = 0
+    while time.perf_counter() < deadline:
+        try:
+            run_write(Shelf.objects.create, user_id=rng.choice(user_ids), title="Shelf")
+            writes += 1
+        except OperationalError:
+            errors += 1  # "database is locked"
+        finally:
+            close_old_connections()
+    with lock:
+        counts["writes"] += writes
+        counts["errors"] += errors
+
+
+def run(queue, clients, seconds, user_ids):
+    counts = {"writes": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    threads = [
+        threading.Thread(target=client, args=(queue.run, user_ids, deadline, counts, lock, i)) for i in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {name: count / seconds for name, count in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--synchronous", default="NORMAL", help="SQLite synchronous PRAGMA; FULL syncs every commit.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        seeded = Path(directory) / "seeded.sqlite3"
+        setup_django(seeded)
+        from django.conf import settings
+        from django.db import connections
+        from core.writequeue import WriteQueue
+
+        user_ids = seed(args.users, 1)
+        connections.close_all()
+        settings.SQLITE_PROFILE = "production"
+        settings.SQLITE_PRAGMAS = {"synchronous": args.synchronous}
+        settings.DATABASES["default"]["CONN_MAX_AGE"] = 600
+        settings.DATABASES["default"]["OPTIONS"] = {"timeout": 5}
+
+        print(f"{'mode':<10}{'clients':>8}{'writes/s':>12}{'locked/s':>12}{'writes/commit':>15}")
+        for mode in ("direct", "queue"):
+            for clients in args.clients:
+                database = Path(directory) / f"{mode}-{clients}.sqlite3"
+                shutil.copy(seeded, database)
+                settings.DATABASES["default"]["NAME"] = str(database)
+
+                queue = WriteQueue(config={"ENABLED": mode == "queue"})
+                result = run(queue, clients, args.seconds, user_ids)
+                queue.close()
+                per_commit = queue.writes / queue.batches if queue.batches else 1
+                print(f"{mode:<10}{clients:>8}{result['writes']:>12.0f}{result['errors']:>12.1f}{per_commit:>15.1f}")
+                connections.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -49,11 +49,15 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": ("core.auth.JWTAuthenticationFromCookie",),
-    "DEFAULT_RENDERER_CLASSES": ("rest_framework.renderers.JSONRenderer",),
+    "DEFAULT_RENDERER_CLASSES": (
+        "core.renderers.ORJSONRenderer",  # The default; the same JSON as DRF's JSONRenderer, encoded faster.
+        "core.renderers.MessagePackRenderer",  # For clients sending "Accept: application/msgpack".
+    ),
     "DEFAULT_PARSER_CLASSES": (
         "rest_framework.parsers.JSONParser",
         "rest_framework.parsers.MultiPartParser",
     ),
+    "DEFAULT_PAGINATION_CLASS": "core.pagination.KeysetPagination",
 }
 
 from datetime import timedelta
@@ -83,6 +87,8 @@ SIMPLE_JWT = {
 }
 
 MIDDLEWARE = [
+    "core.timing.ServerTimingMiddleware",  # First, so its total covers everything below.
+    "core.compression.CompressionMiddleware",  # Before anything that reads or changes response bodies.
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -132,6 +138,134 @@ DATABASES = {
     }
 }
 
+# "production" switches SQLite to WAL journaling with the tuning PRAGMAs in core/sqlite.py (see
+# SQLITE_PRAGMAS to override them) and keeps connections open across requests.
+SQLITE_PROFILE = os.environ.get("BOOKFOREST_SQLITE_PROFILE", "default")
+
+if SQLITE_PROFILE == "production":
+    DATABASES["default"]["CONN_MAX_AGE"] = 600  # Seconds a connection is reused; its PRAGMAs are applied once.
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True  # Replace connections that broke while idle.
+    DATABASES["default"]["OPTIONS"] = {"timeout": 5}  # Busy timeout for the sqlite3 module, matching busy_timeout.
+
+
+# Caches
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Open Library search results; MAX_ENTRIES bounds the cache and the backend evicts least recently used entries.
+    "openlibrary": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "openlibrary",
+        "TIMEOUT": None,
+        "OPTIONS": {"MAX_ENTRIES": 5000, "CULL_FREQUENCY": 10},
+    },
+    # Serialized books, shelves and reviews, see core/fragments.py. Per process here; with several workers a file
+    # based cache (FileBasedCache) or a shared one (Redis, Memcached) lets them reuse each other's fragments.
+    "fragments": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "fragments",
+        "OPTIONS": {"MAX_ENTRIES": 20000, "CULL_FREQUENCY": 10},
+    },
+}
+
+# Time-to-live (seconds) of cached Open Library searches, see core/openlibrary.py.
+OPEN_LIBRARY_CACHE = {
+    "ISBN_TTL": 60 * 60 * 24 * 30,
+    "TITLE_TTL": 60 * 60,
+    "STALE_TTL": 60 * 60 * 24,
+}
+
+# Pooled HTTP client used to query Open Library, see core/openlibrary.py.
+OPEN_LIBRARY_CLIENT = {
+    "CONNECT_TIMEOUT": 3.05,
+    "READ_TIMEOUT": 10,
+    "POOL_SIZE": 10,
+}
+
+# Batch ISBN resolution for scanning sessions, see core/openlibrary.py.
+OPEN_LIBRARY_BATCH = {
+    "MAX_ISBNS": 500,
+    "CONCURRENCY": 4,
+}
+
+# Resized derivatives generated from uploaded images, see core/images.py.
+IMAGE_PIPELINE = {
+    "SIZES": {"thumbnail": 200, "card": 600, "full": 1600},
+    "FORMAT": "WEBP",
+    "QUALITY": 80,
+}
+
+# Optional single writer thread committing the write-heavy endpoints' transactions in batches, see core/writequeue.py.
+WRITE_QUEUE = {
+    "ENABLED": False,
+    "MAX_BATCH": 64,
+    "MAX_DELAY": 0,
+}
+
+# Database-backed background job queue, run by `manage.py run_jobs`, see core/jobs.py.
+JOB_QUEUE = {
+    "MAX_ATTEMPTS": 5,
+    "RETRY_DELAY": 10,
+    "LEASE_TIMEOUT": 600,
+}
+
+# Bulk library imports from uploaded files, see core/imports.py.
+BOOK_IMPORT = {
+    "CHUNK_SIZE": 1000,
+    "MAX_ERRORS": 50,
+}
+
+# Per-process caches of validated access tokens and authenticated users, see core/auth.py.
+AUTH_CACHE = {
+    "TOKEN_MAX_ENTRIES": 10000,
+    "USER_MAX_ENTRIES": 1000,
+    "USER_TTL": 60,
+}
+
+# JSON log lines (logger "core.timing", level INFO) for a sample of requests, see core/timing.py. Set
+# BOOKFOREST_SERVER_TIMING=1 while developing to measure every request and send the measurements to the client
+# as a Server-Timing header.
+TIME_EVERY_REQUEST = os.environ.get("BOOKFOREST_SERVER_TIMING") == "1"
+SERVER_TIMING = {
+    "SAMPLE_RATE": 1.0 if TIME_EVERY_REQUEST else 0.01,
+    "HEADER": TIME_EVERY_REQUEST,
+    "LOG": True,
+}
+
+# Reading history series served from the daily and weekly rollups, see core/history.py.
+READING_HISTORY = {
+    "DEFAULT_DAYS": 90,
+    "MAX_DAYS": 730,
+    "MAX_DAILY_POINTS": 120,
+    "VELOCITY_DAYS": 14,
+}
+
+# Brotli/gzip compression of large JSON and MessagePack responses, see core/compression.py.
+RESPONSE_COMPRESSION = {
+    "MIN_SIZE": 1024,
+    "ENCODINGS": ("br", "gzip"),
+    "BROTLI_QUALITY": 5,
+    "GZIP_LEVEL": 6,
+}
+
+# Per-object cache of serialized books, shelves and reviews, see core/fragments.py.
+FRAGMENT_CACHE = {
+    "ALIAS": "fragments",
+    "TIMEOUT": 60 * 60 * 24,
+    "ENABLED": True,
+}
+
+# Number of entries kept in each user's materialized activity feed, see core/feed.py.
+FEED_MAX_LENGTH = 500
+# Entries a feed may grow past FEED_MAX_LENGTH before it is trimmed, so most fan-outs skip trimming.
+FEED_TRIM_SLACK = 50
+
+# Local ISBN catalog built with `manage.py build_isbn_catalog`, consulted before Open Library.
+ISBN_CATALOG_PATH = BASE_DIR / "data" / "isbn_catalog.bin"
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -180,3 +314,5 @@ CSRF_COOKIE_SECURE = True
 # Media Settings
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+# Uploads that are never served, such as library imports, see core/storage.py.
+PRIVATE_MEDIA_ROOT = os.path.join(BASE_DIR, "private_media")
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from . import signals, sqlite  # noqa: F401  Connect the signal handlers.
+        from . import feed, images, imports  # noqa: F401  Register the background job tasks.
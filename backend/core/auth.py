@@ -1,4 +1,110 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .timing import phase
+
+# Default cache sizes, overridable through settings.AUTH_CACHE.
+DEFAULT_AUTH_CACHE_SETTINGS = {
+    "TOKEN_MAX_ENTRIES": 10000,  # Validated access tokens kept per process; each is dropped when it expires.
+    "USER_MAX_ENTRIES": 1000,  # User snapshots kept per process.
+    "USER_TTL": 60,  # Seconds a snapshot is trusted; bounds staleness after changes made by other processes.
+}
+
+
+# Thread-safe LRU mapping with a per-entry expiry time.
+class ExpiringLRU:
+    def __init__(self, max_entries, clock=time.time):
+        self.max_entries = max_entries
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= self.clock():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at):
+        with self.lock:
+            self.entries[key] = (value, expires_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# Caches validated access tokens by the hash of the raw token, so a token's signature is checked once per process.
+class TokenCache:
+    def __init__(self, config=None, clock=time.time):
+        self.config = {**DEFAULT_AUTH_CACHE_SETTINGS, **getattr(settings, "AUTH_CACHE", {}), **(config or {})}
+        self.entries = ExpiringLRU(self.config["TOKEN_MAX_ENTRIES"], clock=clock)
+
+    def make_key(self, raw_token):
+        if isinstance(raw_token, str):
+            raw_token = raw_token.encode()
+        return hashlib.sha256(raw_token).hexdigest()
+
+    def get(self, raw_token):
+        return self.entries.get(self.make_key(raw_token))
+
+    def set(self, raw_token, validated_token):
+        # An entry never outlives the token's own expiry, so expired tokens are rejected as before.
+        self.entries.set(self.make_key(raw_token), validated_token, expires_at=validated_token["exp"])
+
+    def clear(self):
+        self.entries.clear()
+
+
+# Caches users that passed authentication by id. Entries are dropped when the user is saved or deleted
+# (see core/signals.py) and expire after USER_TTL to pick up changes made in other processes.
+class UserCache:
+    def __init__(self, config=None, clock=time.time):
+        self.config = {**DEFAULT_AUTH_CACHE_SETTINGS, **getattr(settings, "AUTH_CACHE", {}), **(config or {})}
+        self.clock = clock
+        self.entries = ExpiringLRU(self.config["USER_MAX_ENTRIES"], clock=clock)
+
+    def get(self, user_id):
+        user = self.entries.get(str(user_id))
+        # Hand out copies, so changes a request makes to request.user never leak into other requests.
+        return copy.copy(user) if user is not None else None
+
+    def set(self, user):
+        self.entries.set(str(user.pk), copy.copy(user), expires_at=self.clock() + self.config["USER_TTL"])
+
+    def invalidate(self, user_id):
+        self.entries.delete(str(user_id))
+
+    def clear(self):
+        self.entries.clear()
+
+
+token_cache = TokenCache()
+user_cache = UserCache()
 
 
 # Loosely inspired by https://stackoverflow.com/questions/66247988/how-to-store-jwt-tokens-in-httponly-cookies-with-drf-djangorestframework-simplej
@@ -9,5 +115,27 @@ class JWTAuthenticationFromCookie(JWTAuthentication):
         if raw_token is None:
             return None
 
-        validated_token = self.get_validated_token(raw_token)
-        return self.get_user(validated_token), validated_token
+        with phase("auth"):
+            validated_token = self.get_validated_token(raw_token)
+            return self.get_user(validated_token), validated_token
+
+    def get_validated_token(self, raw_token):
+        # Verify the signature once per token and process; later requests reuse the validated token.
+        validated_token = token_cache.get(raw_token)
+        if validated_token is None:
+            validated_token = super().get_validated_token(raw_token)
+            token_cache.set(raw_token, validated_token)
+        return validated_token
+
+    def get_user(self, validated_token):
+        # Serve the user from the snapshot cache; only a miss queries the database (and runs the user checks).
+        user = user_cache.get(validated_token.get(api_settings.USER_ID_CLAIM))
+        if user is None or not self.token_matches_password(validated_token, user):
+            user = super().get_user(validated_token)
+            user_cache.set(user)
+        return user
+
+    def token_matches_password(self, validated_token, user):
+        if not api_settings.CHECK_REVOKE_TOKEN:
+            return True
+        return validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) == get_md5_hash_password(user.password)
@@ -0,0 +1,233 @@
+import gzip
+import heapq
+import json
+import mmap
+import os
+import re
+import shutil
+import struct
+import tempfile
+import logging
+import threading
+
+from django.conf import settings
+
+from .isbn import normalize_isbn
+
+logger = logging.getLogger(__name__)
+
+# File layout (all integers little-endian):
+#   header:  magic (8 bytes) + record count (u64)
+#   index:   count x (isbn-13 as u64, offset into the data section as u64), sorted by isbn
+#   data:    per record a u16 length followed by the UTF-8 fields joined by FIELD_SEPARATOR
+MAGIC = b"BFISBN01"
+HEADER = struct.Struct("<8sQ")
+ENTRY = struct.Struct("<QQ")
+LENGTH = struct.Struct("<H")
+RUN_RECORD = struct.Struct("<QH")
+FIELD_SEPARATOR = "\x1f"
+MAX_FIELD_LENGTH = 2000  # Characters per field, which keeps every record below the u16 length limit.
+
+
+class CatalogError(Exception):
+    """Raised when an ISBN catalog file is missing or malformed."""
+
+
+def encode_record(title, author, total_pages, release_year, cover):
+    values = (title, author, total_pages, release_year, cover)
+    return FIELD_SEPARATOR.join(
+        "" if value is None else str(value).replace(FIELD_SEPARATOR, " ")[:MAX_FIELD_LENGTH] for value in values
+    ).encode()
+
+
+def decode_record(isbn, payload):
+    title, author, total_pages, release_year, cover = payload.decode().split(FIELD_SEPARATOR)
+    return {
+        "isbn": isbn,
+        "title": title,
+        "author": author,
+        "total_pages": int(total_pages) if total_pages else None,
+        "release_year": int(release_year) if release_year else None,
+        "cover": int(cover) if cover else None,
+    }
+
+
+def parse_editions_dump(lines):
+    # Yield (isbn-13, payload) pairs from the lines of an Open Library editions dump.
+    # Each line is tab separated: type, key, revision, last modified, JSON record.
+    for line in lines:
+        columns = line.rstrip("\n").split("\t")
+        if len(columns) < 5 or columns[0] != "/type/edition":
+            continue
+        try:
+            edition = json.loads(columns[4])
+        except ValueError:
+            continue
+
+        isbns = {normalize_isbn(isbn) for isbn in edition.get("isbn_13", []) + edition.get("isbn_10", [])}
+        isbns.discard(None)
+        if not isbns:
+            continue
+
+        year = re.search(r"\b(\d{4})\b", edition.get("publish_date", ""))
+        covers = [cover for cover in edition.get("covers", []) if cover and cover > 0]
+        payload = encode_record(
+            title=edition.get("title"),
+            author=(edition.get("by_statement") or "").rstrip(" ."),
+            total_pages=edition.get("number_of_pages"),
+            release_year=year.group(1) if year else None,
+            cover=covers[0] if covers else None,
+        )
+        for isbn in isbns:
+            yield int(isbn), payload
+
+
+def _write_run(records, directory):
+    # Sort one bounded chunk of records and spill it to a temporary run file.
+    records.sort(key=lambda record: record[0])
+    run = tempfile.TemporaryFile(dir=directory)
+    for isbn, payload in records:
+        run.write(RUN_RECORD.pack(isbn, len(payload)))
+        run.write(payload)
+    run.seek(0)
+    return run
+
+
+def _read_run(run):
+    while True:
+        head = run.read(RUN_RECORD.size)
+        if not head:
+            return
+        isbn, length = RUN_RECORD.unpack(head)
+        yield isbn, run.read(length)
+
+
+def build_catalog(records, path, chunk_size=500_000):
+    # Write (isbn, payload) records to a sorted catalog file using an external merge sort,
+    # so memory use is bounded by chunk_size regardless of the input size. Returns the record count.
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    runs = []
+    try:
+        chunk = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                runs.append(_write_run(chunk, directory))
+                chunk = []
+        if chunk:
+            runs.append(_write_run(chunk, directory))
+
+        count = 0
+        with tempfile.TemporaryFile(dir=directory) as index, tempfile.TemporaryFile(dir=directory) as data:
+            offset = 0
+            previous = None
+            for isbn, payload in heapq.merge(*(_read_run(run) for run in runs), key=lambda record: record[0]):
+                if isbn == previous:
+                    continue  # Keep the first edition seen for an ISBN.
+                previous = isbn
+                index.write(ENTRY.pack(isbn, offset))
+                data.write(LENGTH.pack(len(payload)))
+                data.write(payload)
+                offset += LENGTH.size + len(payload)
+                count += 1
+
+            # Assemble the final file next to the target and swap it in atomically,
+            # so processes that have the old catalog mapped keep a consistent view.
+            with tempfile.NamedTemporaryFile(dir=directory, delete=False) as output:
+                output.write(HEADER.pack(MAGIC, count))
+                for part in (index, data):
+                    part.seek(0)
+                    shutil.copyfileobj(part, output)
+            os.replace(output.name, path)
+        return count
+    finally:
+        for run in runs:
+            run.close()
+
+
+def open_dump(path):
+    # Open an editions dump as text, transparently decompressing .gz files.
+    if str(path).endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "rt", encoding="utf-8")
+
+
+# Read-only view of a catalog file. The file is memory-mapped, so its pages live in the
+# shared page cache and every worker process can look up ISBNs without loading it.
+class IsbnCatalog:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            stat = os.fstat(file.fileno())
+            if stat.st_size < HEADER.size:
+                raise CatalogError(f"{path} is not an ISBN catalog")
+            self.inode = stat.st_ino
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise CatalogError(f"{path} is not an ISBN catalog")
+        self._data_start = HEADER.size + self.count * ENTRY.size
+
+    def __len__(self):
+        return self.count
+
+    def lookup(self, isbn):
+        # Binary search the sorted index for the normalized ISBN.
+        isbn13 = normalize_isbn(isbn)
+        if isbn13 is None:
+            return None
+        key = int(isbn13)
+
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            current, offset = ENTRY.unpack_from(self._map, HEADER.size + middle * ENTRY.size)
+            if current < key:
+                low = middle + 1
+            elif current > key:
+                high = middle
+            else:
+                start = self._data_start + offset
+                (length,) = LENGTH.unpack_from(self._map, start)
+                payload = self._map[start + LENGTH.size:start + LENGTH.size + length]
+                return decode_record(isbn13, payload)
+        return None
+
+    def close(self):
+        self._map.close()
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    # Return the catalog configured in settings.ISBN_CATALOG_PATH, or None if there is none.
+    # The file is re-mapped when a rebuild has replaced it.
+    global _catalog
+    path = getattr(settings, "ISBN_CATALOG_PATH", None)
+    if not path:
+        return None
+    try:
+        inode = os.stat(path).st_ino
+    except OSError:
+        return None
+
+    with _catalog_lock:
+        if _catalog is None or _catalog.path != path or _catalog.inode != inode:
+            _catalog = IsbnCatalog(path)
+        return _catalog
+
+
+def lookup_isbn(isbn):
+    # Resolve an ISBN from the local catalog, returning None when it is unknown or no catalog is installed.
+    try:
+        catalog = get_catalog()
+    except CatalogError:
+        logger.warning("Could not open the ISBN catalog", exc_info=True)
+        return None
+    if catalog is None:
+        return None
+    return catalog.lookup(isbn)
@@ -0,0 +1,93 @@
+import gzip
+
+import brotli
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+# Default response compression configuration, overridable through settings.RESPONSE_COMPRESSION.
+DEFAULT_COMPRESSION_SETTINGS = {
+    "MIN_SIZE": 1024,  # Smaller bodies gain little and are sent as they are.
+    "ENCODINGS": ("br", "gzip"),  # In order of preference when the client accepts several equally.
+    "BROTLI_QUALITY": 5,  # 0-11; past 5 brotli gets much slower for a few percent.
+    "GZIP_LEVEL": 6,
+    "CONTENT_TYPES": ("application/json", "application/msgpack", "text/"),  # Prefixes of compressed media types.
+}
+
+COMPRESSORS = {
+    "br": lambda content, config: brotli.compress(content, quality=config["BROTLI_QUALITY"]),
+    "gzip": lambda content, config: gzip.compress(content, compresslevel=config["GZIP_LEVEL"], mtime=0),
+}
+
+
+def accepted_encodings(header):
+    # The quality values of an Accept-Encoding header by encoding; 0 means refused.
+    qualities = {}
+    for item in header.split(","):
+        name, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if name:
+            qualities[name.lower()] = quality
+    return qualities
+
+
+# Compresses large API responses with brotli or gzip, whichever the client accepts and prefers. Like Django's
+# GZipMiddleware, strong ETags become weak ones, which If-None-Match still matches. Streaming responses are
+# left alone, so their lines reach the client as they are produced. Runs synchronously under WSGI and
+# asynchronously under ASGI.
+class CompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response, config=None):
+        self.get_response = get_response
+        self.config = {**DEFAULT_COMPRESSION_SETTINGS, **getattr(settings, "RESPONSE_COMPRESSION", {}), **(config or {})}
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress(request, await self.get_response(request))
+
+    def compress(self, request, response):
+        if response.streaming or response.has_header("Content-Encoding") or not self.compressible(response):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if len(response.content) < self.config["MIN_SIZE"]:
+            return response
+        encoding = self.choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        compressed = COMPRESSORS[encoding](response.content, self.config)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
+
+    def compressible(self, response):
+        content_type = response.get("Content-Type", "")
+        return content_type.startswith(tuple(self.config["CONTENT_TYPES"]))
+
+    def choose_encoding(self, header):
+        qualities = accepted_encodings(header)
+        wildcard = qualities.get("*", 0)
+        # Highest quality first; sorted() keeps the configured preference among equal ones.
+        ranked = sorted(self.config["ENCODINGS"], key=lambda name: -qualities.get(name, wildcard))
+        return next((name for name in ranked if qualities.get(name, wildcard) > 0), None)
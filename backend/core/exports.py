@@ -0,0 +1,145 @@
+import csv
+from itertools import islice
+
+import orjson
+from django.conf import settings
+
+from .models import Book, Comment, Shelf
+
+# Default export configuration, overridable through settings.LIBRARY_EXPORT.
+DEFAULT_EXPORT_SETTINGS = {
+    "CHUNK_SIZE": 500,  # Books read per query; memory use depends on this, not on the size of the library.
+}
+
+FORMATS = {"jsonl": "application/x-ndjson", "csv": "text/csv"}
+
+# Columns of a book, in CSV order. The first ones are the fields the importer reads (see core/imports.py),
+# so an export can be imported again, into the same or another account.
+BOOK_FIELDS = (
+    "isbn", "title", "author", "total_pages", "release_year", "shelf", "status", "current_page", "review",
+    "id", "image", "progress_shared", "progress_updated", "review_shared", "review_date", "comments",
+)
+
+
+# Columns read per book, including its shelf, reading progress and review.
+BOOK_COLUMNS = (
+    "id", "isbn", "title", "author", "total_pages", "release_year", "image", "shelf__title",
+    "reading_progress__status", "reading_progress__current_page", "reading_progress__shared",
+    "reading_progress__timestamp", "review__id", "review__text", "review__shared", "review__date",
+)
+
+
+# First characters that make spreadsheets evaluate a cell as a formula.
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def spreadsheet_safe(value):
+    # Text a spreadsheet would run as a formula (titles, reviews and other users' comments are user input) gets a
+    # leading quote, which spreadsheets hide; spreadsheet_value() removes it when the file is imported again.
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def spreadsheet_value(value):
+    if isinstance(value, str) and value.startswith("'") and value[1:].startswith(FORMULA_PREFIXES):
+        return value[1:]
+    return value
+
+
+# Turns csv.writer into a line formatter: writerow() returns the formatted line instead of writing it.
+class _Echo:
+    def write(self, value):
+        return value
+
+
+# Writes a user's whole library (shelves, books, reading progress, reviews and comments) as JSON Lines or CSV,
+# line by line. Books are read as plain rows in keyset-ordered chunks, so any library is exported in the same
+# memory and no query or transaction stays open between chunks.
+class LibraryExporter:
+    def __init__(self, user, config=None):
+        self.user = user
+        self.config = {**DEFAULT_EXPORT_SETTINGS, **getattr(settings, "LIBRARY_EXPORT", {}), **(config or {})}
+
+    def lines(self, file_format):
+        if file_format not in FORMATS:
+            raise ValueError(f"Unknown export format: {file_format}")
+        return self.jsonl_lines() if file_format == "jsonl" else self.csv_lines()
+
+    def chunks(self, file_format):
+        # The lines joined in groups of CHUNK_SIZE, so a stream that pays for each item it reads (a thread switch
+        # under ASGI, see core/views.py) reads about one chunk of books at a time.
+        lines = self.lines(file_format)
+        while chunk := "".join(islice(lines, self.config["CHUNK_SIZE"])):
+            yield chunk
+
+    def jsonl_lines(self):
+        # One record per line: the shelves first ({"type": "shelf"}), then the books ({"type": "book"}).
+        for shelf in Shelf.objects.for_user(self.user).order_by("id").values("id", "title", "description", "image"):
+            yield orjson.dumps({"type": "shelf", **shelf}).decode() + "\n"
+        for record in self.books():
+            record["comments"] = [{"user": user, "text": text, "date": date} for user, text, date in record["comments"]]
+            yield orjson.dumps({"type": "book", **record}).decode() + "\n"
+
+    def csv_lines(self):
+        # One row per book; comments are joined into one cell, one per line. Empty shelves are not included.
+        writer = csv.writer(_Echo())
+        yield writer.writerow(BOOK_FIELDS)
+        for record in self.books():
+            record["comments"] = "\n".join(f"{user or ''} ({date}): {text}" for user, text, date in record["comments"])
+            yield writer.writerow([spreadsheet_safe(record[field]) for field in BOOK_FIELDS])
+
+    def books(self):
+        # The records of all books of the user, read as plain rows in chunks of CHUNK_SIZE books: one query for
+        # the books with their shelf, reading progress and review, and one for the comments on their reviews.
+        chunk_size = self.config["CHUNK_SIZE"]
+        books = Book.objects.for_user(self.user).order_by("id").values(*BOOK_COLUMNS)
+        last_id = 0
+        while True:
+            chunk = list(books.filter(id__gt=last_id)[:chunk_size])
+            comments = self.comments([row["review__id"] for row in chunk if row["review__id"] is not None])
+            for row in chunk:
+                yield self.book_record(row, comments.get(row["review__id"], []))
+            if len(chunk) < chunk_size:
+                return
+            last_id = chunk[-1]["id"]
+
+    def comments(self, review_ids):
+        # (author, text, date) of the comments on the reviews, by review id, oldest first.
+        by_review = {}
+        if review_ids:
+            rows = (
+                Comment.objects.filter(review_id__in=review_ids)
+                .order_by("id")
+                .values_list("review_id", "user__username", "text", "date")
+            )
+            for review_id, *comment in rows:
+                by_review.setdefault(review_id, []).append(comment)
+        return by_review
+
+    def book_record(self, row, comments):
+        has_progress = row["reading_progress__status"] is not None
+        has_review = row["review__id"] is not None
+        updated = row["reading_progress__timestamp"]
+        return {
+            "isbn": row["isbn"],
+            "title": row["title"],
+            "author": row["author"],
+            "total_pages": row["total_pages"],
+            "release_year": row["release_year"],
+            "shelf": row["shelf__title"],
+            "status": row["reading_progress__status"],
+            "current_page": row["reading_progress__current_page"],
+            "review": row["review__text"],
+            "id": row["id"],
+            "image": row["image"],
+            "progress_shared": row["reading_progress__shared"] if has_progress else None,
+            "progress_updated": updated.isoformat() if updated else None,
+            "review_shared": row["review__shared"] if has_review else None,
+            "review_date": row["review__date"].isoformat() if has_review else None,
+            "comments": comments,
+        }
+
+
+def export_filename(user, file_format, day):
+    return f"library-{user.username}-{day.isoformat()}.{file_format}"
@@ -0,0 +1,129 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count
+
+from . import versions
+from .jobs import task
+from .models import Activity, Comment, FeedEntry, Following, ReadingProgress, Review
+
+DEFAULT_FEED_MAX_LENGTH = 500
+DEFAULT_FEED_TRIM_SLACK = 50
+
+
+def feed_max_length():
+    return getattr(settings, "FEED_MAX_LENGTH", DEFAULT_FEED_MAX_LENGTH)
+
+
+def feed_trim_slack():
+    return getattr(settings, "FEED_TRIM_SLACK", DEFAULT_FEED_TRIM_SLACK)
+
+
+def create_activity(**fields):
+    # Create an activity and deliver it to the feeds of everyone following its author.
+    with transaction.atomic():
+        activity = Activity.objects.create(**fields)
+        fan_out(activity)
+    return activity
+
+
+# Activities for writes made through the API are created by background jobs queued by the views, so
+# the request neither renders the activity text nor writes to the followers' feeds. The jobs find
+# nothing to do when the object was deleted before they ran.
+@task("feed.reading_progress_activity")
+def reading_progress_activity(user_id, progress_id, updated=False):
+    progress = ReadingProgress.objects.select_related("book").filter(pk=progress_id).first()
+    user = User.objects.filter(pk=user_id).first()
+    if progress is None or user is None:
+        return None
+    action = "updated" if updated else "started tracking"
+    return create_activity(
+        user=user,
+        book=progress.book,
+        reading_progress=progress,
+        text=f"{user} {action} their reading status for {progress.book.title}",
+        backlink=f"/books/{progress.book_id}",
+    )
+
+
+@task("feed.review_activity")
+def review_activity(user_id, review_id):
+    review = Review.objects.select_related("book").filter(pk=review_id).first()
+    user = User.objects.filter(pk=user_id).first()
+    if review is None or user is None:
+        return None
+    return create_activity(
+        user=user,
+        book=review.book,
+        review=review,
+        text=f"{user} wrote a review for {review.book.title}",
+        backlink=f"/books/{review.book_id}",
+    )
+
+
+@task("feed.comment_activity")
+def comment_activity(comment_id):
+    comment = Comment.objects.select_related("user", "book__user").filter(pk=comment_id).first()
+    if comment is None:
+        return None
+    return create_activity(
+        user=comment.user,
+        book=comment.book,
+        review_id=comment.review_id,
+        comment=comment,
+        text=f"{comment.user} replied to {comment.book.user.username}'s review of {comment.book.title}",
+        backlink=f"/books/{comment.book_id}",
+    )
+
+
+def fan_out(activity):
+    # Write the activity into every follower's feed and trim those feeds to their maximum length.
+    follower_ids = list(Following.objects.filter(followed_users=activity.user_id).values_list("user_id", flat=True))
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(owner_id=owner_id, activity=activity, timestamp=activity.timestamp) for owner_id in follower_ids],
+        ignore_conflicts=True,
+    )
+    trim(follower_ids)
+    versions.bump_feeds(follower_ids)
+
+
+def backfill(follower, followed):
+    # Copy the most recent activities of a newly followed user into the follower's feed.
+    activities = Activity.objects.filter(user=followed).order_by("-timestamp")[: feed_max_length()]
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(owner=follower, activity=activity, timestamp=activity.timestamp) for activity in activities],
+        ignore_conflicts=True,
+    )
+    trim([follower.pk])
+    versions.bump_feeds([follower.pk])
+
+
+def remove(follower, followed):
+    # Drop an unfollowed user's activities from the follower's feed.
+    FeedEntry.objects.filter(owner=follower, activity__user=followed).delete()
+    versions.bump_feeds([follower.pk])
+
+
+def trim(owner_ids):
+    # Feeds may grow feed_trim_slack() entries past feed_max_length() before they are cut back to it, so trimming a
+    # batch of feeds costs one counting query, plus one indexed range delete for each of the few feeds that overflow.
+    max_length = feed_max_length()
+    overflowing = (
+        FeedEntry.objects.filter(owner_id__in=owner_ids)
+        .values("owner_id")
+        .annotate(entries=Count("id"))
+        .filter(entries__gt=max_length + feed_trim_slack())
+        .values_list("owner_id", flat=True)
+    )
+    for owner_id in overflowing:
+        overflow = FeedEntry.objects.filter(owner_id=owner_id).order_by("-timestamp", "-id").values("id")
+        FeedEntry.objects.filter(id__in=overflow[max_length:]).delete()
+
+
+def rebuild(user):
+    # Rebuild a user's feed from scratch from the users they follow.
+    with transaction.atomic():
+        FeedEntry.objects.filter(owner=user).delete()
+        versions.bump_feeds([user.pk])
+        for followed in User.objects.filter(followers__user=user):
+            backfill(user, followed)
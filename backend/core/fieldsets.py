@@ -0,0 +1,115 @@
+import hashlib
+from functools import cached_property
+
+from .timing import TimedSerializerMixin
+
+FIELDS_PARAM = "fields"  # ?fields=id,title,review.text: only these fields (dotted names reach into relations).
+EXPAND_PARAM = "expand"  # ?expand=review.comments: embed these relations (dotted names expand nested ones).
+
+
+# The fields a client asked for, for one serializer and, through expand, the ones nested in it. Plain fields are
+# all included unless fields names some; relations are only embedded when named in fields or expand.
+class Selection:
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields  # Names of the plain fields to include, or None for all of them.
+        self.expand = expand if expand is not None else {}  # Selections of the relations to embed, by name.
+
+    @classmethod
+    def from_request(cls, request):
+        # None when the request names neither fields nor expand, so the full representation is served.
+        fields = request.query_params.get(FIELDS_PARAM)
+        expand = request.query_params.get(EXPAND_PARAM)
+        if fields is None and expand is None:
+            return None
+        selection = cls(fields=set() if fields is not None else None)
+        for path in _paths(fields):
+            selection.add_field(path)
+        for path in _paths(expand):
+            selection.add_expand(path)
+        return selection
+
+    def add_field(self, path):
+        name, *rest = path
+        self.fields.add(name)
+        if rest:
+            nested = self.expand.setdefault(name, Selection(fields=set()))
+            if nested.fields is None:
+                nested.fields = set()
+            nested.add_field(rest)
+
+    def add_expand(self, path):
+        name, *rest = path
+        nested = self.expand.setdefault(name, Selection())
+        if rest:
+            nested.add_expand(rest)
+
+    def includes(self, name):
+        return self.fields is None or name in self.fields or name in self.expand
+
+    def expands(self, name):
+        return name in self.expand or (self.fields is not None and name in self.fields)
+
+    def nested(self, name):
+        # An expanded relation without a selection of its own gets its plain fields.
+        return self.expand.get(name) or Selection()
+
+    @cached_property
+    def digest(self):
+        # Identifies the selection in cache keys (see core/fragments.py); equal selections have equal digests.
+        return hashlib.sha256(str(self).encode()).hexdigest()[:12]
+
+    def __str__(self):
+        fields = ",".join(sorted(self.fields)) if self.fields is not None else "*"
+        return fields + "".join(f";{name}({self.expand[name]})" for name in sorted(self.expand))
+
+
+def _paths(value):
+    return [name.strip().split(".") for name in (value or "").split(",") if name.strip()]
+
+
+# Serializers whose representation a Selection narrows down. The relations in expandable_fields are embedded by
+# default, but only when selected once a selection is given; serializers nested in declared fields get the
+# selection of their field. Writes are not affected: all writable fields are still accepted.
+class SparseFieldsMixin(TimedSerializerMixin):
+    expandable_fields = ()
+
+    def __init__(self, *args, selection=None, **kwargs):
+        self.selection = selection
+        super().__init__(*args, **kwargs)
+
+    def wants(self, name):
+        if self.selection is None:
+            return True
+        if name in self.expandable_fields:
+            return self.selection.expands(name)
+        return self.selection.includes(name)
+
+    def nested_selection(self, name):
+        return self.selection.nested(name) if self.selection is not None else None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name, field in fields.items():
+            nested = getattr(field, "child", field)
+            if isinstance(nested, SparseFieldsMixin):
+                nested.selection = self.nested_selection(name)
+        return fields
+
+    @property
+    def _readable_fields(self):
+        for field in super()._readable_fields:
+            if self.wants(field.field_name):
+                yield field
+
+
+# Views serving ?fields= and ?expand=: their serializers get the request's selection, and get_queryset() can use
+# get_selection() to load only what is selected.
+class SparseFieldsViewMixin:
+    def get_selection(self):
+        if not hasattr(self, "_selection"):
+            self._selection = Selection.from_request(self.request)
+        return self._selection
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault("selection", self.get_selection())
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,166 @@
+import hashlib
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models
+from django.db.models import F
+from rest_framework.permissions import SAFE_METHODS
+
+from . import timing
+from .fieldsets import SparseFieldsMixin
+from .models import Book, Comment, Shelf
+from .timing import TimedListSerializer
+
+# Default fragment cache configuration, overridable through settings.FRAGMENT_CACHE.
+DEFAULT_FRAGMENT_CACHE_SETTINGS = {
+    "ALIAS": "fragments",  # Cache (see settings.CACHES) holding the fragments; local-memory, file or shared backends.
+    "TIMEOUT": 60 * 60 * 24,  # Changed objects are cached under new keys, so this only bounds how long old ones linger.
+    "ENABLED": True,
+}
+
+_BATCH = "fragment_batch"  # Serializer context entry holding the fragments looked up for the current response.
+
+
+# The fragments looked up for one response: those found in the cache, and those serialized since, to be stored.
+class _Batch:
+    def __init__(self, keys, found):
+        self.keys = keys
+        self.found = found
+        self.pending = {}
+
+
+# Serialized books, shelves and reviews, cached per object under its id and version. Every change bumps the
+# version (see bump_for() and signals.py), so a changed object is read under a new key and nothing is ever
+# deleted from the cache; that keeps any backend usable, including ones shared by several processes.
+class FragmentCache:
+    def __init__(self, config=None):
+        self.config = {**DEFAULT_FRAGMENT_CACHE_SETTINGS, **getattr(settings, "FRAGMENT_CACHE", {}), **(config or {})}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[self.config["ALIAS"]]
+
+    def enabled(self, context):
+        # Only reads use fragments. A write answers with the object it just saved, whose version in memory is
+        # not the stored one.
+        request = context.get("request")
+        return self.config["ENABLED"] and request is not None and request.method in SAFE_METHODS
+
+    def make_key(self, context, kind, pk, version):
+        # Fragments hold absolute URLs, so they are kept per host the API is reached under.
+        host = context.get("fragment_host")
+        if host is None:
+            base = context["request"].build_absolute_uri("/")
+            host = context["fragment_host"] = hashlib.sha256(base.encode()).hexdigest()[:12]
+        return f"fragment:{kind}:{pk}:{version}:{host}"
+
+    @contextmanager
+    def batch(self, context, serializer, instances):
+        # Look up the fragments of all instances (and the ones nested in them) in one multi-get, and store the
+        # missing ones in one multi-set once they are serialized. Nested batches join the outermost one.
+        if _BATCH in context or not self.enabled(context):
+            yield
+            return
+        keys = {key for instance in instances for key in serializer.fragment_keys(instance)}
+        found = self.get_many(keys) if keys else {}
+        context[_BATCH] = batch = _Batch(keys, found)
+        try:
+            yield
+        finally:
+            del context[_BATCH]
+        if batch.pending:
+            self.cache.set_many(batch.pending, timeout=self.config["TIMEOUT"])
+
+    def lookup(self, context, serializer, instance):
+        # The instance's fragment from the current batch, serialized (and kept for storing) when it was missing.
+        batch = context.get(_BATCH)
+        key = serializer.fragment_key(instance) if batch is not None else None
+        if key is None or key not in batch.keys:
+            return serializer.fragment(instance)
+        if key in batch.found:
+            return batch.found[key]
+        fragment = batch.pending[key] = serializer.fragment(instance)
+        return fragment
+
+    def get_many(self, keys):
+        found = self.cache.get_many(keys)
+        self._count(hits=len(found), misses=len(keys) - len(found))
+        return found
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_ratio": self.hits / lookups if lookups else 0.0}
+
+    def _count(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+        timing.count("fragment_hits", hits)
+        timing.count("fragment_misses", misses)
+
+
+fragment_cache = FragmentCache()
+
+
+def bump_for(instance):
+    # Reading progress, reviews, comments and images are part of their book's fragment (shelf images of their
+    # shelf's), so writing them bumps the version of that book or shelf.
+    if isinstance(instance, Comment):
+        Book.objects.filter(review__id=instance.review_id).update(version=F("version") + 1)
+    elif instance.book_id is not None:
+        Book.objects.filter(pk=instance.book_id).update(version=F("version") + 1)
+    elif getattr(instance, "shelf_id", None) is not None:
+        Shelf.objects.filter(pk=instance.shelf_id).update(version=F("version") + 1)
+
+
+# Serializers whose representation is cached as a fragment. A subclass names its fragment_kind, serializes the
+# cached part in fragment() and adapts it to the viewer in for_viewer(), which gets a copy it may change.
+# Each selection of fields (see core/fieldsets.py) is cached as a fragment of its own.
+class FragmentSerializerMixin(SparseFieldsMixin):
+    fragment_kind = None
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        serializer = super().many_init(*args, **kwargs)
+        if type(serializer) is TimedListSerializer:
+            serializer.__class__ = FragmentListSerializer
+        return serializer
+
+    def fragment_version(self, instance):
+        return instance.version
+
+    def fragment_key(self, instance):
+        if getattr(instance, "pk", None) is None:  # Unsaved objects, e.g. Open Library results, are not cached.
+            return None
+        kind = self.fragment_kind if self.selection is None else f"{self.fragment_kind}~{self.selection.digest}"
+        return fragment_cache.make_key(self.context, kind, instance.pk, self.fragment_version(instance))
+
+    def fragment_keys(self, instance):
+        # Keys of the fragments read to represent the instance, including those of nested objects.
+        key = self.fragment_key(instance)
+        return [key] if key else []
+
+    def to_representation(self, instance):
+        with fragment_cache.batch(self.context, self, [instance]):
+            fragment = fragment_cache.lookup(self.context, self, instance)
+            return self.for_viewer(instance, dict(fragment))
+
+    def fragment(self, instance):
+        return super().to_representation(instance)
+
+    def for_viewer(self, instance, representation):
+        return representation
+
+
+# Lists of fragment serializers fetch the fragments of all their items in one multi-get.
+class FragmentListSerializer(TimedListSerializer):
+    def to_representation(self, data):
+        items = data.all() if isinstance(data, models.manager.BaseManager) else data
+        with fragment_cache.batch(self.context, self.child, items):
+            return super().to_representation(items)
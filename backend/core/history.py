@@ -0,0 +1,123 @@
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ProgressEvent, ProgressRollup
+
+# Default reading history configuration, overridable through settings.READING_HISTORY.
+DEFAULT_HISTORY_SETTINGS = {
+    "DEFAULT_DAYS": 90,  # Days covered by a series unless the request asks for more or fewer.
+    "MAX_DAYS": 730,
+    "MAX_DAILY_POINTS": 120,  # Longer series are returned per week.
+    "VELOCITY_DAYS": 14,  # Days the reading velocity (and with it the projected finish) is averaged over.
+}
+
+
+def history_settings():
+    return {**DEFAULT_HISTORY_SETTINGS, **getattr(settings, "READING_HISTORY", {})}
+
+
+def period_starts(day):
+    return ((ProgressRollup.PERIOD_DAY, day), (ProgressRollup.PERIOD_WEEK, day - timedelta(days=day.weekday())))
+
+
+def record(progress):
+    # Append an event when the reading progress reached another page, and add the pages read to the rollups
+    # of its day and week. The first event of a book is the starting point and counts no pages read.
+    last_page = (
+        ProgressEvent.objects.filter(book_id=progress.book_id)
+        .order_by("-timestamp", "-id")
+        .values_list("page", flat=True)
+        .first()
+    )
+    page = progress.current_page
+    if page == last_page:
+        return None
+
+    event = ProgressEvent.objects.create(book_id=progress.book_id, page=page, timestamp=progress.timestamp or timezone.now())
+    pages = max(0, page - last_page) if last_page is not None else 0
+    for period, start in period_starts(timezone.localdate(event.timestamp)):
+        rollups = ProgressRollup.objects.filter(book_id=progress.book_id, period=period, start=start)
+        if rollups.update(pages=F("pages") + pages, page=page, events=F("events") + 1):
+            continue
+        try:
+            with transaction.atomic():
+                ProgressRollup.objects.create(
+                    book_id=progress.book_id, period=period, start=start, pages=pages, page=page, events=1
+                )
+        except IntegrityError:  # Created by a concurrent update in the meantime.
+            rollups.update(pages=F("pages") + pages, page=page, events=F("events") + 1)
+    return event
+
+
+def record_starting_points(progresses):
+    # Bulk variant of record() for reading progress created without signals (imports), none of which has events yet.
+    events = ProgressEvent.objects.bulk_create(
+        [ProgressEvent(book_id=progress.book_id, page=progress.current_page, timestamp=progress.timestamp)
+         for progress in progresses]
+    )
+    ProgressRollup.objects.bulk_create(
+        [
+            ProgressRollup(book_id=event.book_id, period=period, start=start, page=event.page, events=1)
+            for event in events
+            for period, start in period_starts(timezone.localdate(event.timestamp))
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def series(book, days=None, period=None):
+    # Pages read per day (or week) over the last days, with the page reached, the reading velocity in pages per
+    # day and the projected finish date. Read from the rollups only; periods without reading are filled in.
+    config = history_settings()
+    days = min(days or config["DEFAULT_DAYS"], config["MAX_DAYS"])
+    if period is None:
+        period = ProgressRollup.PERIOD_DAY if days <= config["MAX_DAILY_POINTS"] else ProgressRollup.PERIOD_WEEK
+
+    today = timezone.localdate()
+    first = today - timedelta(days=days - 1)
+    step = timedelta(days=1)
+    if period == ProgressRollup.PERIOD_WEEK:
+        first -= timedelta(days=first.weekday())
+        step = timedelta(weeks=1)
+
+    rollups = ProgressRollup.objects.filter(book=book, period=period)
+    by_start = {
+        start: (pages, page)
+        for start, pages, page in rollups.filter(start__gte=first).values_list("start", "pages", "page")
+    }
+    # The page reached before the series starts, so the page line does not begin empty.
+    page = rollups.filter(start__lt=first).order_by("-start").values_list("page", flat=True).first()
+
+    points = []
+    start = first
+    while start <= today:
+        pages, page = by_start.get(start, (0, page))
+        points.append({"start": start.isoformat(), "pages": pages, "page": page})
+        start += step
+
+    velocity_days = config["VELOCITY_DAYS"]
+    recent = ProgressRollup.objects.filter(
+        book=book, period=ProgressRollup.PERIOD_DAY, start__gt=today - timedelta(days=velocity_days)
+    ).values_list("pages", flat=True)
+    velocity = sum(recent) / velocity_days
+
+    progress = getattr(book, "reading_progress", None)
+    current_page = progress.current_page if progress else None
+    projected_finish = None
+    if velocity and book.total_pages and current_page is not None and current_page < book.total_pages:
+        projected_finish = (today + timedelta(days=math.ceil((book.total_pages - current_page) / velocity))).isoformat()
+
+    return {
+        "book": book.pk,
+        "period": dict(ProgressRollup.PERIOD_CHOICES)[period].lower(),
+        "total_pages": book.total_pages,
+        "current_page": current_page,
+        "velocity": round(velocity, 2),
+        "projected_finish": projected_finish,
+        "series": points,
+    }
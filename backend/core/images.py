@@ -0,0 +1,107 @@
+import io
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .jobs import enqueue, task
+from .models import ImageAsset
+
+logger = logging.getLogger(__name__)
+
+# Default pipeline configuration, overridable through settings.IMAGE_PIPELINE.
+DEFAULT_PIPELINE_SETTINGS = {
+    "SIZES": {"thumbnail": 200, "card": 600, "full": 1600},  # Longest edge in pixels; images are never enlarged.
+    "FORMAT": "WEBP",  # Supported by every current browser; "AVIF" is smaller where Pillow supports it.
+    "QUALITY": 80,
+    "MAX_PIXELS": 50_000_000,  # Larger uploads are rejected instead of being decoded.
+}
+
+EXTENSIONS = {"WEBP": "webp", "AVIF": "avif", "JPEG": "jpg", "PNG": "png"}
+
+
+def derivative_path(asset, name, image_format):
+    return f"uploads/derivatives/{asset.pk}/{name}.{EXTENSIONS[image_format]}"
+
+
+def render_derivatives(source, sizes, image_format, quality, max_pixels):
+    # Decode the upload once and return {name: encoded bytes} for every size, largest first.
+    with Image.open(source) as image:
+        if image.width * image.height > max_pixels:
+            raise ValueError(f"Image of {image.width}x{image.height} pixels is too large")
+
+        # Let the JPEG decoder downscale while decoding when even the largest derivative is much smaller.
+        largest = max(sizes.values())
+        image.draft("RGB", (largest, largest))
+
+        # Apply the EXIF orientation to the pixels; the derivatives are saved without any metadata.
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+        rendered = {}
+        for name, size in sorted(sizes.items(), key=lambda item: -item[1]):
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+            output = io.BytesIO()
+            image.save(output, format=image_format, quality=quality)
+            rendered[name] = output.getvalue()
+        return rendered
+
+
+# Generates resized derivatives of uploaded images off the request path.
+class ImagePipeline:
+    def __init__(self, config=None):
+        self.config = {**DEFAULT_PIPELINE_SETTINGS, **getattr(settings, "IMAGE_PIPELINE", {}), **(config or {})}
+
+    def schedule(self, asset):
+        # Queue a job, committed together with the upload, for the job workers.
+        enqueue("images.process", asset_id=asset.pk)
+
+    def process(self, asset_id):
+        # Generate the derivatives of one asset and return its new status (None if it no longer exists).
+        try:
+            asset = ImageAsset.objects.get(pk=asset_id)
+        except ImageAsset.DoesNotExist:
+            return None  # Replaced or deleted before it was processed.
+
+        image_format = self.config["FORMAT"]
+        try:
+            with asset.file.open("rb") as source:
+                rendered = render_derivatives(
+                    source,
+                    self.config["SIZES"],
+                    image_format,
+                    self.config["QUALITY"],
+                    self.config["MAX_PIXELS"],
+                )
+        except (OSError, ValueError, UnidentifiedImageError, Image.DecompressionBombError):
+            logger.warning("Could not create derivatives of image asset %s", asset_id, exc_info=True)
+            asset.status = ImageAsset.STATUS_FAILED
+            asset.save(update_fields=["status"])
+            return asset.status
+
+        derivatives = {}
+        for name, content in rendered.items():
+            path = derivative_path(asset, name, image_format)
+            default_storage.delete(path)
+            derivatives[name] = default_storage.save(path, ContentFile(content))
+
+        asset.derivatives = derivatives
+        asset.status = ImageAsset.STATUS_READY
+        asset.save(update_fields=["derivatives", "status"])
+        return asset.status
+
+
+def delete_derivatives(asset):
+    for path in (asset.derivatives or {}).values():
+        default_storage.delete(path)
+
+
+pipeline = ImagePipeline()
+
+
+# Writing the files is repeatable, so the job need not run in a transaction while images are converted.
+@task("images.process", atomic=False)
+def process_image(asset_id):
+    pipeline.process(asset_id)
@@ -0,0 +1,289 @@
+import codecs
+import csv
+import json
+import logging
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import feed, history, stats, versions
+from .exports import spreadsheet_value
+from .isbn import normalize_isbn
+from .jobs import enqueue, task
+from .models import Book, ImportJob, ReadingProgress, Review, Shelf
+
+logger = logging.getLogger(__name__)
+
+# Default import configuration, overridable through settings.BOOK_IMPORT.
+DEFAULT_IMPORT_SETTINGS = {
+    "CHUNK_SIZE": 1000,  # Rows written per transaction; also how often progress is saved.
+    "MAX_ERRORS": 50,  # Row errors kept on the job for display.
+}
+
+MAX_TEXT_LENGTH = 200  # Length of Book.title and Book.author.
+
+# Reading statuses as written in files, mapped to ReadingProgress.status.
+STATUSES = {
+    "w": "W", "want to read": "W", "to-read": "W",
+    "r": "R", "is reading": "R", "reading": "R", "currently-reading": "R",
+    "f": "F", "finished reading": "F", "finished": "F", "read": "F",
+    "n": "N", "not to finish": "N", "did-not-finish": "N",
+}
+GOODREADS_EXCLUSIVE_SHELVES = {"read", "currently-reading", "to-read"}
+
+
+class ImportRowError(ValueError):
+    """Raised for a row that cannot be imported."""
+
+
+def read_text(binary_file):
+    # Decode an uploaded file line by line, so memory use does not grow with the file size.
+    return codecs.getreader("utf-8-sig")(binary_file, errors="replace")
+
+
+def detect_format(name, first_line):
+    if name.lower().endswith((".jsonl", ".ndjson")) or first_line.lstrip().startswith("{"):
+        return "jsonl"
+    header = next(csv.reader([first_line]), [])
+    return "goodreads" if "Exclusive Shelf" in header and "Book Id" in header else "csv"
+
+
+def parse_int(value, field):
+    if value in (None, ""):
+        return None
+    try:
+        number = int(float(value))
+    except (TypeError, ValueError):
+        raise ImportRowError(f"{field} must be a number, not {value!r}")
+    if number < 0:
+        raise ImportRowError(f"{field} must not be negative")
+    return number
+
+
+def clean_record(row):
+    # Validate a row already mapped to the generic fields and return the values to import.
+    title = (row.get("title") or "").strip()[:MAX_TEXT_LENGTH]
+    author = (row.get("author") or "").strip()[:MAX_TEXT_LENGTH]
+    if not title:
+        raise ImportRowError("title is required")
+
+    raw_isbn = (row.get("isbn") or "").strip()
+    status = (row.get("status") or "").strip().lower()
+    if status and status not in STATUSES:
+        raise ImportRowError(f"unknown status {row.get('status')!r}")
+
+    return {
+        "isbn": normalize_isbn(raw_isbn) or raw_isbn[:13],
+        "title": title,
+        "author": author,
+        "total_pages": parse_int(row.get("total_pages"), "total_pages"),
+        "release_year": parse_int(row.get("release_year"), "release_year"),
+        "shelf": (row.get("shelf") or "").strip()[:MAX_TEXT_LENGTH] or None,
+        "status": STATUSES.get(status),
+        "current_page": parse_int(row.get("current_page"), "current_page") or 0,
+        "review": (row.get("review") or "").strip() or None,
+    }
+
+
+def goodreads_row(row):
+    # Map a row of a Goodreads library export onto the generic fields.
+    def isbn(value):
+        return (value or "").strip().lstrip("=").strip('"')  # Exported as ="0143039954".
+
+    exclusive_shelf = (row.get("Exclusive Shelf") or "").strip()
+    if exclusive_shelf.lower() not in STATUSES:
+        exclusive_shelf = ""  # Custom exclusive shelves carry no reading status.
+    custom_shelves = [
+        shelf.strip()
+        for shelf in (row.get("Bookshelves") or "").split(",")
+        if shelf.strip() and shelf.strip() not in GOODREADS_EXCLUSIVE_SHELVES
+    ]
+    return {
+        "isbn": isbn(row.get("ISBN13")) or isbn(row.get("ISBN")),
+        "title": row.get("Title"),
+        "author": row.get("Author"),
+        "total_pages": row.get("Number of Pages"),
+        "release_year": row.get("Original Publication Year") or row.get("Year Published"),
+        "shelf": custom_shelves[0] if custom_shelves else None,
+        "status": exclusive_shelf,
+        "review": row.get("My Review"),
+    }
+
+
+def parse_rows(lines, file_format):
+    # Yield (line number, record or ImportRowError) for every row of the file.
+    if file_format == "jsonl":
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ImportRowError("expected a JSON object")
+                if row.get("type", "book") != "book":
+                    continue  # Shelf records of a library export; shelves are created from the books' shelf titles.
+                yield number, clean_record(row)
+            except (ValueError, ImportRowError) as error:
+                yield number, ImportRowError(str(error))
+        return
+
+    reader = csv.DictReader(lines)
+    for row in reader:
+        number = reader.line_num
+        try:
+            if file_format == "goodreads":
+                yield number, clean_record(goodreads_row(row))
+            else:
+                yield number, clean_record({name: spreadsheet_value(value) for name, value in row.items()})
+        except ImportRowError as error:
+            yield number, error
+
+
+def dedupe_key(record):
+    # Books are the same if their ISBNs normalize to the same ISBN-13, or else have the same title and author.
+    isbn = normalize_isbn(record["isbn"])
+    return isbn if isbn else (record["title"].lower(), record["author"].lower())
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+# Streams an uploaded file into a user's library, writing each chunk of rows in one transaction.
+class LibraryImporter:
+    def __init__(self, job, config=None, progress=None):
+        self.job = job
+        self.user = job.user
+        self.config = {**DEFAULT_IMPORT_SETTINGS, **getattr(settings, "BOOK_IMPORT", {}), **(config or {})}
+        self.progress = progress  # Called with the job after every chunk.
+        self.seen = {
+            dedupe_key({"isbn": isbn, "title": title, "author": author})
+            for isbn, title, author in Book.objects.for_user(self.user).values_list("isbn", "title", "author").iterator()
+        }
+        self.shelves = dict(Shelf.objects.for_user(self.user).values_list("title", "id"))
+        self.last_book = None
+
+    def run(self, lines):
+        job = self.job
+        job.status = ImportJob.STATUS_RUNNING
+        # A rerun after a worker crash counts from the start; the books written before are skipped as duplicates.
+        job.rows_processed = job.books_created = job.duplicates = job.invalid = 0
+        job.errors = []
+        job.save(update_fields=["status", "rows_processed", "books_created", "duplicates", "invalid", "errors"])
+
+        for chunk in chunked(parse_rows(lines, job.format), self.config["CHUNK_SIZE"]):
+            records = []
+            for number, record in chunk:
+                if isinstance(record, ImportRowError):
+                    self.reject(number, record)
+                    continue
+                key = dedupe_key(record)
+                if key in self.seen:
+                    job.duplicates += 1
+                    continue
+                self.seen.add(key)
+                records.append(record)
+
+            with transaction.atomic():
+                self.write(records)
+                job.rows_processed += len(chunk)
+                job.books_created += len(records)
+                job.save(update_fields=["rows_processed", "books_created", "duplicates", "invalid", "errors"])
+            if self.progress:
+                self.progress(job)
+
+        self.finish()
+        return job
+
+    def reject(self, number, error):
+        self.job.invalid += 1
+        if len(self.job.errors) < self.config["MAX_ERRORS"]:
+            self.job.errors.append({"line": number, "error": str(error)})
+
+    def write(self, records):
+        if not records:
+            return
+        self.create_shelves({record["shelf"] for record in records if record["shelf"]})
+
+        books = Book.objects.bulk_create(
+            [
+                Book(
+                    user=self.user,
+                    isbn=record["isbn"],
+                    title=record["title"],
+                    author=record["author"],
+                    total_pages=record["total_pages"],
+                    release_year=record["release_year"],
+                    shelf_id=self.shelves.get(record["shelf"]),
+                )
+                for record in records
+            ]
+        )
+
+        # bulk_create skips save(), so timestamps are set here.
+        now = timezone.now()
+        history.record_starting_points(ReadingProgress.objects.bulk_create(
+            [
+                ReadingProgress(book=book, status=record["status"], current_page=record["current_page"], timestamp=now)
+                for book, record in zip(books, records)
+                if record["status"]
+            ]
+        ))
+        Review.objects.bulk_create(
+            [Review(book=book, text=record["review"]) for book, record in zip(books, records) if record["review"]]
+        )
+        # bulk_create sends no signals, so the library version is bumped once per chunk.
+        versions.bump_library(self.user.pk)
+        self.last_book = books[-1]
+
+    def create_shelves(self, titles):
+        missing = [title for title in titles if title not in self.shelves]
+        for shelf in Shelf.objects.bulk_create([Shelf(user=self.user, title=title) for title in missing]):
+            self.shelves[shelf.title] = shelf.id
+
+    def finish(self):
+        job = self.job
+        job.status = ImportJob.STATUS_DONE
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "finished_at"])
+
+        if job.books_created:
+            stats.rebuild(self.user)  # The books were created without signals.
+            # One activity for the whole import instead of one per book.
+            feed.create_activity(
+                user=self.user,
+                book=self.last_book,
+                text=f"{self.user} imported {job.books_created} books",
+                backlink="/books",
+            )
+
+
+# Chunks are committed as they are written, so imports do not run in one transaction.
+@task("imports.run", atomic=False)
+def run_import(job_id):
+    # Import the file of a job, recording a failure on the job instead of raising.
+    job = ImportJob.objects.select_related("user").filter(pk=job_id).first()
+    if job is None:
+        return None
+    try:
+        with job.file.open("rb") as file:
+            LibraryImporter(job).run(read_text(file))
+    except Exception:
+        logger.exception("Import %s failed", job_id)
+        job.status = ImportJob.STATUS_FAILED
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "finished_at"])
+    finally:
+        # The upload is a private copy of the user's library; the job keeps its name only.
+        if job.file:
+            job.file.storage.delete(job.file.name)
+    return job
+
+
+def start_import(job):
+    # Queue the import for the job workers.
+    enqueue("imports.run", job_id=job.pk)
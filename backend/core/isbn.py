@@ -0,0 +1,21 @@
+import re
+
+
+def normalize_isbn(value):
+    # Normalize an ISBN-10 or ISBN-13 (with or without separators) to its 13-digit form, or None if invalid.
+    if not value:
+        return None
+    digits = re.sub(r"[^0-9Xx]", "", str(value)).upper()
+
+    if len(digits) == 13 and digits.isdigit():
+        return digits
+    if len(digits) == 10 and digits[:9].isdigit() and (digits[9].isdigit() or digits[9] == "X"):
+        return to_isbn13(digits)
+    return None
+
+
+def to_isbn13(isbn10):
+    # ISBN-10s map onto the "978" prefix; the check digit is recomputed with ISBN-13 weights.
+    body = "978" + isbn10[:9]
+    total = sum(int(digit) * (1 if i % 2 == 0 else 3) for i, digit in enumerate(body))
+    return body + str((10 - total % 10) % 10)
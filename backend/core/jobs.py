@@ -0,0 +1,142 @@
+import logging
+import os
+import socket
+import time
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Default queue configuration, overridable through settings.JOB_QUEUE.
+DEFAULT_JOB_QUEUE_SETTINGS = {
+    "MAX_ATTEMPTS": 5,  # Runs of a job before it is marked failed.
+    "RETRY_DELAY": 10,  # Seconds before the first retry; doubled for every further attempt.
+    "LEASE_TIMEOUT": 600,  # Seconds after which a job whose worker died is handed out again.
+    "POLL_INTERVAL": 1,  # Seconds an idle worker waits before looking for due jobs.
+    "BATCH_SIZE": 10,  # Jobs claimed at once.
+}
+
+tasks = {}  # Registered task functions by name, with whether they run atomically.
+
+
+def queue_settings():
+    return {**DEFAULT_JOB_QUEUE_SETTINGS, **getattr(settings, "JOB_QUEUE", {})}
+
+
+def task(name, atomic=True):
+    # Register a function as the handler of jobs with the given name. Atomic tasks run in one transaction
+    # with the removal of their job, so their database writes happen once even when a worker dies; other
+    # tasks (e.g. long imports) may run again after a crash and must be safe to repeat.
+    def register(func):
+        tasks[name] = (func, atomic)
+        return func
+
+    return register
+
+
+def enqueue(name, **payload):
+    # Queue a job. Called inside a transaction, the job is committed or rolled back with the caller's writes.
+    if name not in tasks:
+        raise ValueError(f"Unknown task {name!r}")
+    return Job.objects.create(name=name, payload=payload)
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim(worker, limit):
+    # Claim up to limit due jobs, including running jobs whose lease expired. Every claim is a conditional
+    # update on the row as it was read, so concurrent workers never claim the same attempt of a job.
+    now = timezone.now()
+    expired = now - timedelta(seconds=queue_settings()["LEASE_TIMEOUT"])
+    candidates = (
+        Job.objects.filter(
+            Q(status=Job.STATUS_QUEUED, run_at__lte=now) | Q(status=Job.STATUS_RUNNING, locked_at__lt=expired)
+        )
+        .order_by("run_at", "id")
+        .values_list("id", "status", "attempts")[:limit]
+    )
+
+    claimed = []
+    for job_id, status, attempts in candidates:
+        updated = Job.objects.filter(pk=job_id, status=status, attempts=attempts).update(
+            status=Job.STATUS_RUNNING, attempts=attempts + 1, locked_at=now, locked_by=worker
+        )
+        if updated:
+            claimed.append(job_id)
+    return list(Job.objects.filter(pk__in=claimed).order_by("run_at", "id"))
+
+
+def execute(job):
+    # Run a claimed job, deleting it when it succeeds and scheduling a retry when it fails. Returns success.
+    func, atomic = tasks.get(job.name, (None, False))
+    try:
+        if func is None:
+            raise LookupError(f"No task registered as {job.name!r}")
+        if job.attempts > queue_settings()["MAX_ATTEMPTS"]:
+            raise RuntimeError("Worker lease expired too often")
+        with transaction.atomic() if atomic else nullcontext():
+            func(**job.payload)
+            Job.objects.filter(pk=job.pk).delete()
+    except Exception as error:
+        logger.exception("Job %s (%s) failed on attempt %s", job.pk, job.name, job.attempts)
+        retry_or_fail(job, error)
+        return False
+    return True
+
+
+def retry_or_fail(job, error):
+    config = queue_settings()
+    if job.attempts >= config["MAX_ATTEMPTS"]:
+        job.status = Job.STATUS_FAILED
+    else:
+        job.status = Job.STATUS_QUEUED
+        job.run_at = timezone.now() + timedelta(seconds=config["RETRY_DELAY"] * 2 ** (job.attempts - 1))
+    job.locked_at = None
+    job.locked_by = ""
+    job.last_error = f"{type(error).__name__}: {error}"
+    job.save(update_fields=["status", "run_at", "locked_at", "locked_by", "last_error"])
+
+
+def run_pending(worker=None, limit=None):
+    # Run due jobs until none are left (or limit jobs ran) and return how many ran.
+    worker = worker or worker_name()
+    batch_size = queue_settings()["BATCH_SIZE"]
+    count = 0
+    while limit is None or count < limit:
+        batch = claim(worker, batch_size if limit is None else min(batch_size, limit - count))
+        if not batch:
+            break
+        for job in batch:
+            execute(job)
+            count += 1
+    return count
+
+
+def work(worker=None, should_stop=lambda: False):
+    # Run jobs as they become due until should_stop() returns true.
+    worker = worker or worker_name()
+    config = queue_settings()
+    while not should_stop():
+        close_old_connections()  # Long-running workers must not keep broken or stale connections.
+        batch = claim(worker, config["BATCH_SIZE"])
+        if not batch:
+            time.sleep(config["POLL_INTERVAL"])
+        for job in batch:
+            execute(job)
+
+
+def retry_failed(names=None):
+    # Queue failed jobs again, e.g. after fixing the cause. Returns the number of jobs queued.
+    failed = Job.objects.filter(status=Job.STATUS_FAILED)
+    if names:
+        failed = failed.filter(name__in=names)
+    return failed.update(status=Job.STATUS_QUEUED, attempts=0, run_at=timezone.now())
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.catalog import build_catalog, open_dump, parse_editions_dump
+
+
+class Command(BaseCommand):
+    help = "Build the memory-mapped ISBN catalog from an Open Library editions dump (optionally gzipped)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("dump", help="Path to the editions dump, e.g. ol_dump_editions_latest.txt.gz")
+        parser.add_argument(
+            "--output",
+            default=getattr(settings, "ISBN_CATALOG_PATH", None),
+            help="Catalog file to write (defaults to settings.ISBN_CATALOG_PATH).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500_000,
+            help="Records sorted in memory at a time before spilling to disk.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["output"]:
+            raise CommandError("No output path given and settings.ISBN_CATALOG_PATH is not set.")
+
+        try:
+            with open_dump(options["dump"]) as lines:
+                count = build_catalog(parse_editions_dump(lines), options["output"], chunk_size=options["chunk_size"])
+        except OSError as exc:
+            raise CommandError(f"Could not build the catalog: {exc}") from exc
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} ISBNs to {options['output']}"))
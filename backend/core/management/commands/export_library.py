@@ -0,0 +1,61 @@
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.exports import FORMATS, LibraryExporter, export_filename
+
+
+class Command(BaseCommand):
+    help = "Export the libraries of users (shelves, books, reading progress, reviews and comments) as JSON Lines or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("usernames", nargs="*", help="Users to export (default: everyone).")
+        parser.add_argument("--format", choices=sorted(FORMATS), default="jsonl", help="File format (default: jsonl).")
+        parser.add_argument(
+            "--output",
+            help="File to write a single library to, or directory to write one file per user into. "
+                 "A single library is written to standard output by default.",
+        )
+        parser.add_argument("--chunk-size", type=int, help="Books read per query.")
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by("id")
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+            missing = set(options["usernames"]) - set(users.values_list("username", flat=True))
+            if missing:
+                raise CommandError(f"Unknown users: {', '.join(sorted(missing))}")
+
+        file_format = options["format"]
+        config = {"CHUNK_SIZE": options["chunk_size"]} if options["chunk_size"] else None
+        single = len(options["usernames"]) == 1
+        output = Path(options["output"]) if options["output"] else None
+
+        if single and (output is None or not output.is_dir()):
+            user = users.get()
+            lines = LibraryExporter(user, config=config).lines(file_format)
+            if output is None:
+                for line in lines:
+                    self.stdout.write(line, ending="")
+            else:
+                self.write(lines, output)
+            return
+
+        if output is None or not output.is_dir():
+            raise CommandError("--output must be an existing directory when exporting several libraries.")
+        today = timezone.localdate()
+        count = 0
+        for user in users.iterator():
+            path = output / export_filename(user, file_format, today)
+            self.write(LibraryExporter(user, config=config).lines(file_format), path)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Exported {count} libraries to {output}"))
+
+    def write(self, lines, path):
+        try:
+            with open(path, "w", encoding="utf-8", newline="") as file:
+                file.writelines(lines)
+        except OSError as error:
+            raise CommandError(f"Cannot write {path}: {error}")
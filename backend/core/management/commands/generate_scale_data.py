@@ -0,0 +1,65 @@
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core import feed
+from core.scaledata import DEFAULT_SCALE_DATA_SETTINGS, ScaleDataGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate users with libraries, reviews, comments, followings and activities at production scale. "
+        "The same seed and --until date always generate the same rows."
+    )
+
+    def add_arguments(self, parser):
+        defaults = DEFAULT_SCALE_DATA_SETTINGS
+        parser.add_argument("--users", type=int, default=defaults["USERS"])
+        parser.add_argument("--books-per-user", type=int, default=defaults["BOOKS_PER_USER"], help="Mean library size.")
+        parser.add_argument("--max-books-per-user", type=int, default=defaults["MAX_BOOKS_PER_USER"])
+        parser.add_argument("--follows-per-user", type=int, default=defaults["FOLLOWS_PER_USER"], help="Mean follow count.")
+        parser.add_argument("--days", type=int, default=defaults["DAYS"], help="Days of activity to generate.")
+        parser.add_argument("--until", type=date.fromisoformat, help="Last day of activity as YYYY-MM-DD (default: today).")
+        parser.add_argument("--prefix", default=defaults["PREFIX"], help="Prefix of the generated usernames.")
+        parser.add_argument("--password", help="Password of every generated user (default: none).")
+        parser.add_argument("--chunk-size", type=int, default=defaults["CHUNK_SIZE"], help="Rows written per transaction.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--feeds", action="store_true", help="Also build the feeds of the generated users (slow).")
+
+    def handle(self, *args, **options):
+        if options["users"] < 1 or options["chunk_size"] < 1:
+            raise CommandError("--users and --chunk-size must be positive")
+
+        config = {
+            "USERS": options["users"],
+            "BOOKS_PER_USER": options["books_per_user"],
+            "MAX_BOOKS_PER_USER": options["max_books_per_user"],
+            "FOLLOWS_PER_USER": options["follows_per_user"],
+            "DAYS": options["days"],
+            "UNTIL": options["until"],
+            "PREFIX": options["prefix"],
+            "PASSWORD": options["password"],
+            "CHUNK_SIZE": options["chunk_size"],
+        }
+        self.started = self.reported = time.monotonic()
+        generator = ScaleDataGenerator(seed=options["seed"], config=config, progress=self.report)
+        counts = generator.run()
+        for label, count in counts.items():
+            self.stdout.write(f"  {label}: {count}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {sum(counts.values())} rows in {time.monotonic() - self.started:.0f}s"
+        ))
+
+        if options["feeds"]:
+            users = User.objects.filter(pk__gte=generator.first_user)
+            for user in users.iterator():
+                feed.rebuild(user)
+            self.stdout.write(self.style.SUCCESS("Built the feeds of the generated users"))
+
+    def report(self, writer):
+        now = time.monotonic()
+        if now - self.reported >= 10:
+            self.reported = now
+            self.stdout.write(f"{sum(writer.counts.values())} rows written after {now - self.started:.0f}s")
@@ -0,0 +1,43 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.imports import LibraryImporter, detect_format, read_text
+from core.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = "Import books into a user's library from a CSV, Goodreads export or JSON Lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", help="User whose library the books are added to.")
+        parser.add_argument("path", help="File to import.")
+        parser.add_argument("--format", choices=[choice for choice, _ in ImportJob.FORMAT_CHOICES], help="File format (detected by default).")
+        parser.add_argument("--chunk-size", type=int, help="Rows written per transaction.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user: {options['username']}")
+
+        try:
+            file = open(options["path"], "rb")
+        except OSError as error:
+            raise CommandError(f"Cannot read {options['path']}: {error}")
+
+        with file:
+            file_format = options["format"] or detect_format(options["path"], file.readline().decode("utf-8-sig", errors="replace"))
+            file.seek(0)
+            job = ImportJob.objects.create(user=user, format=file_format)
+
+            config = {"CHUNK_SIZE": options["chunk_size"]} if options["chunk_size"] else None
+            LibraryImporter(job, config=config, progress=self.report).run(read_text(file))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {job.books_created} books ({job.duplicates} duplicates, {job.invalid} invalid rows skipped)"
+        ))
+        for error in job.errors:
+            self.stdout.write(f"  line {error['line']}: {error['error']}")
+
+    def report(self, job):
+        self.stdout.write(f"{job.rows_processed} rows processed")
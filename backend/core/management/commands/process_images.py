@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from core.images import pipeline
+from core.models import ImageAsset
+
+
+class Command(BaseCommand):
+    help = "Generate resized derivatives for image assets that have none yet, e.g. uploads from before the pipeline."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--retry-failed", action="store_true", help="Also retry images that failed before.")
+
+    def handle(self, *args, **options):
+        statuses = [ImageAsset.STATUS_PENDING]
+        if options["retry_failed"]:
+            statuses.append(ImageAsset.STATUS_FAILED)
+
+        processed = failed = 0
+        for asset_id in ImageAsset.objects.filter(status__in=statuses).values_list("id", flat=True).iterator():
+            if pipeline.process(asset_id) == ImageAsset.STATUS_FAILED:
+                failed += 1
+            else:
+                processed += 1
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} images, {failed} failed"))
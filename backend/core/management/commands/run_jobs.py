@@ -0,0 +1,31 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (activities, feed fan-out, image derivatives, imports)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run the jobs that are due and exit.")
+        parser.add_argument("--retry-failed", action="store_true", help="Queue failed jobs again before starting.")
+
+    def handle(self, *args, **options):
+        if options["retry_failed"]:
+            self.stdout.write(f"Queued {jobs.retry_failed()} failed jobs again")
+
+        if options["once"]:
+            self.stdout.write(self.style.SUCCESS(f"Ran {jobs.run_pending()} jobs"))
+            return
+
+        # Finish the current job on SIGTERM/SIGINT instead of abandoning it until its lease expires.
+        stopping = []
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *args: stopping.append(True))
+
+        worker = jobs.worker_name()
+        self.stdout.write(f"Worker {worker} waiting for jobs")
+        jobs.work(worker, should_stop=lambda: bool(stopping))
+        self.stdout.write("Worker stopped")
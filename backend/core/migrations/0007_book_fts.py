@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from core.search import create_sqlite_index, drop_sqlite_index
+
+
+def create_index(apps, schema_editor):
+    create_sqlite_index(schema_editor)
+
+
+def drop_index(apps, schema_editor):
+    drop_sqlite_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_activity_timestamp_alter_readingprogress_timestamp'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_versions(apps, schema_editor):
+    # Existing users start at version 0; new users get their row when they are created.
+    User = apps.get_model("auth", "User")
+    LibraryVersion = apps.get_model("core", "LibraryVersion")
+    LibraryVersion.objects.bulk_create(
+        [LibraryVersion(user_id=user_id) for user_id in User.objects.values_list("id", flat=True)],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0008_feedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LibraryVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='library_version', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('library', models.PositiveBigIntegerField(default=0)),
+                ('feed', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
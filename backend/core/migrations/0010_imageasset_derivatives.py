@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_libraryversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageasset',
+            name='derivatives',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='imageasset',
+            name='status',
+            field=models.CharField(choices=[('P', 'Pending'), ('R', 'Ready'), ('F', 'Failed')], default='P', max_length=1),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:17
+
+import datetime
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def record_starting_points(apps, schema_editor):
+    # Every existing reading progress becomes the first event of its book's history.
+    ReadingProgress = apps.get_model("core", "ReadingProgress")
+    ProgressEvent = apps.get_model("core", "ProgressEvent")
+    ProgressRollup = apps.get_model("core", "ProgressRollup")
+    now = django.utils.timezone.now()
+    for progress in ReadingProgress.objects.exclude(book=None).iterator():
+        timestamp = progress.timestamp or now
+        day = django.utils.timezone.localdate(timestamp)
+        ProgressEvent.objects.create(book_id=progress.book_id, page=progress.current_page, timestamp=timestamp)
+        for period, start in (("D", day), ("W", day - datetime.timedelta(days=day.weekday()))):
+            ProgressRollup.objects.create(
+                book_id=progress.book_id, period=period, start=start, page=progress.current_page, events=1
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgressRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('D', 'Day'), ('W', 'Week')], max_length=1)),
+                ('start', models.DateField()),
+                ('pages', models.PositiveIntegerField(default=0)),
+                ('page', models.PositiveIntegerField()),
+                ('events', models.PositiveIntegerField(default=0)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_rollups', to='core.book')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProgressEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page', models.PositiveIntegerField()),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_events', to='core.book')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='progressrollup',
+            constraint=models.UniqueConstraint(fields=('book', 'period', 'start'), name='unique_progress_rollup'),
+        ),
+        migrations.AddIndex(
+            model_name='progressevent',
+            index=models.Index(fields=['book', '-timestamp'], name='progress_event_book_time'),
+        ),
+        migrations.RunPython(record_starting_points, migrations.RunPython.noop),
+    ]
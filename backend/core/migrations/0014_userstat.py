@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:22
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from core.stats import counter_rows
+
+
+def count_existing_libraries(apps, schema_editor):
+    # Every existing user starts with the counters of their library, as stats.rebuild() computes them.
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    Book = apps.get_model("core", "Book")
+    ReadingProgress = apps.get_model("core", "ReadingProgress")
+    UserStat = apps.get_model("core", "UserStat")
+    for user_id in User.objects.values_list("pk", flat=True).iterator():
+        rows = counter_rows(Book.objects.filter(user_id=user_id), ReadingProgress.objects.filter(book__user_id=user_id))
+        UserStat.objects.bulk_create(
+            [UserStat(user_id=user_id, kind=kind, key=key, value=value) for kind, key, value in rows]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0013_progress_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20)),
+                ('key', models.CharField(max_length=200)),
+                ('value', models.BigIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'kind', '-value'], name='user_stat_top')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='userstat',
+            constraint=models.UniqueConstraint(fields=('user', 'kind', 'key'), name='unique_user_stat'),
+        ),
+        migrations.RunPython(count_existing_libraries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:28
+
+import core.models
+from django.db import migrations, models
+
+from core.search import create_sqlite_index
+
+
+def recreate_index(apps, schema_editor):
+    # Adding or removing a column rebuilds core_book on SQLite, which drops the triggers that keep the search
+    # index in sync; done last in both directions.
+    create_sqlite_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_userstat'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, recreate_index),
+        migrations.AddField(
+            model_name='book',
+            name='version',
+            field=models.BigIntegerField(default=core.models.random_version, editable=False),
+        ),
+        migrations.AddField(
+            model_name='shelf',
+            name='version',
+            field=models.BigIntegerField(default=core.models.random_version, editable=False),
+        ),
+        migrations.RunPython(recreate_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_fragment_versions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['user', '-timestamp'], name='activity_user_timestamp'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['user', 'shelf'], name='book_user_shelf'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:37
+
+import core.storage
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def move_uploads(apps, schema_editor):
+    # Uploads of unfinished imports move out of MEDIA_ROOT; those of finished ones are no longer needed.
+    ImportJob = apps.get_model("core", "ImportJob")
+    for job in ImportJob.objects.exclude(file="").iterator():
+        if not default_storage.exists(job.file.name):
+            continue
+        if job.status in ("P", "R"):
+            with default_storage.open(job.file.name, "rb") as file:
+                name = core.storage.private_storage.save(job.file.name, file)
+            ImportJob.objects.filter(pk=job.pk).update(file=name)
+        default_storage.delete(job.file.name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='importjob',
+            name='file',
+            field=models.FileField(storage=core.storage.PrivateStorage(), upload_to='imports/'),
+        ),
+        migrations.RunPython(move_uploads, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,19 @@
+import random
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.forms import ValidationError
 from django.utils import timezone
-from django.db.models import Q, QuerySet
+from django.db.models import OuterRef, Prefetch, Q, QuerySet, Subquery
+
+from .search import get_search_backend
+from .storage import private_storage
+
+
+# Starting value of the version counters of books and shelves (see core/fragments.py). Random, so a new row that
+# reuses the id of a deleted one never matches the fragments cached for it.
+def random_version():
+    return random.getrandbits(62)
 
 
 # Stores user-specific settings, like whether to share reviews or reading progress publicly.
@@ -18,17 +29,59 @@ class BaseUserAccessManager(models.Manager):
         return self.filter(user=user)  # Filter objects by the given user.
 
 
+# Defers the columns of a model that a selection of fields (see core/fieldsets.py) leaves out, but for the ones
+# that are always needed.
+def only_selected(queryset, selection, always):
+    columns = [field.name for field in queryset.model._meta.concrete_fields if selection.includes(field.name)]
+    return queryset.only(*always, *columns)
+
+
+# Custom QuerySet for Shelf model with additional methods.
+class ShelfQuerySet(QuerySet):
+    def with_books(self, selection=None):
+        # Load the owner and every book on the shelf (with its related objects) in a fixed number of queries.
+        # With a selection of fields, only the selected ones are loaded, and the books only when expanded.
+        if selection is not None:
+            return self.for_selection(selection)
+        return (
+            self.select_related("user")
+            .prefetch_related(Prefetch("books", queryset=Book.objects.with_related()))
+            .annotate(image_derivatives=ImageAsset.objects.ready_derivatives(shelf=OuterRef("pk")))
+        )
+
+    def for_selection(self, selection):
+        shelves = only_selected(self, selection, always=("id", "user", "version"))
+        if selection.includes("user"):
+            shelves = shelves.select_related("user")
+        if selection.expands("books"):
+            books = Book.objects.with_related(selection.nested("books"))
+            shelves = shelves.prefetch_related(Prefetch("books", queryset=books))
+        if selection.includes("image_derivatives"):
+            shelves = shelves.annotate(image_derivatives=ImageAsset.objects.ready_derivatives(shelf=OuterRef("pk")))
+        return shelves
+
+
+# Custom manager for Shelf model to use the ShelfQuerySet methods.
+class ShelfManager(BaseUserAccessManager):
+    def get_queryset(self):
+        return ShelfQuerySet(self.model, using=self._db)  # Return the custom queryset.
+
+    def with_books(self, selection=None):
+        return self.get_queryset().with_books(selection)  # Load shelves together with their books.
+
+
 # Model representing a collection of books (shelf) owned by a user.
 class Shelf(models.Model):
     user = models.ForeignKey(User, related_name="shelves", on_delete=models.CASCADE)  # Many shelves can belong to one user.
     title = models.CharField(max_length=200)  # Title of the shelf.
     description = models.TextField(blank=True, null=True)  # Optional description of the shelf.
     image = models.URLField(max_length=400, blank=True, null=True)  # Optional image associated with the shelf.
+    version = models.BigIntegerField(default=random_version, editable=False)  # Bumped on every change, keys cached fragments.
 
     def __str__(self):
         return self.title  # Returns the shelf's title as its string representation.
 
-    objects = BaseUserAccessManager()  # Use custom manager for access control.
+    objects = ShelfManager()  # Use custom manager for access control and querying.
 
 
 # Custom QuerySet for Book model with additional methods.
@@ -36,14 +89,37 @@ class BookQuerySet(QuerySet):
     def get_books_by_shelf(self, shelf):
         return self.filter(shelf=shelf)  # Filter books by their associated shelf.
 
-    def search_local(self, search_str):
-        search_str = search_str.strip()  # Clean up search string.
-        return self.filter(
-            Q(isbn__icontains=search_str)
-            | Q(title__contains=search_str)
-            | Q(author__contains=search_str)
-            | Q(release_year__contains=search_str)
-        )  # Search by ISBN, title, author, or release year.
+    def search_local(self, search_str, user=None):
+        # Search by ISBN, title, author, or release year (with optional "author:" style qualifiers),
+        # ranked by relevance where the database backend supports full-text search.
+        # Passing the owner lets the full-text index skip other users' books.
+        return get_search_backend(self.db).search(self, search_str, user=user)
+
+    def with_related(self, selection=None):
+        # Load the owner, reading progress, review and review comments (with their authors) up front,
+        # so serializing any number of books costs the same two queries. Cover derivatives come from a subquery.
+        # With a selection of fields, only the selected ones are loaded.
+        if selection is not None:
+            return self.for_selection(selection)
+        return (
+            self.select_related("user", "reading_progress", "review")
+            .prefetch_related(Prefetch("review__comments", queryset=Comment.objects.select_related("user")))
+            .annotate(image_derivatives=ImageAsset.objects.ready_derivatives(book=OuterRef("pk")))
+        )
+
+    def for_selection(self, selection):
+        # The owner is compared with the viewer and the shelf groups prefetched books, so both are always read.
+        books = only_selected(self, selection, always=("id", "user", "shelf", "version"))
+        related = [name for name in ("reading_progress", "review") if selection.expands(name)]
+        if selection.includes("user"):
+            related.append("user")
+        if related:
+            books = books.select_related(*related)
+        if selection.expands("review") and selection.nested("review").expands("comments"):
+            books = books.prefetch_related(Prefetch("review__comments", queryset=Comment.objects.select_related("user")))
+        if selection.includes("image_derivatives"):
+            books = books.annotate(image_derivatives=ImageAsset.objects.ready_derivatives(book=OuterRef("pk")))
+        return books
 
 
 # Custom manager for Book model to use the BookQuerySet methods.
@@ -54,8 +130,11 @@ class BookManager(BaseUserAccessManager):
     def get_books_by_shelf(self, shelf):
         return self.get_queryset().get_books_by_shelf(shelf)  # Get books by shelf using custom queryset method.
 
-    def search_local(self, search_str):
-        return self.get_queryset().search_local(search_str)  # Search books locally using custom queryset method.
+    def search_local(self, search_str, user=None):
+        return self.get_queryset().search_local(search_str, user=user)  # Search books locally using custom queryset method.
+
+    def with_related(self, selection=None):
+        return self.get_queryset().with_related(selection)  # Load books together with their related objects.
 
 
 # Model representing a book owned by a user.
@@ -68,12 +147,18 @@ class Book(models.Model):
     release_year = models.PositiveBigIntegerField(blank=True, null=True)  # Release year of the book.
     shelf = models.ForeignKey(Shelf, related_name="books", on_delete=models.SET_NULL, null=True)  # Book's associated shelf.
     image = models.URLField(max_length=400, blank=True, null=True)  # Optional image for the book.
+    version = models.BigIntegerField(default=random_version, editable=False)  # Bumped on every change, keys cached fragments.
 
     def __str__(self):
         return self.title  # Returns the book's title as its string representation.
 
     objects = BookManager()  # Use custom manager for access control and querying.
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "shelf"], name="book_user_shelf"),  # A user's books on one shelf.
+        ]
+
 
 # Manager to access books' data, including followed users' books.
 class BooksUserAccessManager(models.Manager):
@@ -135,6 +220,40 @@ class Review(models.Model):
     objects = BooksUserAccessManager()  # Use custom manager for access control and querying.
 
 
+# Append-only log of the pages reached in a book, one row per change of its reading progress (see core/history.py).
+class ProgressEvent(models.Model):
+    book = models.ForeignKey(Book, related_name="progress_events", on_delete=models.CASCADE)  # The book being read.
+    page = models.PositiveIntegerField()  # Page reached.
+    timestamp = models.DateTimeField(default=timezone.now)  # When the page was reached.
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["book", "-timestamp"], name="progress_event_book_time"),  # Latest event of a book.
+        ]
+
+
+# Pages read in a book per day or week, updated with every ProgressEvent, so charts never scan the events.
+class ProgressRollup(models.Model):
+    PERIOD_DAY = "D"
+    PERIOD_WEEK = "W"
+    PERIOD_CHOICES = [
+        (PERIOD_DAY, "Day"),
+        (PERIOD_WEEK, "Week"),
+    ]  # Length of the period; weeks start on Monday.
+
+    book = models.ForeignKey(Book, related_name="progress_rollups", on_delete=models.CASCADE)  # The book being read.
+    period = models.CharField(max_length=1, choices=PERIOD_CHOICES)  # Length of the period.
+    start = models.DateField()  # First day of the period.
+    pages = models.PositiveIntegerField(default=0)  # Pages read during the period.
+    page = models.PositiveIntegerField()  # Last page reached during the period.
+    events = models.PositiveIntegerField(default=0)  # Progress updates during the period.
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["book", "period", "start"], name="unique_progress_rollup"),  # Also the index for series reads.
+        ]
+
+
 # Manager for comments with access to user's and followed users' reviews.
 class CommentUserAccessManager(models.Manager):
     def for_user(self, user):
@@ -183,6 +302,52 @@ class Activity(models.Model):
 
     objects = BooksUserAccessManager()  # Use custom manager for access control and querying.
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-timestamp"], name="activity_user_timestamp"),  # Newest activities of a user.
+        ]
+
+
+# Model representing one activity in a follower's materialized feed, written when the activity is created.
+class FeedEntry(models.Model):
+    owner = models.ForeignKey(User, related_name="feed_entries", on_delete=models.CASCADE)  # User whose feed this is.
+    activity = models.ForeignKey(Activity, related_name="feed_entries", on_delete=models.CASCADE)  # Activity shown in the feed.
+    timestamp = models.DateTimeField()  # Copy of the activity's timestamp, so the feed is read from one index.
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "-timestamp"], name="feed_owner_timestamp"),  # Newest entries of one feed.
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "activity"], name="unique_feed_entry"),  # An activity appears once per feed.
+        ]
+
+
+# Per-user version stamps, bumped on every write to the user's library or feed (see core/versions.py).
+# They back the ETags of the book, shelf and activity endpoints, so an unchanged response costs one lookup.
+class LibraryVersion(models.Model):
+    user = models.OneToOneField(
+        User, related_name="library_version", on_delete=models.CASCADE, primary_key=True
+    )  # The user the stamps belong to.
+    library = models.PositiveBigIntegerField(default=0)  # Bumped on writes to the user's books, shelves, progress, reviews and comments.
+    feed = models.PositiveBigIntegerField(default=0)  # Bumped when the user's activity feed changes.
+
+
+# Per-user counters behind the reading statistics, kept up to date on every save and delete (see core/stats.py).
+class UserStat(models.Model):
+    user = models.ForeignKey(User, related_name="stats", on_delete=models.CASCADE)  # The user the counter belongs to.
+    kind = models.CharField(max_length=20)  # What is counted: total, status, finished_year or author.
+    key = models.CharField(max_length=200)  # Which one, e.g. the status or the author's name.
+    value = models.BigIntegerField(default=0)  # The count (or sum of pages).
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "kind", "key"], name="unique_user_stat"),  # One counter per key.
+        ]
+        indexes = [
+            models.Index(fields=["user", "kind", "-value"], name="user_stat_top"),  # Top authors without sorting.
+        ]
+
 
 # Model representing the relationship where a user follows other users.
 class Following(models.Model):
@@ -190,12 +355,72 @@ class Following(models.Model):
     followed_users = models.ManyToManyField(User, related_name="followers")  # Users being followed by the given user.
 
 
+# Model tracking a bulk import of books from an uploaded file, so its progress can be polled (see core/imports.py).
+class ImportJob(models.Model):
+    FORMAT_CHOICES = [
+        ("csv", "CSV"),
+        ("goodreads", "Goodreads export"),
+        ("jsonl", "JSON Lines"),
+    ]  # Supported file formats.
+
+    STATUS_PENDING = "P"
+    STATUS_RUNNING = "R"
+    STATUS_DONE = "D"
+    STATUS_FAILED = "F"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]  # Possible states of the import.
+
+    user = models.ForeignKey(User, related_name="import_jobs", on_delete=models.CASCADE)  # User importing the books.
+    file = models.FileField(upload_to="imports/", storage=private_storage)  # The uploaded file, deleted once imported.
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)  # Format of the file.
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES, default=STATUS_PENDING)  # Current state.
+    rows_processed = models.PositiveIntegerField(default=0)  # Rows read so far.
+    books_created = models.PositiveIntegerField(default=0)  # Books added to the library.
+    duplicates = models.PositiveIntegerField(default=0)  # Rows skipped because the book is already in the library.
+    invalid = models.PositiveIntegerField(default=0)  # Rows skipped because they could not be read.
+    errors = models.JSONField(default=list, blank=True)  # The first few row errors, for display.
+    created_at = models.DateTimeField(default=timezone.now)  # When the import was started.
+    finished_at = models.DateTimeField(null=True, blank=True)  # When the import finished or failed.
+
+
+# Manager for image assets, giving access to the images of a user and to their generated derivatives.
+class ImageAssetManager(models.Manager):
+    def for_user(self, user):
+        # Images of the user's books and shelves, looked up by book and by shelf (a join on either would scan).
+        return self.filter(
+            Q(book__in=Book.objects.for_user(user).values("pk")) | Q(shelf__in=Shelf.objects.for_user(user).values("pk"))
+        )
+
+    def ready_derivatives(self, **filters):
+        # Subquery selecting the derivatives of the ready image matching the filters (e.g. book=OuterRef("pk")).
+        ready = self.filter(status=ImageAsset.STATUS_READY, **filters).values("derivatives")[:1]
+        return Subquery(ready, output_field=models.JSONField())
+
+
 # Model for handling image assets linked to either a book or a shelf.
 class ImageAsset(models.Model):
     file = models.FileField(upload_to="uploads/")  # The uploaded image file.
     book = models.ForeignKey(Book, on_delete=models.CASCADE, null=True)  # Optional book associated with the image.
     shelf = models.ForeignKey(Shelf, on_delete=models.CASCADE, null=True)  # Optional shelf associated with the image.
 
+    STATUS_PENDING = "P"
+    STATUS_READY = "R"
+    STATUS_FAILED = "F"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_READY, "Ready"),
+        (STATUS_FAILED, "Failed"),
+    ]  # Progress of the resized derivatives generated from the upload (see core/images.py).
+
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES, default=STATUS_PENDING)  # Derivative status.
+    derivatives = models.JSONField(default=dict, blank=True)  # Storage paths of the derivatives by size name.
+
+    objects = ImageAssetManager()  # Use custom manager for derivative lookups.
+
     def save(self, *args, **kwargs):
         if self.book and self.shelf:
             raise ValidationError(
@@ -212,3 +437,30 @@ class ImageAsset(models.Model):
             models.UniqueConstraint(fields=["book"], name="unique_book_image"),  # Ensure uniqueness of book images.
             models.UniqueConstraint(fields=["shelf"], name="unique_shelf_image"),  # Ensure uniqueness of shelf images.
         ]
+
+
+# Model representing a queued background job, run by the run_jobs worker (see core/jobs.py).
+class Job(models.Model):
+    STATUS_QUEUED = "Q"
+    STATUS_RUNNING = "R"
+    STATUS_FAILED = "F"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_FAILED, "Failed"),
+    ]  # Finished jobs are deleted.
+
+    name = models.CharField(max_length=100)  # Name of the registered task to run.
+    payload = models.JSONField(default=dict, blank=True)  # Keyword arguments of the task.
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES, default=STATUS_QUEUED)  # Current state.
+    attempts = models.PositiveIntegerField(default=0)  # How often the job was started.
+    run_at = models.DateTimeField(default=timezone.now)  # Earliest time to (re)run the job.
+    locked_at = models.DateTimeField(null=True, blank=True)  # When a worker claimed the job.
+    locked_by = models.CharField(max_length=100, blank=True)  # Worker running the job.
+    last_error = models.TextField(blank=True)  # Error of the last failed attempt.
+    created_at = models.DateTimeField(default=timezone.now)  # When the job was queued.
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_at"], name="job_status_run_at"),  # Due jobs, oldest first.
+        ]
@@ -0,0 +1,351 @@
+import asyncio
+import hashlib
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from requests.adapters import HTTPAdapter
+
+from .catalog import lookup_isbn
+from .timing import phase
+
+logger = logging.getLogger(__name__)
+OPEN_LIBRARY_SEARCH_URL = "http://openlibrary.org/search.json"
+OPEN_LIBRARY_COVER_URL = "https://covers.openlibrary.org/b/id/{cover}-L.jpg"
+
+# Default cache policy, overridable through settings.OPEN_LIBRARY_CACHE.
+DEFAULT_CACHE_SETTINGS = {
+    "ALIAS": "openlibrary",  # Django cache alias holding the results (its MAX_ENTRIES bounds the size).
+    "ISBN_TTL": 60 * 60 * 24 * 30,  # ISBN lookups are effectively immutable.
+    "TITLE_TTL": 60 * 60,  # Free-text title searches change as the catalogue grows.
+    "STALE_TTL": 60 * 60 * 24,  # How long an expired entry may still be served while it is refreshed.
+    "REVALIDATE_LOCK_TTL": 30,  # Stops several requests from refreshing the same entry at once.
+}
+
+# Default HTTP client configuration, overridable through settings.OPEN_LIBRARY_CLIENT.
+DEFAULT_CLIENT_SETTINGS = {
+    "SEARCH_URL": OPEN_LIBRARY_SEARCH_URL,
+    "CONNECT_TIMEOUT": 3.05,  # Seconds to establish the connection.
+    "READ_TIMEOUT": 10,  # Seconds to wait for the response.
+    "POOL_SIZE": 10,  # Keep-alive connections kept open to Open Library.
+}
+
+# Default batch resolution configuration, overridable through settings.OPEN_LIBRARY_BATCH.
+DEFAULT_BATCH_SETTINGS = {
+    "MAX_ISBNS": 500,  # ISBNs accepted per batch.
+    "CONCURRENCY": 4,  # Upstream searches in flight at once, shared by all batches in the process.
+}
+
+
+class OpenLibraryError(Exception):
+    """Raised when the Open Library API could not be queried."""
+
+
+def normalize_search_params(isbn=None, title=None):
+    # ISBN takes precedence over title, matching what is sent upstream.
+    if isbn:
+        return {"isbn": re.sub(r"[^0-9Xx]", "", isbn).upper()}
+    if title:
+        return {"title": " ".join(title.lower().split())}
+    return {}
+
+
+def parse_search_response(data, isbn=None):
+    # Convert Open Library search documents into the book fields used by the frontend.
+    search_results = []
+    for doc in data.get("docs", []):
+        cover = doc.get("cover_i", None)
+        search_results.append(
+            {
+                "isbn": isbn if isbn else doc.get("isbn", [None])[0],
+                "title": doc.get("title"),
+                "author": ", ".join(doc.get("author_name", [])),
+                "total_pages": doc.get("number_of_pages_median", None),
+                "release_year": doc.get("first_publish_year"),
+                "image": cover_url(cover),
+            }
+        )
+    return search_results
+
+
+def cover_url(cover):
+    return OPEN_LIBRARY_COVER_URL.format(cover=cover) if cover else None
+
+
+# Bookkeeping for a call in flight, shared by the caller doing the work and everyone waiting on it.
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+# Coalesces concurrent calls with the same key across threads so that only one of them does the work.
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+# Coalesces concurrent coroutines with the same key on one event loop so that only one of them does the work.
+class AsyncSingleFlight:
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, func):
+        loop = asyncio.get_running_loop()
+        task = self._calls.get(key)
+        if task is None or task.get_loop() is not loop:
+            task = self._calls[key] = loop.create_task(func())
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # Shield the shared task so one cancelled waiter does not cancel it for everyone else.
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+
+# Pooled keep-alive HTTP client for the Open Library search API with timeouts and request coalescing.
+class OpenLibraryClient:
+    def __init__(self, config=None):
+        self.config = {**DEFAULT_CLIENT_SETTINGS, **getattr(settings, "OPEN_LIBRARY_CLIENT", {}), **(config or {})}
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.config["POOL_SIZE"])
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.flight = SingleFlight()
+
+    @property
+    def timeout(self):
+        return (self.config["CONNECT_TIMEOUT"], self.config["READ_TIMEOUT"])
+
+    def search(self, params):
+        # Concurrent searches for the same parameters share a single upstream request.
+        return self.flight.do(tuple(sorted(params.items())), lambda: self._fetch(params))
+
+    def _fetch(self, params):
+        try:
+            with phase("openlibrary"):
+                response = self.session.get(self.config["SEARCH_URL"], params=params, timeout=self.timeout)
+        except requests.RequestException as exc:
+            raise OpenLibraryError(str(exc)) from exc
+
+        if response.status_code != 200:
+            raise OpenLibraryError(f"Open Library responded with status {response.status_code}")
+
+        return parse_search_response(response.json(), isbn=params.get("isbn"))
+
+
+def run_in_thread(func):
+    threading.Thread(target=func, daemon=True).start()
+
+
+# Result cache in front of the Open Library search API with per-entry TTLs and stale-while-revalidate.
+class SearchResultCache:
+    def __init__(self, config=None, clock=time.time, background=run_in_thread):
+        self.config = {**DEFAULT_CACHE_SETTINGS, **getattr(settings, "OPEN_LIBRARY_CACHE", {}), **(config or {})}
+        self.clock = clock  # Time source, replaceable in tests.
+        self.background = background  # Runs revalidation off the request path.
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[self.config["ALIAS"]]
+
+    def make_key(self, params):
+        # Hash the normalized parameters so keys are safe for every cache backend.
+        raw = "&".join(f"{name}={value}" for name, value in sorted(params.items()))
+        return "openlibrary:search:" + hashlib.sha256(raw.encode()).hexdigest()
+
+    def ttl_for(self, params):
+        return self.config["ISBN_TTL"] if "isbn" in params else self.config["TITLE_TTL"]
+
+    def get(self, params):
+        # Return (results, is_stale), or (None, False) when nothing usable is cached.
+        entry = self.cache.get(self.make_key(params))
+        if entry is None:
+            return None, False
+        return entry["results"], self.clock() >= entry["fresh_until"]
+
+    def set(self, params, results):
+        ttl = self.ttl_for(params)
+        entry = {"results": results, "fresh_until": self.clock() + ttl}
+        self.cache.set(self.make_key(params), entry, timeout=ttl + self.config["STALE_TTL"])
+
+    def get_or_fetch(self, params, fetch):
+        results = self.get_cached(params, fetch)
+        if results is None:
+            results = self.fetch(params, fetch)
+        return results
+
+    def get_cached(self, params, fetch):
+        # Return the cached results, refreshing stale ones in the background, or None on a miss.
+        results, is_stale = self.get(params)
+        if results is None:
+            return None
+
+        if is_stale:
+            self._count("stale_hits")
+            self.revalidate(params, fetch)
+        else:
+            self._count("hits")
+        return results
+
+    def fetch(self, params, fetch):
+        self._count("misses")
+        results = fetch(params)
+        self.set(params, results)
+        return results
+
+    def revalidate(self, params, fetch):
+        # Only one request refreshes a stale entry; everyone else keeps serving the stale copy.
+        lock_key = self.make_key(params) + ":revalidate"
+        if not self.cache.add(lock_key, True, timeout=self.config["REVALIDATE_LOCK_TTL"]):
+            return
+
+        def refresh():
+            try:
+                self.set(params, fetch(params))
+            except OpenLibraryError:
+                logger.warning("Revalidating Open Library search %s failed", params, exc_info=True)
+            finally:
+                self.cache.delete(lock_key)
+
+        self.background(refresh)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            }
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+# Resolves batches of ISBNs, answering from the local catalog and result cache first and sending
+# the remaining ones upstream through a bounded pool of worker threads.
+class IsbnBatchResolver:
+    def __init__(self, config=None):
+        self.config = {**DEFAULT_BATCH_SETTINGS, **getattr(settings, "OPEN_LIBRARY_BATCH", {}), **(config or {})}
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.config["CONCURRENCY"], thread_name_prefix="isbn-batch"
+                )
+            return self._executor
+
+    def resolve(self, isbns):
+        # Yield (isbn, results, error) for every ISBN (normalized ISBN-13s), local answers first and
+        # upstream ones as they arrive.
+        misses = []
+        for isbn in isbns:
+            results = catalog_results(isbn)
+            if results is None:
+                results = search_cache.get_cached({"isbn": isbn}, fetch=client.search)
+            if results is None:
+                misses.append(isbn)
+            else:
+                yield isbn, results, None
+
+        futures = {
+            self.executor.submit(search_cache.get_or_fetch, {"isbn": isbn}, client.search): isbn for isbn in misses
+        }
+        try:
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except OpenLibraryError as error:
+                    yield futures[future], None, error
+        finally:
+            # Searches not started yet are dropped when the client goes away.
+            for future in futures:
+                future.cancel()
+
+
+client = OpenLibraryClient()
+search_cache = SearchResultCache()
+async_flight = AsyncSingleFlight()
+batch_resolver = IsbnBatchResolver()
+
+
+def catalog_results(isbn):
+    # Search results for an ISBN found in the local catalog, or None.
+    record = lookup_isbn(isbn)
+    if record is None:
+        return None
+    cover = record.pop("cover")
+    return [{**record, "image": cover_url(cover)}]
+
+
+def search_books(isbn=None, title=None):
+    # Search Open Library by ISBN or title, answering from the result cache whenever possible.
+    params = normalize_search_params(isbn=isbn, title=title)
+    if not params:
+        return []
+
+    # ISBNs found in the local catalog never need to go upstream.
+    if "isbn" in params:
+        results = catalog_results(params["isbn"])
+        if results is not None:
+            return results
+
+    return search_cache.get_or_fetch(params, fetch=client.search)
+
+
+async def asearch_books(isbn=None, title=None):
+    # Async variant of search_books: coroutines searching for the same thing wait on one worker thread.
+    params = normalize_search_params(isbn=isbn, title=title)
+    if not params:
+        return []
+    key = tuple(sorted(params.items()))
+    return await async_flight.do(key, lambda: sync_to_async(search_books, thread_sensitive=False)(**params))
+
+
+def resolve_isbns(isbns):
+    # Resolve normalized ISBN-13s concurrently, yielding (isbn, results, error) as each one resolves.
+    return batch_resolver.resolve(isbns)
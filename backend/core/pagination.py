@@ -0,0 +1,141 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(values):
+    # Datetimes keep their microseconds, so the next page starts exactly after the last row.
+    values = [value.isoformat() if isinstance(value, (datetime.date, datetime.datetime)) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, length):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        values = None
+    if not isinstance(values, list) or len(values) != length:
+        raise ValidationError({"cursor": "Invalid cursor."})
+    return values
+
+
+# Keyset pagination: each page continues after the ordering values of the previous page's last row,
+# so every page is one indexed range read no matter how deep it is, unlike LIMIT/OFFSET.
+# Views set keyset_ordering (the last field must be unique, usually "id") and may set page_size.
+class KeysetPagination(BasePagination):
+    ordering = ("id",)
+    page_size = DEFAULT_PAGE_SIZE
+    max_page_size = MAX_PAGE_SIZE
+    page_size_query_param = "limit"
+    cursor_query_param = "cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = getattr(view, "keyset_ordering", self.ordering)
+        self.page_size = self.get_page_size(request, getattr(view, "page_size", self.page_size))
+
+        nullable = {name: self.is_nullable(queryset, name) for name in self.field_names()}
+        queryset = queryset.order_by(*self.order_by(nullable))
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            position = decode_cursor(cursor, len(self.ordering))
+            queryset = queryset.filter(self.after(position, nullable))
+
+        # Read one extra row to know whether there is a next page.
+        page = list(queryset[: self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        page = page[: self.page_size]
+        self.next_position = [getattr(page[-1], name) for name in self.field_names()] if self.has_next else None
+        return page
+
+    def get_page_size(self, request, default):
+        limit = request.query_params.get(self.page_size_query_param)
+        if limit is None:
+            return default
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if limit <= 0:
+            raise ValidationError({self.page_size_query_param: "Must be a positive integer."})
+        return min(limit, self.max_page_size)
+
+    def field_names(self):
+        return [field.lstrip("-") for field in self.ordering]
+
+    def is_nullable(self, queryset, name):
+        try:
+            return queryset.model._meta.get_field(name).null
+        except FieldDoesNotExist:
+            return False  # Annotations are assumed to be non-null.
+
+    def order_by(self, nullable):
+        # NULLs of nullable fields come first in ascending and last in descending order, as in SQLite.
+        ordering = []
+        for field, name in zip(self.ordering, self.field_names()):
+            if not nullable[name]:
+                ordering.append(field)
+            elif field.startswith("-"):
+                ordering.append(F(name).desc(nulls_last=True))
+            else:
+                ordering.append(F(name).asc(nulls_first=True))
+        return ordering
+
+    def after(self, position, nullable):
+        # Build "comes after position" in the ordering: (a > x) OR (a = x AND (b > y OR (b = y AND ...))).
+        condition = None
+        for field, name, value in reversed(list(zip(self.ordering, self.field_names(), position))):
+            descending = field.startswith("-")
+            greater = self.beyond(name, value, descending, nullable[name])
+            if condition is None:
+                condition = greater
+            else:
+                equal = Q(**{f"{name}__isnull": True}) if value is None else Q(**{name: value})
+                condition = greater | (equal & condition)
+
+        # Bound the leading field as well, so the database can start a range scan on its index.
+        name, value = self.field_names()[0], position[0]
+        if value is not None and not nullable[name]:
+            lookup = "lte" if self.ordering[0].startswith("-") else "gte"
+            condition = Q(**{f"{name}__{lookup}": value}) & condition
+        return condition
+
+    def beyond(self, name, value, descending, nullable):
+        # Rows strictly after value in the given direction of the ordering.
+        if value is None:
+            return Q(pk__in=[]) if descending else Q(**{f"{name}__isnull": False})
+        condition = Q(**{f"{name}__lt" if descending else f"{name}__gt": value})
+        if descending and nullable:
+            condition |= Q(**{f"{name}__isnull": True})
+        return condition
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
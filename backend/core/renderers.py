@@ -0,0 +1,42 @@
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# DRF's conversions for what the encoders below do not handle themselves (Decimal, lazy strings, querysets, ...).
+# Dates and times go through it too, so they are formatted exactly like the stock JSONRenderer formats them.
+_drf_encoder = JSONEncoder()
+
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def encode_default(obj):
+    return _drf_encoder.default(obj)
+
+
+# Drop-in replacement for JSONRenderer encoding with orjson, several times faster on large pages. The output is
+# the same compact UTF-8 JSON; indented output (e.g. "Accept: application/json; indent=4") uses two spaces.
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        options = ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0)
+        content = orjson.dumps(data, default=encode_default, option=options)
+        # Like JSONRenderer, escape the line separators that JSON allows but JavaScript string literals do not.
+        if b"\xe2\x80" in content:
+            content = content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return content
+
+
+# Compact binary encoding of the same data, for clients that send "Accept: application/msgpack".
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=encode_default, use_bin_type=True, datetime=False)
@@ -0,0 +1,248 @@
+import random
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Activity, Book, Comment, Following, LibraryVersion, ReadingProgress, Review, Shelf
+
+# Default shape of the generated data, overridable through the options of the generate_scale_data command.
+DEFAULT_SCALE_DATA_SETTINGS = {
+    "USERS": 1000,
+    "BOOKS_PER_USER": 50,  # Mean library size; sizes follow a power law, so a few heavy readers own most books.
+    "MAX_BOOKS_PER_USER": 10000,
+    "COUNT_SKEW": 1.3,  # Pareto exponent of library sizes, follow and comment counts; smaller means more skew.
+    "FOLLOWS_PER_USER": 20,  # Mean number of users followed.
+    "FOLLOW_SKEW": 3.0,  # Popularity of followed users; user n is followed about n ** (1 - 1 / FOLLOW_SKEW) times less.
+    "PROGRESS_RATIO": 0.7,  # Share of books with reading progress.
+    "REVIEW_RATIO": 0.2,  # Share of books with a review.
+    "COMMENTS_PER_REVIEW": 1.5,  # Mean number of comments on a review.
+    "SHARED_RATIO": 0.5,  # Share of progress and reviews shared with followers.
+    "DAYS": 365,  # Activity timestamps fall into this many days before UNTIL.
+    "BURST_GAP": 300,  # Mean seconds between a user's activities within a burst.
+    "BURST_LENGTH": 10,  # Mean number of activities in a burst before the user goes quiet.
+    "UNTIL": None,  # Date the activity ends on (default: today); fixed together with the seed for identical rows.
+    "PREFIX": "scale",  # Usernames are the prefix followed by the user id.
+    "PASSWORD": None,  # Password of every generated user (default: none, the users cannot log in).
+    "CHUNK_SIZE": 5000,  # Rows written per transaction.
+}
+
+WORDS = (
+    "silent river shadow garden winter glass empire crown forest stone night salt letter ember harbor "
+    "orchard paper iron wolf summer lantern voyage archive mirror thunder meadow echo atlas compass kingdom"
+).split()
+STATUS_WEIGHTS = {"W": 3, "R": 2, "F": 4, "N": 1}
+
+# Models in the order their rows are written, so every row is written after the rows it references.
+WRITE_ORDER = (
+    User, LibraryVersion, Following, Following.followed_users.through, Shelf, Book, ReadingProgress, Review, Comment,
+    Activity,
+)
+
+
+# Buffers generated rows and writes them with bulk_create, all models in one transaction per chunk, so
+# memory use stays the same however many rows are generated.
+class RowWriter:
+    def __init__(self, chunk_size, using=DEFAULT_DB_ALIAS):
+        self.chunk_size = chunk_size
+        self.using = using
+        self.buffers = {model: [] for model in WRITE_ORDER}
+        self.buffered = 0
+        self.counts = {model: 0 for model in WRITE_ORDER}
+
+    def add(self, row):
+        self.buffers[type(row)].append(row)
+        self.buffered += 1
+        if self.buffered >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        with transaction.atomic(using=self.using):
+            for model, rows in self.buffers.items():
+                if rows:
+                    model.objects.using(self.using).bulk_create(rows, batch_size=self.chunk_size)
+                    self.counts[model] += len(rows)
+                    rows.clear()
+        self.buffered = 0
+
+
+# Generates a reproducible social graph with realistic skew: power-law library sizes and follower counts,
+# and activity in bursts. Rows get explicit ids, so related rows are generated without reading anything back.
+class ScaleDataGenerator:
+    def __init__(self, seed=0, config=None, using=DEFAULT_DB_ALIAS, progress=None):
+        self.config = {**DEFAULT_SCALE_DATA_SETTINGS, **(config or {})}
+        self.rng = random.Random(seed)
+        self.using = using
+        self.progress = progress  # Called with the writer after every user's library.
+        self.writer = RowWriter(self.config["CHUNK_SIZE"], using=using)
+        self.next_ids = {
+            model: (model.objects.using(using).aggregate(last=Max("pk"))["last"] or 0) + 1
+            for model in WRITE_ORDER
+            if model is not LibraryVersion
+        }
+        until = self.config["UNTIL"] or timezone.localdate()
+        self.end = timezone.make_aware(datetime.combine(until, time.min)) + timedelta(days=1)
+
+    def new_id(self, model):
+        pk = self.next_ids[model]
+        self.next_ids[model] += 1
+        return pk
+
+    def new_version(self):
+        # Drawn like models.random_version(), but from the seeded generator, so the rows are reproducible.
+        return self.rng.getrandbits(62)
+
+    def skewed(self, mean, cap):
+        # A Pareto-distributed count with the given mean (before capping).
+        alpha = self.config["COUNT_SKEW"]
+        return min(cap, int(mean * (alpha - 1) / alpha * self.rng.paretovariate(alpha)))
+
+    def popular_user(self):
+        # Low user numbers are picked far more often, which gives a power law of follower counts.
+        return self.first_user + int(self.config["USERS"] * self.rng.random() ** self.config["FOLLOW_SKEW"])
+
+    def username(self, user_id):
+        return f"{self.config['PREFIX']}{user_id}"
+
+    def run(self):
+        config = self.config
+        self.first_user = self.next_ids[User]
+        password = make_password(config["PASSWORD"]) if config["PASSWORD"] else f"{UNUSABLE_PASSWORD_PREFIX}scale"
+        start = self.end - timedelta(days=config["DAYS"])
+
+        # All users come first, so follows and comments can point at any of them.
+        for _ in range(config["USERS"]):
+            user_id = self.new_id(User)
+            joined = start + timedelta(seconds=self.rng.uniform(0, config["DAYS"] * 86400 / 2))
+            self.writer.add(User(id=user_id, username=self.username(user_id), password=password, date_joined=joined))
+            self.writer.add(LibraryVersion(user_id=user_id))
+        self.writer.flush()
+
+        for user_id in range(self.first_user, self.first_user + config["USERS"]):
+            self.generate_follows(user_id)
+            self.generate_library(user_id, start)
+            if self.progress:
+                self.progress(self.writer)
+        self.writer.flush()
+        self.reset_sequences()
+        return {model._meta.label: count for model, count in self.writer.counts.items()}
+
+    def generate_follows(self, user_id):
+        wanted = min(self.config["USERS"] - 1, self.skewed(self.config["FOLLOWS_PER_USER"], self.config["USERS"]))
+        followed = set()
+        for _ in range(wanted * 4):  # Popular users are drawn repeatedly; stop trying eventually.
+            if len(followed) >= wanted:
+                break
+            candidate = self.popular_user()
+            if candidate != user_id:
+                followed.add(candidate)
+
+        following_id = self.new_id(Following)
+        self.writer.add(Following(id=following_id, user_id=user_id))
+        through = Following.followed_users.through
+        for followed_id in sorted(followed):
+            self.writer.add(through(id=self.new_id(through), following_id=following_id, user_id=followed_id))
+
+    def generate_library(self, user_id, start):
+        config = self.config
+        rng = self.rng
+        username = self.username(user_id)
+        books = self.skewed(config["BOOKS_PER_USER"], config["MAX_BOOKS_PER_USER"])
+        shelf_ids = [self.new_id(Shelf) for _ in range(min(20, 1 + books // 100))]
+        for number, shelf_id in enumerate(shelf_ids, start=1):
+            self.writer.add(Shelf(id=shelf_id, user_id=user_id, title=f"Shelf {number}", version=self.new_version()))
+
+        clock = start + timedelta(seconds=rng.uniform(0, config["DAYS"] * 86400))
+        for _ in range(books):
+            book_id = self.new_id(Book)
+            title = f"The {rng.choice(WORDS).title()} {rng.choice(WORDS).title()}"
+            self.writer.add(Book(
+                id=book_id,
+                user_id=user_id,
+                isbn=f"979{book_id:010d}",
+                title=title,
+                author=f"Author {self.skewed(500, 100000)}",
+                total_pages=rng.randint(60, 1200),
+                release_year=rng.randint(1850, self.end.year),
+                shelf_id=rng.choice(shelf_ids) if rng.random() < 0.8 else None,
+                version=self.new_version(),
+            ))
+
+            if rng.random() < config["PROGRESS_RATIO"]:
+                clock = self.tick(clock, start)
+                progress_id = self.new_id(ReadingProgress)
+                status = rng.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()))[0]
+                self.writer.add(ReadingProgress(
+                    id=progress_id,
+                    book_id=book_id,
+                    status=status,
+                    current_page=rng.randint(1, 60) if status == "R" else 0,
+                    shared=rng.random() < config["SHARED_RATIO"],
+                    timestamp=clock,
+                ))
+                self.add_activity(
+                    clock, user_id, book_id, f"{username} started tracking their reading status for {title}",
+                    reading_progress_id=progress_id,
+                )
+
+            if rng.random() < config["REVIEW_RATIO"]:
+                clock = self.tick(clock, start)
+                review_id = self.new_id(Review)
+                self.writer.add(Review(
+                    id=review_id,
+                    book_id=book_id,
+                    text=" ".join(rng.choices(WORDS, k=rng.randint(5, 60))).capitalize() + ".",
+                    shared=rng.random() < config["SHARED_RATIO"],
+                    date=timezone.localdate(clock),
+                ))
+                self.add_activity(clock, user_id, book_id, f"{username} wrote a review for {title}", review_id=review_id)
+                for _ in range(self.skewed(config["COMMENTS_PER_REVIEW"], 500)):
+                    self.generate_comment(user_id, username, book_id, title, review_id, clock)
+
+    def generate_comment(self, owner_id, owner_name, book_id, title, review_id, reviewed):
+        commenter_id = self.popular_user()
+        commented = reviewed + timedelta(seconds=self.rng.expovariate(1 / 3600))
+        comment_id = self.new_id(Comment)
+        self.writer.add(Comment(
+            id=comment_id,
+            user_id=commenter_id,
+            book_id=book_id,
+            review_id=review_id,
+            text=" ".join(self.rng.choices(WORDS, k=self.rng.randint(3, 20))).capitalize() + ".",
+            date=timezone.localdate(commented),
+        ))
+        self.add_activity(
+            commented, commenter_id, book_id,
+            f"{self.username(commenter_id)} replied to {owner_name}'s review of {title}",
+            review_id=review_id, comment_id=comment_id,
+        )
+
+    def tick(self, clock, start):
+        # Activity comes in bursts: short gaps while a user is active, then a jump to another time.
+        if self.rng.random() < 1 / self.config["BURST_LENGTH"]:
+            return start + timedelta(seconds=self.rng.uniform(0, self.config["DAYS"] * 86400))
+        return min(self.end, clock + timedelta(seconds=self.rng.expovariate(1 / self.config["BURST_GAP"])))
+
+    def add_activity(self, timestamp, user_id, book_id, text, **related):
+        self.writer.add(Activity(
+            id=self.new_id(Activity),
+            user_id=user_id,
+            book_id=book_id,
+            text=text[:200],
+            backlink=f"/books/{book_id}",
+            timestamp=timestamp,
+            **related,
+        ))
+
+    def reset_sequences(self):
+        # Rows were written with explicit ids; databases with sequences must continue after them.
+        connection = connections[self.using]
+        statements = connection.ops.sequence_reset_sql(no_style(), list(self.next_ids))
+        if statements:
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
@@ -0,0 +1,173 @@
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+# Field qualifiers accepted in search strings (e.g. "author:tolkien year:1937") and the Book fields they map to.
+QUALIFIERS = {
+    "title": "title",
+    "author": "author",
+    "isbn": "isbn",
+    "year": "release_year",
+}
+TOKEN_RE = re.compile(r'(?:(?P<field>\w+):)?(?:"(?P<quoted>[^"]*)"|(?P<word>\S+))')
+ISBN_LIKE_RE = re.compile(r"[\dXx][\dXx\- ]{3,}")
+
+FTS_TABLE = "core_book_fts"
+# The owner's id is indexed too, so a search within one library only reads that library's postings.
+FTS_COLUMNS = ("title", "author", "isbn", "release_year", "user_id")
+FTS_WEIGHTS = (10.0, 5.0, 1.0, 1.0, 0.0)  # bm25 column weights: title matches rank above author, ISBN and year matches.
+
+
+def parse_query(search_str):
+    # Split a search string into (field, phrase) pairs. Consecutive unqualified words form one phrase,
+    # so "Title 1" still means the words next to each other, as with the previous substring search.
+    terms = []
+    for match in TOKEN_RE.finditer(search_str.strip()):
+        field = match.group("field")
+        text = match.group("quoted") if match.group("quoted") is not None else match.group("word")
+        if field and field.lower() in QUALIFIERS:
+            terms.append((QUALIFIERS[field.lower()], text))
+        else:
+            text = match.group(0) if field else text
+            if terms and terms[-1][0] is None:
+                terms[-1] = (None, f"{terms[-1][1]} {text}")
+            else:
+                terms.append((None, text))
+
+    # ISBNs are matched without their separators.
+    return [
+        (field, re.sub(r"[\- ]", "", text) if ISBN_LIKE_RE.fullmatch(text) else text)
+        for field, text in terms
+        if text.strip()
+    ]
+
+
+# Substring search with LIKE; works on every database but cannot use an index and does not rank results.
+class LikeSearchBackend:
+    def search(self, queryset, search_str, user=None):
+        terms = parse_query(search_str)
+        if not terms:
+            return queryset.none()
+
+        for field, text in terms:
+            if field is None:
+                queryset = queryset.filter(
+                    Q(isbn__icontains=text)
+                    | Q(title__icontains=text)
+                    | Q(author__icontains=text)
+                    | Q(release_year__contains=text)
+                )
+            else:
+                queryset = queryset.filter(**{f"{field}__icontains": text})
+        return queryset
+
+
+# Full-text search on SQLite using an FTS5 index over the book table, kept in sync by triggers.
+class SqliteSearchBackend:
+    def build_match(self, terms):
+        # Every term becomes a phrase whose last word is matched as a prefix, e.g. author:"tolk"*.
+        clauses = []
+        for field, text in terms:
+            words = re.findall(r"\w+", text)
+            if not words:
+                continue
+            phrase = '"{}"*'.format(" ".join(words))
+            clauses.append(f"{field}:{phrase}" if field else phrase)
+        return " AND ".join(clauses)
+
+    def search(self, queryset, search_str, user=None):
+        match = self.build_match(parse_query(search_str))
+        if not match:
+            return queryset.none()
+        if user is not None:
+            match = f'user_id:"{user.pk}" AND ({match})'
+
+        table = queryset.model._meta.db_table
+        weights = ", ".join(str(weight) for weight in FTS_WEIGHTS)
+        # The rank is an annotation rather than an extra select, so pages can be filtered on it.
+        return (
+            queryset.extra(
+                tables=[FTS_TABLE],
+                where=[f"{FTS_TABLE}.rowid = {table}.id", f"{FTS_TABLE} MATCH %s"],
+                params=[match],
+            )
+            .annotate(search_rank=RawSQL(f"bm25({FTS_TABLE}, {weights})", [], output_field=FloatField()))
+            .order_by("search_rank", "id")
+        )
+
+
+# Full-text search on PostgreSQL with a tsvector over title and author.
+class PostgresSearchBackend:
+    def search(self, queryset, search_str, user=None):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        terms = parse_query(search_str)
+        if not terms:
+            return queryset.none()
+
+        vector = SearchVector("title", weight="A", config="simple") + SearchVector("author", weight="B", config="simple")
+        full_text = [text for field, text in terms if field is None]
+        for field, text in terms:
+            if field is not None:
+                queryset = queryset.filter(**{f"{field}__icontains": text})
+        if not full_text:
+            return queryset
+
+        words = re.findall(r"\w+", " ".join(full_text))
+        isbn_or_year = Q(isbn__icontains=" ".join(full_text)) | Q(release_year__contains=" ".join(full_text))
+        query = SearchQuery(" & ".join(f"{word}:*" for word in words), search_type="raw", config="simple")
+        return (
+            queryset.annotate(search_rank=SearchRank(vector, query))
+            .filter(Q(search_rank__gt=0) | isbn_or_year)
+            .order_by("-search_rank", "id")
+        )
+
+
+DEFAULT_BACKENDS = {
+    "sqlite": SqliteSearchBackend,
+    "postgresql": PostgresSearchBackend,
+}
+
+
+def get_search_backend(using="default"):
+    # Use settings.BOOK_SEARCH_BACKEND if set, else the full-text backend for the database, else LIKE.
+    backend_path = getattr(settings, "BOOK_SEARCH_BACKEND", None)
+    if backend_path:
+        return import_string(backend_path)()
+    return DEFAULT_BACKENDS.get(connections[using].vendor, LikeSearchBackend)()
+
+
+def create_sqlite_index(schema_editor):
+    # Create the FTS5 index over core_book, the triggers that keep it in sync, and fill it.
+    # Migrations that rebuild the core_book table drop its triggers and must call this again.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    columns = ", ".join(FTS_COLUMNS)
+    new_values = ", ".join(f"new.{column}" for column in FTS_COLUMNS)
+    old_values = ", ".join(f"old.{column}" for column in FTS_COLUMNS)
+    drop_sqlite_index(schema_editor)
+    for statement in (
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({columns}, content='core_book', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON core_book BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON core_book BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE ON core_book BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END",
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+    ):
+        schema_editor.execute(statement)
+
+
+def drop_sqlite_index(schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for trigger in ("insert", "delete", "update"):
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{trigger}")
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
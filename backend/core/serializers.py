@@ -1,6 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Activity, Book, ImageAsset, Review, Shelf, ReadingProgress, Comment
+from django.core.files.storage import default_storage
+from .fieldsets import SparseFieldsMixin
+from .fragments import FragmentSerializerMixin
+from .imports import detect_format
+from .timing import TimedSerializerMixin
+from .models import Activity, Book, ImageAsset, ImportJob, Review, Shelf, ReadingProgress, Comment
 
 
 # Custom field to represent related User objects by their username.
@@ -9,8 +14,22 @@ class UsernameField(serializers.RelatedField):
         return value.username  # Return the username of the related User object.
 
 
+# Custom read-only field mapping an image's derivative size names (thumbnail, card, full) to their URLs.
+class ImageDerivativesField(serializers.ReadOnlyField):
+    def __init__(self, **kwargs):
+        kwargs.setdefault("default", None)  # Objects loaded without derivatives serialize as null.
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get("request")
+        urls = {name: default_storage.url(path) for name, path in value.items()}
+        return {name: request.build_absolute_uri(url) for name, url in urls.items()} if request else urls
+
+
 # Serializer for the User model, handles user creation and validation.
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)  # Ensure password is write-only.
 
     class Meta:
@@ -48,14 +67,16 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 # Simple serializer for ReadingProgress model with all fields.
-class ReadingProgressSerializerPlain(serializers.ModelSerializer):
+class ReadingProgressSerializerPlain(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ReadingProgress
         fields = "__all__"  # Serialize all fields of the model.
 
 
 # Simple serializer for Review model with all fields.
-class ReviewSerializerPlain(serializers.ModelSerializer):
+class ReviewSerializerPlain(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = ("comments",)
+
     class Meta:
         model = Review
         fields = "__all__"  # Serialize all fields of the model.
@@ -63,6 +84,8 @@ class ReviewSerializerPlain(serializers.ModelSerializer):
     def to_representation(self, instance):
         # Customize the representation to include comments on the review.
         representation = super().to_representation(instance)
+        if not self.wants("comments"):
+            return representation
         try:
             comments = instance.comments  # Try to get the related comments.
             representation["comments"] = CommentSerializer(comments, many=True).data
@@ -72,14 +95,19 @@ class ReviewSerializerPlain(serializers.ModelSerializer):
 
 
 # Serializer for the Book model, including related fields for reading progress and review.
-class BookSerializer(serializers.ModelSerializer):
+# Cached as a fragment per book version; everything the owner sees is cached, and other viewers get a copy without
+# the unshared parts.
+class BookSerializer(FragmentSerializerMixin, serializers.ModelSerializer):
     reading_percentage = serializers.ReadOnlyField()  # Read-only field for the calculated reading percentage.
     reading_progress = ReadingProgressSerializerPlain(required=False, allow_null=True)  # Nested serializer for reading progress.
     user = UsernameField(read_only=True)  # Use custom UsernameField for user field.
+    image_derivatives = ImageDerivativesField()  # Resized versions of an uploaded cover, once they are ready.
+    fragment_kind = "book"
+    expandable_fields = ("reading_progress", "review")
 
     class Meta:
         model = Book
-        fields = "__all__"  # Serialize all fields of the model.
+        exclude = ["version"]  # Serialize all fields of the model but the fragment cache version.
 
     def validate(self, data):
         # Set the user field to the current request user.
@@ -87,28 +115,34 @@ class BookSerializer(serializers.ModelSerializer):
         data["user"] = request_user
         return data
 
-    def to_representation(self, instance):
-        # Customize the representation to include review and filter based on user permissions.
-        representation = super().to_representation(instance)
+    def fragment(self, instance):
+        # Customize the representation to include the review.
+        representation = super().fragment(instance)
+        if not self.wants("review"):
+            return representation
         try:
             review = instance.review  # Try to include the related review.
-            representation["review"] = ReviewSerializerPlain(review).data
+            representation["review"] = ReviewSerializerPlain(review, selection=self.nested_selection("review")).data
         except Review.DoesNotExist:
             representation["review"] = None
+        return representation
 
+    def for_viewer(self, instance, representation):
+        # Filter the review and reading progress based on user permissions.
+        # Sharing is read from the instance, as the selected fields may leave out the owner and shared flags.
         request_user = self.context["request"].user
-        if representation["user"] != str(request_user):
+        if instance.user_id != request_user.pk:
             # Remove fields if the user doesn't have access.
-            if representation["review"] and not representation["review"]["shared"]:
+            if representation.get("review") and not instance.review.shared:
                 representation["review"] = None
-            if representation["reading_progress"] and not representation["reading_progress"]["shared"]:
+            if representation.get("reading_progress") and not instance.reading_progress.shared:
                 representation["reading_progress"] = None
 
         return representation
 
 
 # Simplified serializer for Book model with limited fields.
-class BookSerializerPlain(serializers.ModelSerializer):
+class BookSerializerPlain(SparseFieldsMixin, serializers.ModelSerializer):
     user = UsernameField(read_only=True)  # Use custom UsernameField for user field.
 
     class Meta:
@@ -117,7 +151,7 @@ class BookSerializerPlain(serializers.ModelSerializer):
 
 
 # Serializer for search results, representing book objects.
-class SearchResultSerializer(serializers.Serializer):
+class SearchResultSerializer(TimedSerializerMixin, serializers.Serializer):
     book = BookSerializer()  # Nested BookSerializer for the book field.
     type = serializers.CharField()  # Type of the search result (e.g., local or external).
 
@@ -131,20 +165,38 @@ class SearchResultSerializer(serializers.Serializer):
 
 
 # Simple serializer for listing users with only the username field.
-class UserListSerializer(serializers.ModelSerializer):
+class UserListSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ["username"]  # Only serialize the username field.
 
 
-# Serializer for Shelf model, including nested books.
-class ShelfSerializer(serializers.ModelSerializer):
+# Serializer for Shelf model, including nested books. The shelf's own fields are cached as a fragment per shelf
+# version, and its books are added from their own fragments, fetched together with the shelf's.
+class ShelfSerializer(FragmentSerializerMixin, serializers.ModelSerializer):
     user = UsernameField(read_only=True)  # Use custom UsernameField for user field.
-    books = BookSerializer(many=True, read_only=True)  # Nested BookSerializer for books.
+    image_derivatives = ImageDerivativesField()  # Resized versions of an uploaded shelf image, once they are ready.
+    fragment_kind = "shelf"
+    expandable_fields = ("books",)
 
     class Meta:
         model = Shelf
-        fields = "__all__"  # Serialize all fields of the model.
+        exclude = ["version"]  # Serialize all fields of the model but the fragment cache version.
+
+    def get_books_serializer(self):
+        # Nested BookSerializer for books.
+        return BookSerializer(many=True, read_only=True, context=self.context, selection=self.nested_selection("books"))
+
+    def fragment_keys(self, instance):
+        if not self.wants("books"):
+            return super().fragment_keys(instance)
+        book_keys = self.get_books_serializer().child.fragment_keys
+        return super().fragment_keys(instance) + [key for book in instance.books.all() for key in book_keys(book)]
+
+    def for_viewer(self, instance, representation):
+        if isinstance(instance, Shelf) and self.wants("books"):  # Not for the validated data of a shelf about to be saved.
+            representation["books"] = self.get_books_serializer().to_representation(instance.books.all())
+        return representation
 
     def validate(self, data):
         # Set the user field to the current request user.
@@ -154,7 +206,7 @@ class ShelfSerializer(serializers.ModelSerializer):
 
 
 # Serializer for ReadingProgress model with customized representation.
-class ReadingProgressSerializer(serializers.ModelSerializer):
+class ReadingProgressSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = ReadingProgress
         fields = "__all__"  # Serialize all fields of the model.
@@ -166,21 +218,29 @@ class ReadingProgressSerializer(serializers.ModelSerializer):
         return reading_progress
 
 
-# Serializer for Review model with customized representation.
-class ReviewSerializer(serializers.ModelSerializer):
+# Serializer for Review model with customized representation. Cached as a fragment per version of the reviewed
+# book, which changes with the review and the book's title and author.
+class ReviewSerializer(FragmentSerializerMixin, serializers.ModelSerializer):
+    fragment_kind = "review"
+    expandable_fields = ("book",)
+
     class Meta:
         model = Review
         fields = "__all__"  # Serialize all fields of the model.
 
-    def to_representation(self, instance):
+    def fragment_version(self, instance):
+        return instance.book.version
+
+    def fragment(self, instance):
         # Customize the representation to include the associated book.
-        review = super().to_representation(instance)
-        review["book"] = BookSerializerPlain(instance.book).data
+        review = super().fragment(instance)
+        if self.wants("book"):
+            review["book"] = BookSerializerPlain(instance.book, selection=self.nested_selection("book")).data
         return review
 
 
 # Serializer for Comment model, including user field.
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = UsernameField(read_only=True)  # Use custom UsernameField for user field.
 
     class Meta:
@@ -189,10 +249,13 @@ class CommentSerializer(serializers.ModelSerializer):
 
 
 # Serializer for ImageAsset model with validation to ensure proper associations.
-class ImageAssetSerializer(serializers.ModelSerializer):
+class ImageAssetSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    derivatives = ImageDerivativesField()  # URLs of the resized derivatives, once status is ready.
+
     class Meta:
         model = ImageAsset
         fields = "__all__"  # Serialize all fields of the model.
+        read_only_fields = ["status"]  # Set by the image pipeline.
 
     def validate(self, data):
         # Validate that the image is associated with either a book or a shelf, but not both.
@@ -208,10 +271,35 @@ class ImageAssetSerializer(serializers.ModelSerializer):
 
 
 # Serializer for Activity model, including user and book fields.
-class ActivitySerializer(serializers.ModelSerializer):
+class ActivitySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = UsernameField(read_only=True)  # Use custom UsernameField for user field.
     book = BookSerializerPlain()  # Nested BookSerializerPlain for the book field.
+    expandable_fields = ("book",)
 
     class Meta:
         model = Activity
         fields = "__all__"  # Serialize all fields of the model.
+
+
+# Serializer for ImportJob model; the format is detected from the file when it is not given.
+class ImportJobSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    user = UsernameField(read_only=True)  # Use custom UsernameField for user field.
+
+    class Meta:
+        model = ImportJob
+        fields = "__all__"  # Serialize all fields of the model.
+        read_only_fields = [
+            "status", "rows_processed", "books_created", "duplicates", "invalid", "errors", "created_at", "finished_at"
+        ]  # Progress is reported by the importer.
+        extra_kwargs = {
+            "format": {"required": False},
+            "file": {"write_only": True},  # Uploads are private and deleted once imported.
+        }
+
+    def validate(self, data):
+        if not data.get("format"):
+            upload = data["file"]
+            first_line = upload.readline().decode("utf-8-sig", errors="replace")
+            upload.seek(0)
+            data["format"] = detect_format(upload.name, first_line)
+        return data
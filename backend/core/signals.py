@@ -0,0 +1,114 @@
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import fragments, history, stats, versions
+from .auth import user_cache
+from .images import delete_derivatives
+from .models import Book, Comment, ImageAsset, LibraryVersion, ReadingProgress, Review, Shelf
+
+LIBRARY_MODELS = (Book, Shelf, ReadingProgress, Review, Comment, ImageAsset)
+
+
+# Drop cached user snapshots when a user changes (e.g. is deactivated or changes password) or is deleted.
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+
+
+# Give every new user version stamps, so their responses carry ETags from the start.
+@receiver(post_save, sender=User)
+def create_library_version(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        LibraryVersion.objects.get_or_create(user=instance)
+
+
+# Bump the owner's library version on every write to their library. Feeds show book titles and drop the
+# activities of deleted objects, so book changes and deletions bump the followers' feed versions too.
+def library_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    user_id = versions.owner_id(instance)
+    if user_id is not None:
+        versions.bump_library(user_id)
+        if sender is Book:
+            versions.bump_follower_feeds(user_id)
+
+
+def library_deleted(sender, instance, **kwargs):
+    user_id = versions.owner_id(instance)
+    if user_id is not None:
+        versions.bump_library(user_id)
+        versions.bump_follower_feeds(user_id)
+
+
+# Keep the reading statistics counters in step with every saved or deleted book and reading progress.
+@receiver(pre_save, sender=Book)
+@receiver(pre_save, sender=ReadingProgress)
+def remember_stats(sender, instance, raw=False, **kwargs):
+    instance._stats_previous = None if raw else stats.stored(sender, instance.pk)
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=ReadingProgress)
+def update_stats(sender, instance, raw=False, **kwargs):
+    if not raw:
+        stats.saved(instance, instance._stats_previous)
+
+
+# Deletes are counted before they happen, while a cascading book delete still leaves the progress its owner.
+@receiver(pre_delete, sender=Book)
+@receiver(pre_delete, sender=ReadingProgress)
+def remove_stats(sender, instance, **kwargs):
+    stats.deleted(instance)
+
+
+# Append every change of a reading progress to the book's reading history.
+@receiver(post_save, sender=ReadingProgress)
+def record_reading_history(sender, instance, raw=False, **kwargs):
+    if not raw and instance.book_id is not None:
+        history.record(instance)
+
+
+# Give changed books and shelves a new version, so their cached fragments are no longer read (see core/fragments.py).
+# The increment is done by the UPDATE itself, so concurrent saves never end up with the same version.
+@receiver(pre_save, sender=Book)
+@receiver(pre_save, sender=Shelf)
+def bump_fragment_version(sender, instance, raw=False, **kwargs):
+    if not raw and not instance._state.adding:
+        instance.version = F("version") + 1
+
+
+# Read back the version the UPDATE wrote, so later fragment keys of the same instance use a number, not the expression.
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=Shelf)
+def load_fragment_version(sender, instance, raw=False, **kwargs):
+    if not raw and hasattr(instance.version, "resolve_expression"):
+        instance.refresh_from_db(fields=["version"])
+
+
+@receiver([post_save, post_delete], sender=ReadingProgress)
+@receiver([post_save, post_delete], sender=Review)
+@receiver([post_save, post_delete], sender=Comment)
+@receiver([post_save, post_delete], sender=ImageAsset)
+def bump_related_fragment_version(sender, instance, raw=False, **kwargs):
+    if not raw:
+        fragments.bump_for(instance)
+
+
+# Deleting a shelf takes its books off it without saving them.
+@receiver(pre_delete, sender=Shelf)
+def bump_shelved_books(sender, instance, **kwargs):
+    Book.objects.filter(shelf=instance).update(version=F("version") + 1)
+
+
+# Remove the generated derivatives with their image; the original upload may still be linked from a book or shelf.
+@receiver(post_delete, sender=ImageAsset)
+def delete_image_derivatives(sender, instance, **kwargs):
+    delete_derivatives(instance)
+
+
+for model in LIBRARY_MODELS:
+    post_save.connect(library_saved, sender=model, dispatch_uid=f"library_saved_{model.__name__}")
+    post_delete.connect(library_deleted, sender=model, dispatch_uid=f"library_deleted_{model.__name__}")
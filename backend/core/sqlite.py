@@ -0,0 +1,39 @@
+import logging
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# PRAGMAs of the production SQLite profile, applied to every new connection and overridable through
+# settings.SQLITE_PRAGMAS. Values are trusted configuration, not user input.
+DEFAULT_SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",  # Readers and the writer no longer block each other; persisted in the file.
+    "synchronous": "NORMAL",  # Durable with WAL except for the last commits before a power loss; no fsync per commit.
+    "busy_timeout": 5000,  # Milliseconds a writer waits for the write lock before "database is locked".
+    "cache_size": -64000,  # Page cache per connection; negative values are KiB (64 MB).
+    "mmap_size": 268435456,  # Read the first 256 MB through a memory map shared by all connections.
+    "temp_store": "MEMORY",  # Sorts and temporary indexes stay in memory.
+    "wal_autocheckpoint": 1000,  # Pages in the WAL before it is copied back into the database.
+}
+
+
+def sqlite_pragmas():
+    # The PRAGMAs to apply, or {} unless the production profile is selected (settings.SQLITE_PROFILE).
+    if getattr(settings, "SQLITE_PROFILE", "default") != "production":
+        return {}
+    return {**DEFAULT_SQLITE_PRAGMAS, **getattr(settings, "SQLITE_PRAGMAS", {})}
+
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    pragmas = sqlite_pragmas()
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    logger.debug("Configured SQLite connection %s with %s", connection.alias, pragmas)
@@ -0,0 +1,137 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import ExtractYear
+
+from . import versions
+from .models import Book, ReadingProgress, UserStat
+
+TOP_AUTHORS = 10
+
+# Counters kept per user, by (kind, key):
+#   ("total", "books"), ("total", "pages"), ("total", "books_with_pages"), ("total", "pages_read")
+#   ("status", <ReadingProgress.status>), ("finished_year", <year>), ("author", <author>)
+
+
+def book_counts(user_id, author, total_pages):
+    counts = Counter({(user_id, "total", "books"): 1, (user_id, "author", author): 1})
+    if total_pages:
+        counts[(user_id, "total", "pages")] += total_pages
+        counts[(user_id, "total", "books_with_pages")] += 1
+    return counts
+
+
+def progress_counts(user_id, status, current_page, year):
+    counts = Counter({(user_id, "status", status): 1, (user_id, "total", "pages_read"): current_page})
+    if status == "F" and year is not None:
+        counts[(user_id, "finished_year", str(year))] += 1
+    return counts
+
+
+def stored(sender, pk):
+    # The saved row as it was before a change, so its old counts can be taken back; None for new rows.
+    if pk is None:
+        return None
+    if sender is Book:
+        return Book.objects.filter(pk=pk).values("user_id", "author", "total_pages").first()
+    return (
+        ReadingProgress.objects.filter(pk=pk, book__isnull=False)
+        .values("status", "current_page", "timestamp", user_id=F("book__user_id"))
+        .first()
+    )
+
+
+def finished_year(status, timestamp):
+    return timestamp.year if status == "F" and timestamp else None
+
+
+def instance_counts(instance):
+    if isinstance(instance, Book):
+        return book_counts(instance.user_id, instance.author, instance.total_pages)
+    user_id = versions.owner_id(instance)
+    if user_id is None:
+        return Counter()
+    year = finished_year(instance.status, instance.timestamp)
+    return progress_counts(user_id, instance.status, instance.current_page, year)
+
+
+def apply(counts, sign=1):
+    for (user_id, kind, key), delta in counts.items():
+        if not delta:
+            continue
+        delta *= sign
+        stats = UserStat.objects.filter(user_id=user_id, kind=kind, key=key)
+        if stats.update(value=F("value") + delta):
+            continue
+        try:
+            with transaction.atomic():
+                UserStat.objects.create(user_id=user_id, kind=kind, key=key, value=delta)
+        except IntegrityError:  # Created by a concurrent update in the meantime.
+            stats.update(value=F("value") + delta)
+
+
+def saved(instance, previous):
+    # Move the counters from what the row contributed before the save (see stored()) to what it contributes now.
+    # A finished book counts in the year its progress was last saved, like rebuild() counts it.
+    counts = instance_counts(instance)
+    if previous is not None and isinstance(instance, Book):
+        counts.subtract(book_counts(**previous))
+    elif previous is not None:
+        year = finished_year(previous["status"], previous["timestamp"])
+        counts.subtract(progress_counts(previous["user_id"], previous["status"], previous["current_page"], year))
+    apply(counts)
+
+
+def deleted(instance):
+    apply(instance_counts(instance), sign=-1)
+
+
+def rebuild(user):
+    # Recompute all counters of a user from their books and reading progress, e.g. after bulk writes.
+    rows = counter_rows(Book.objects.filter(user=user), ReadingProgress.objects.filter(book__user=user))
+    with transaction.atomic():
+        UserStat.objects.filter(user=user).delete()
+        UserStat.objects.bulk_create(
+            [UserStat(user=user, kind=kind, key=key, value=value) for kind, key, value in rows]
+        )
+
+
+def counter_rows(books, progress):
+    # (kind, key, value) of every counter of one user's books and their reading progress. Only reads the given
+    # querysets, so migrations can pass querysets of their historical models.
+    totals = books.aggregate(
+        books=Count("id"), pages=Sum("total_pages"), books_with_pages=Count("id", filter=Q(total_pages__gt=0))
+    )
+    totals["pages_read"] = progress.aggregate(pages=Sum("current_page"))["pages"]
+
+    rows = [("total", name, value or 0) for name, value in totals.items()]
+    rows += [("status", status, count) for status, count in progress.values_list("status").annotate(Count("id"))]
+    rows += [
+        ("finished_year", str(year), count)
+        for year, count in progress.filter(status="F", timestamp__isnull=False)
+        .values_list(ExtractYear("timestamp"))
+        .annotate(Count("id"))
+    ]
+    rows += [("author", author, count) for author, count in books.values_list("author").annotate(Count("id"))]
+    return rows
+
+
+def summary(user):
+    # The dashboard numbers, read from the counters in two queries however large the library is.
+    stats = UserStat.objects.filter(user=user, value__gt=0)
+    counters = {}
+    for kind, key, value in stats.exclude(kind="author").values_list("kind", "key", "value"):
+        counters.setdefault(kind, {})[key] = value
+    totals = counters.get("total", {})
+    top_authors = stats.filter(kind="author").order_by("-value", "key").values_list("key", "value")[:TOP_AUTHORS]
+
+    books_with_pages = totals.get("books_with_pages", 0)
+    return {
+        "books": totals.get("books", 0),
+        "pages_read": totals.get("pages_read", 0),
+        "average_length": round(totals.get("pages", 0) / books_with_pages, 1) if books_with_pages else None,
+        "statuses": {status: counters.get("status", {}).get(status, 0) for status, _ in ReadingProgress.STATUS_CHOICES},
+        "finished_per_year": dict(sorted(counters.get("finished_year", {}).items())),
+        "top_authors": [{"author": author, "books": count} for author, count in top_authors],
+    }
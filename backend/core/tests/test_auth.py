@@ -1,11 +1,24 @@
-from django.test import TestCase
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
 from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APITestCase
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import InvalidToken
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.request import Request
 from django.http import HttpRequest
-from core.auth import JWTAuthenticationFromCookie
+from core.auth import ExpiringLRU, JWTAuthenticationFromCookie, TokenCache, token_cache, user_cache
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
 
 
 class JWTAuthenticationFromCookieTests(TestCase):
@@ -63,3 +76,89 @@ class JWTAuthenticationFromCookieTests(TestCase):
         # Authenticate the request and expect an InvalidToken exception
         with self.assertRaises(InvalidToken):
             auth.authenticate(drf_request)
+
+
+class AuthCacheTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        user_cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    def authenticate(self, token=None):
+        request = HttpRequest()
+        request.COOKIES["access_token"] = token or self.token
+        return JWTAuthenticationFromCookie().authenticate(Request(request))
+
+    def test_warm_cache_needs_no_queries_or_signature_checks(self):
+        self.authenticate()
+
+        with mock.patch.object(JWTAuthentication, "get_validated_token") as verify, self.assertNumQueries(0):
+            user, validated_token = self.authenticate()
+        verify.assert_not_called()
+        self.assertEqual(user, self.user)
+        self.assertEqual(validated_token["user_id"], str(self.user.id))
+
+    def test_cached_user_is_a_copy(self):
+        user, _ = self.authenticate()
+        user.first_name = "Changed"
+
+        user, _ = self.authenticate()
+        self.assertEqual(user.first_name, "")
+
+    def test_deactivation_invalidates_cached_user(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_deleted_user_is_rejected(self):
+        self.authenticate()
+        self.user.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_invalid_tokens_are_not_cached(self):
+        for _ in range(2):
+            with self.assertRaises(InvalidToken):
+                self.authenticate("invalid_token")
+        self.assertIsNone(token_cache.get("invalid_token"))
+
+
+class AuthenticatedViewQueryTests(APITestCase):
+    def setUp(self):
+        token_cache.clear()
+        user_cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.cookies["access_token"] = str(RefreshToken.for_user(self.user).access_token)
+
+    def test_get_username_with_warm_cache_runs_no_queries(self):
+        self.client.get(reverse("user-name"))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("user-name"))
+        self.assertEqual(response.json(), {"username": "testuser"})
+
+
+class TokenCacheTests(SimpleTestCase):
+    def test_entries_expire_with_the_token(self):
+        clock = FakeClock()
+        cache = TokenCache(clock=clock)
+        cache.set("raw", {"exp": clock.now + 10})
+
+        self.assertEqual(cache.get("raw"), {"exp": clock.now + 10})
+        clock.now += 10
+        self.assertIsNone(cache.get("raw"))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        lru = ExpiringLRU(max_entries=2, clock=FakeClock())
+        lru.set("a", 1, expires_at=2000)
+        lru.set("b", 2, expires_at=2000)
+        lru.get("a")
+        lru.set("c", 3, expires_at=2000)
+
+        self.assertEqual((lru.get("a"), lru.get("b"), lru.get("c")), (1, None, 3))
+        self.assertEqual(len(lru), 2)
@@ -0,0 +1,25 @@
+import random
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from benchmarks.endpoints import build_cases, seed
+from core.models import Following
+
+
+class EndpointBenchmarkSeedTest(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+
+    def test_small_dataset_leaves_a_user_to_follow(self):
+        # With fewer users than follows per user, everyone would otherwise follow everyone else.
+        with override_settings(MEDIA_ROOT=self.media.name):
+            people = seed(5, 4, 10, random.Random(42))
+            for user in people:
+                self.assertEqual(Following.objects.get(user=user).followed_users.count(), 3)
+            cases = {case.name: case for case in build_cases(people[0])}
+
+        args, _ = cases["follow"].make(0)
+        self.assertTrue(User.objects.filter(username=args[0]).exclude(pk=people[0].pk).exists())
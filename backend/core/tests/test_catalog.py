@@ -0,0 +1,121 @@
+import gzip
+import json
+import os
+import tempfile
+
+import requests_mock
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from core.catalog import IsbnCatalog, CatalogError, build_catalog, lookup_isbn, parse_editions_dump
+from core.isbn import normalize_isbn
+from core.openlibrary import search_books
+
+
+def edition_line(key, **edition):
+    return "\t".join(["/type/edition", key, "1", "2020-01-01T00:00:00", json.dumps(edition)]) + "\n"
+
+
+EDITIONS = [
+    edition_line(
+        "/books/OL1M",
+        title="The Hobbit",
+        by_statement="J.R.R. Tolkien.",
+        isbn_10=["0-261-10295-6"],
+        number_of_pages=310,
+        publish_date="September 21, 1937",
+        covers=[-1, 8406786],
+    ),
+    edition_line("/books/OL2M", title="Dune", isbn_13=["9780441013593"], publish_date="2005"),
+    edition_line("/books/OL3M", title="No ISBN"),
+    "/type/author\t/authors/OL1A\t1\t2020-01-01T00:00:00\t{}\n",
+    edition_line("/books/OL4M", title="Dune (duplicate)", isbn_13=["978-0-441-01359-3"]),
+]
+
+
+class NormalizeIsbnTest(SimpleTestCase):
+    def test_isbn13(self):
+        self.assertEqual(normalize_isbn("978-0-441-01359-3"), "9780441013593")
+
+    def test_isbn10_is_converted(self):
+        self.assertEqual(normalize_isbn("0261102956"), "9780261102958")
+        self.assertEqual(normalize_isbn("080442957X"), "9780804429573")
+
+    def test_invalid(self):
+        self.assertIsNone(normalize_isbn("12345"))
+        self.assertIsNone(normalize_isbn(None))
+
+
+class IsbnCatalogTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "isbn_catalog.bin")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_lookup(self):
+        self.assertEqual(build_catalog(parse_editions_dump(EDITIONS), self.path), 2)
+        catalog = IsbnCatalog(self.path)
+
+        self.assertEqual(
+            catalog.lookup("0-261-10295-6"),
+            {
+                "isbn": "9780261102958",
+                "title": "The Hobbit",
+                "author": "J.R.R. Tolkien",
+                "total_pages": 310,
+                "release_year": 1937,
+                "cover": 8406786,
+            },
+        )
+        self.assertEqual(catalog.lookup("9780441013593")["title"], "Dune")  # First edition wins.
+        self.assertIsNone(catalog.lookup("9780000000002"))
+        self.assertIsNone(catalog.lookup("not an isbn"))
+
+    def test_external_sort_across_many_runs(self):
+        records = [(9780000000000 + (i * 7919) % 5000, f"Book {i}\x1f\x1f\x1f\x1f".encode()) for i in range(5000)]
+        self.assertEqual(build_catalog(iter(records), self.path, chunk_size=64), 5000)
+
+        catalog = IsbnCatalog(self.path)
+        self.assertEqual(len(catalog), 5000)
+        for isbn, payload in records[::97]:
+            self.assertEqual(catalog.lookup(str(isbn))["title"], payload.decode().split("\x1f")[0])
+
+    def test_empty_catalog(self):
+        build_catalog(iter([]), self.path)
+        self.assertIsNone(IsbnCatalog(self.path).lookup("9780441013593"))
+
+    def test_invalid_file(self):
+        with open(self.path, "wb") as file:
+            file.write(b"not a catalog")
+        with self.assertRaises(CatalogError):
+            IsbnCatalog(self.path)
+
+    def test_command_reads_gzipped_dump(self):
+        dump = os.path.join(self.directory.name, "editions.txt.gz")
+        with gzip.open(dump, "wt") as file:
+            file.writelines(EDITIONS)
+
+        call_command("build_isbn_catalog", dump, output=self.path, stdout=open(os.devnull, "w"))
+        self.assertEqual(IsbnCatalog(self.path).lookup("9780441013593")["title"], "Dune")
+
+    def test_search_books_uses_catalog_before_open_library(self):
+        build_catalog(parse_editions_dump(EDITIONS), self.path)
+
+        with override_settings(ISBN_CATALOG_PATH=self.path), requests_mock.Mocker() as m:
+            m.get("http://openlibrary.org/search.json", json={"docs": []})
+            results = search_books(isbn="9780261102958")
+
+            self.assertEqual(m.call_count, 0)
+            self.assertEqual(results[0]["title"], "The Hobbit")
+            self.assertEqual(results[0]["image"], "https://covers.openlibrary.org/b/id/8406786-L.jpg")
+
+    def test_rebuilt_catalog_is_picked_up(self):
+        with override_settings(ISBN_CATALOG_PATH=self.path):
+            self.assertIsNone(lookup_isbn("9780441013593"))
+
+            build_catalog(parse_editions_dump(EDITIONS[:1]), self.path)
+            self.assertIsNone(lookup_isbn("9780441013593"))
+
+            build_catalog(parse_editions_dump(EDITIONS), self.path)
+            self.assertEqual(lookup_isbn("9780441013593")["title"], "Dune")
@@ -0,0 +1,137 @@
+import csv
+import io
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.exports import BOOK_FIELDS, LibraryExporter
+from core.imports import LibraryImporter, read_text
+from core.models import Book, Comment, ImportJob, ReadingProgress, Review, Shelf
+
+
+class ExportTestMixin:
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="testpass")
+        self.friend = User.objects.create_user(username="friend", password="testpass")
+        shelf = Shelf.objects.create(user=self.user, title="Sci-Fi", description="Space")
+        Shelf.objects.create(user=self.user, title="Empty")
+        dune = Book.objects.create(user=self.user, isbn="9780441013593", title="Dune", author="Frank Herbert", shelf=shelf)
+        ReadingProgress.objects.create(book=dune, status="R", current_page=120, shared=True)
+        review = Review.objects.create(book=dune, text="Great")
+        Comment.objects.create(user=self.friend, review=review, text="Agreed")
+        Book.objects.create(user=self.user, isbn="9780141439587", title="Emma", author="Jane Austen")
+        Book.objects.create(user=self.user, isbn="9780140449136", title="Crime and Punishment", author="Fyodor Dostoevsky")
+        Book.objects.create(user=self.friend, isbn="9780451524935", title="1984", author="George Orwell")
+
+
+class LibraryExporterTest(ExportTestMixin, TestCase):
+    def test_jsonl_has_shelves_then_books(self):
+        records = [json.loads(line) for line in LibraryExporter(self.user).lines("jsonl")]
+        self.assertEqual([record["type"] for record in records], ["shelf", "shelf", "book", "book", "book"])
+        self.assertEqual(records[0], {"type": "shelf", "id": records[0]["id"], "title": "Sci-Fi", "description": "Space", "image": None})
+
+        dune = records[2]
+        self.assertEqual((dune["title"], dune["shelf"], dune["status"], dune["current_page"]), ("Dune", "Sci-Fi", "R", 120))
+        self.assertEqual((dune["review"], dune["review_shared"]), ("Great", False))
+        self.assertEqual(dune["comments"], [{"user": "friend", "text": "Agreed", "date": dune["comments"][0]["date"]}])
+        self.assertEqual(records[3]["comments"], [])
+
+    def test_books_are_read_in_chunks(self):
+        exporter = LibraryExporter(self.user, config={"CHUNK_SIZE": 2})
+        # Shelves, then two chunks of books; comments are only queried for the first, the one with a review.
+        with self.assertNumQueries(1 + 2 + 1):
+            titles = [json.loads(line)["title"] for line in exporter.lines("jsonl")]
+        self.assertEqual(titles, ["Sci-Fi", "Empty", "Dune", "Emma", "Crime and Punishment"])
+
+    def test_chunks_join_the_lines(self):
+        exporter = LibraryExporter(self.user, config={"CHUNK_SIZE": 2})
+        chunks = list(exporter.chunks("csv"))
+        self.assertEqual([chunk.count("\r\n") for chunk in chunks], [2, 2])
+        self.assertEqual("".join(chunks), "".join(exporter.lines("csv")))
+
+    def test_csv_cells_are_not_run_as_formulas(self):
+        formula = '=HYPERLINK("http://example.com","Click")'
+        book = Book.objects.create(user=self.user, isbn="9780000000002", title=formula, author="-Anonymous")
+        review = Review.objects.create(book=book, text="+1")
+        Comment.objects.create(user=User.objects.create_user(username="@mallory", password="testpass"), review=review, text="Hi")
+
+        rows = list(csv.DictReader(StringIO("".join(LibraryExporter(self.user).lines("csv")))))
+        row = rows[-1]
+        self.assertEqual((row["title"], row["author"], row["review"]), ("'" + formula, "'-Anonymous", "'+1"))
+        self.assertTrue(row["comments"].startswith("'@mallory ("))
+        self.assertEqual(rows[0]["title"], "Dune")
+
+        # Imports remove the quotes again.
+        lines = io.BytesIO("".join(LibraryExporter(self.user).lines("csv")).encode())
+        LibraryImporter(ImportJob.objects.create(user=self.friend, format="csv")).run(read_text(lines))
+        imported = Book.objects.get(user=self.friend, isbn="9780000000002")
+        self.assertEqual((imported.title, imported.author, imported.review.text), (formula, "-Anonymous", "+1"))
+
+    def test_export_can_be_imported_again(self):
+        lines = io.BytesIO("".join(LibraryExporter(self.user).lines("jsonl")).encode())
+        job = LibraryImporter(ImportJob.objects.create(user=self.friend, format="jsonl")).run(read_text(lines))
+        self.assertEqual((job.books_created, job.invalid), (3, 0))
+        dune = Book.objects.get(user=self.friend, title="Dune")
+        self.assertEqual((dune.shelf.title, dune.reading_progress.current_page, dune.review.text), ("Sci-Fi", 120, "Great"))
+
+
+class LibraryExportViewTest(ExportTestMixin, APITestCase):
+    def test_csv_download(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse("library-export", args=["csv"]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertRegex(response["Content-Disposition"], r'^attachment; filename="library-reader-[\d-]+\.csv"$')
+
+        rows = list(csv.DictReader(StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(list(rows[0]), list(BOOK_FIELDS))
+        self.assertEqual([row["title"] for row in rows], ["Dune", "Emma", "Crime and Punishment"])
+        self.assertRegex(rows[0]["comments"], r"^friend \([\d-]+\): Agreed$")
+
+    def test_jsonl_download_and_unknown_format(self):
+        self.client.force_authenticate(self.friend)
+        response = self.client.get(reverse("library-export", args=["jsonl"]))
+        records = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual([record["title"] for record in records], ["1984"])
+        self.assertEqual(self.client.get(reverse("library-export", args=["xml"])).status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_asgi_download_is_streamed_asynchronously(self):
+        # Django would collect a synchronous body into a list first, so ASGI requests get an async one.
+        self.async_client.cookies["access_token"] = str(RefreshToken.for_user(self.friend).access_token)
+        response = await self.async_client.get(reverse("library-export", args=["jsonl"]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.is_async)
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual([json.loads(line)["title"] for line in body.splitlines()], ["1984"])
+
+    def test_requires_authentication(self):
+        response = self.client.get(reverse("library-export", args=["jsonl"]))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ExportLibraryCommandTest(ExportTestMixin, TestCase):
+    def test_single_library_to_stdout(self):
+        output = StringIO()
+        call_command("export_library", "reader", "--format", "csv", stdout=output)
+        self.assertEqual(len(list(csv.DictReader(StringIO(output.getvalue())))), 3)
+
+    def test_all_libraries_to_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            call_command("export_library", "--output", directory, stdout=StringIO())
+            files = sorted(path.name.split("-")[1] for path in Path(directory).iterdir())
+            self.assertEqual(files, ["friend", "reader"])
+
+        with self.assertRaises(CommandError):
+            call_command("export_library", stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command("export_library", "nobody", stdout=StringIO())
@@ -0,0 +1,128 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core import feed, jobs
+from core.models import Activity, Book, FeedEntry, Following
+
+
+class FeedTestMixin:
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", password="testpass")
+        self.follower = User.objects.create_user(username="follower", password="testpass")
+        self.stranger = User.objects.create_user(username="stranger", password="testpass")
+        self.book = Book.objects.create(user=self.author, isbn="1234567890123", title="Book", author="Someone")
+
+    def follow(self, user, target):
+        following, _ = Following.objects.get_or_create(user=user)
+        following.followed_users.add(target)
+
+    def create_activity(self, text="activity"):
+        return feed.create_activity(user=self.author, book=self.book, text=text, backlink=f"/books/{self.book.id}")
+
+
+class FanOutTest(FeedTestMixin, TestCase):
+    def test_activity_is_delivered_to_followers_only(self):
+        self.follow(self.follower, self.author)
+        activity = self.create_activity()
+
+        self.assertTrue(FeedEntry.objects.filter(owner=self.follower, activity=activity).exists())
+        self.assertFalse(FeedEntry.objects.filter(owner=self.stranger).exists())
+        self.assertEqual(FeedEntry.objects.get(owner=self.follower).timestamp, activity.timestamp)
+
+    @override_settings(FEED_MAX_LENGTH=3, FEED_TRIM_SLACK=0)
+    def test_feed_is_trimmed_to_max_length(self):
+        self.follow(self.follower, self.author)
+        activities = [self.create_activity(text=str(i)) for i in range(5)]
+
+        kept = FeedEntry.objects.filter(owner=self.follower).values_list("activity_id", flat=True)
+        self.assertEqual(set(kept), {activity.id for activity in activities[2:]})
+
+    @override_settings(FEED_MAX_LENGTH=3, FEED_TRIM_SLACK=2)
+    def test_feeds_are_trimmed_once_past_the_slack(self):
+        followers = [User.objects.create_user(username=f"reader{i}", password="testpass") for i in range(5)]
+        for follower in followers:
+            self.follow(follower, self.author)
+        for i in range(5):
+            self.create_activity(text=str(i))
+        self.assertEqual(FeedEntry.objects.filter(owner=followers[0]).count(), 5)
+
+        # However many followers there are, a feed that is not overflowing costs one counting query.
+        with self.assertNumQueries(1):
+            feed.trim([follower.pk for follower in followers])
+
+        activity = self.create_activity(text="5")
+        for follower in followers:
+            kept = FeedEntry.objects.filter(owner=follower).order_by("timestamp").values_list("activity_id", flat=True)
+            self.assertEqual(len(kept), 3)
+            self.assertEqual(kept[2], activity.id)
+
+    def test_backfill_and_remove(self):
+        activity = self.create_activity()
+
+        feed.backfill(self.follower, self.author)
+        feed.backfill(self.follower, self.author)  # Backfilling twice does not duplicate entries.
+        self.assertEqual(list(FeedEntry.objects.filter(owner=self.follower).values_list("activity_id", flat=True)), [activity.id])
+
+        feed.remove(self.follower, self.author)
+        self.assertFalse(FeedEntry.objects.filter(owner=self.follower).exists())
+
+    def test_rebuild_command(self):
+        activity = self.create_activity()
+        self.follow(self.follower, self.author)
+        FeedEntry.objects.all().delete()
+
+        call_command("backfill_feed", "follower", stdout=StringIO())
+        self.assertEqual(list(FeedEntry.objects.filter(owner=self.follower).values_list("activity_id", flat=True)), [activity.id])
+
+
+class ActivityListViewTest(FeedTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("activity-list")
+        self.client.force_authenticate(user=self.follower)
+
+    def test_following_backfills_and_unfollowing_removes(self):
+        self.create_activity(text="before following")
+
+        self.client.post(reverse("user-follow", args=["author"]))
+        response = self.client.get(self.url)
+        self.assertEqual([activity["text"] for activity in response.data["results"]], ["before following"])
+
+        self.client.delete(reverse("user-follow", args=["author"]))
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["results"], [])
+
+    def test_feed_is_newest_first_and_limited(self):
+        self.follow(self.follower, self.author)
+        for i in range(7):
+            activity = self.create_activity(text=str(i))
+            FeedEntry.objects.filter(activity=activity).update(timestamp=timezone.now() + timedelta(minutes=i))
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([activity["text"] for activity in response.data["results"]], ["6", "5", "4", "3", "2"])
+
+    def test_feed_is_read_with_one_query(self):
+        self.follow(self.follower, self.author)
+        for i in range(10):
+            self.create_activity(text=str(i))
+
+        with self.assertNumQueries(2):  # The feed version for the ETag, then the feed itself.
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data["results"]), 5)
+
+    def test_creating_reading_progress_reaches_followers(self):
+        self.follow(self.follower, self.author)
+        self.client.force_authenticate(user=self.author)
+        self.client.post(reverse("reading-list-create"), {"book": self.book.id, "status": "R"}, format="json")
+        self.assertFalse(Activity.objects.exists())  # The activity is created by a background job.
+
+        jobs.run_pending()
+        self.assertEqual(Activity.objects.filter(feed_entries__owner=self.follower).count(), 1)
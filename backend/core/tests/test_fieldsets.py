@@ -0,0 +1,120 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from core.fieldsets import Selection
+from core.fragments import fragment_cache
+from core.models import Activity, Book, Comment, FeedEntry, ReadingProgress, Review, Shelf
+
+
+class SelectionTest(SimpleTestCase):
+    def selection(self, **params):
+        return Selection.from_request(Request(APIRequestFactory().get("/", params)))
+
+    def test_parse_fields_and_expand(self):
+        self.assertIsNone(self.selection())
+
+        selection = self.selection(fields="id, title,books.title", expand="books.review.comments")
+        self.assertEqual(str(selection), "books,id,title;books(title;review(*;comments(*)))")
+        self.assertTrue(selection.includes("title"))
+        self.assertFalse(selection.includes("author"))
+        self.assertTrue(selection.expands("books"))
+        self.assertFalse(selection.nested("books").includes("author"))
+        self.assertTrue(selection.nested("books").nested("review").includes("text"))
+
+        only_expand = self.selection(expand="review")
+        self.assertTrue(only_expand.includes("author"))
+        self.assertTrue(only_expand.expands("review"))
+        self.assertFalse(only_expand.expands("reading_progress"))
+        self.assertNotEqual(only_expand.digest, selection.digest)
+        self.assertEqual(only_expand.digest, self.selection(expand="review").digest)
+
+
+class SparseFieldsViewTest(APITestCase):
+    def setUp(self):
+        fragment_cache.cache.clear()
+        self.user = User.objects.create_user(username="reader", password="testpass")
+        self.friend = User.objects.create_user(username="friend", password="testpass")
+        self.shelf = Shelf.objects.create(user=self.user, title="Science fiction")
+        self.dune = Book.objects.create(user=self.user, isbn="9780441013593", title="Dune", author="Frank Herbert", shelf=self.shelf)
+        ReadingProgress.objects.create(book=self.dune, status="R", current_page=120, shared=True)
+        self.review = Review.objects.create(book=self.dune, text="Great")
+        Comment.objects.create(user=self.friend, review=self.review, text="Agreed")
+        self.client.force_authenticate(self.user)
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data, " ".join(query["sql"] for query in queries.captured_queries)
+
+    def test_book_fields_are_neither_queried_nor_serialized(self):
+        data, sql = self.get(reverse("book-list-create"), fields="id,title,author,image")
+        self.assertEqual(data["results"], [{"id": self.dune.id, "title": "Dune", "author": "Frank Herbert", "image": None}])
+        for skipped in ("core_review", "core_readingprogress", "core_comment", "core_imageasset", '"isbn"'):
+            self.assertNotIn(skipped, sql)
+
+        data, sql = self.get(reverse("book-list-create"), fields="title", expand="review.comments")
+        book = data["results"][0]
+        self.assertEqual(list(book), ["title", "review"])
+        self.assertEqual(book["review"]["comments"][0]["text"], "Agreed")
+        self.assertNotIn("core_readingprogress", sql)
+
+        # Without either parameter, books are served in full as before.
+        data, _ = self.get(reverse("book-list-create"))
+        self.assertEqual(data["results"][0]["reading_progress"]["current_page"], 120)
+        self.assertEqual(data["results"][0]["review"]["comments"][0]["text"], "Agreed")
+
+    def test_unshared_parts_stay_hidden_from_other_users(self):
+        self.client.force_authenticate(self.friend)
+        data, _ = self.get(reverse("book-detail", args=[self.dune.id]), fields="id,review.text,reading_progress.current_page")
+        self.assertEqual(data, {"id": self.dune.id, "review": None, "reading_progress": {"current_page": 120}})
+
+    def test_shelves_embed_books_only_when_expanded(self):
+        data, sql = self.get(reverse("shelf-list-create"), fields="id,title")
+        self.assertEqual(data["results"], [{"id": self.shelf.id, "title": "Science fiction"}])
+        self.assertNotIn("core_book", sql)
+
+        data, _ = self.get(reverse("shelf-detail", args=[self.shelf.id]), fields="title,books.title,books.review.text")
+        self.assertEqual(data, {"title": "Science fiction", "books": [{"title": "Dune", "review": {"text": "Great"}}]})
+
+    def test_reviews_and_activities(self):
+        data, sql = self.get(reverse("review-list-create"), username="reader", fields="id,text")
+        self.assertEqual(data["results"], [{"id": self.review.id, "text": "Great"}])
+        self.assertNotIn("auth_user", sql.split("core_review", 1)[1])
+
+        data, _ = self.get(reverse("review-detail", args=[self.review.id]), fields="text", expand="book")
+        self.assertEqual(data["book"], {"id": self.dune.id, "title": "Dune", "user": "reader", "author": "Frank Herbert"})
+
+        activity = Activity.objects.create(user=self.friend, book=self.dune, text="commented")
+        FeedEntry.objects.create(owner=self.user, activity=activity, timestamp=activity.timestamp)
+        data, _ = self.get(reverse("activity-list"), fields="text,book.title")
+        self.assertEqual(data["results"], [{"text": "commented", "book": {"title": "Dune"}}])
+
+    def test_review_and_activity_columns_are_deferred(self):
+        data, sql = self.get(reverse("review-list-create"), username="reader", fields="id")
+        self.assertEqual(data["results"], [{"id": self.review.id}])
+        for skipped in ('"core_review"."text"', '"core_review"."shared"', '"core_book"."title"', '"core_book"."isbn"'):
+            self.assertNotIn(skipped, sql)
+
+        data, sql = self.get(reverse("review-list-create"), username="reader", fields="text,book.title")
+        self.assertEqual(data["results"], [{"text": "Great", "book": {"title": "Dune"}}])
+        for skipped in ('"core_review"."shared"', '"core_book"."author"', '"core_book"."isbn"'):
+            self.assertNotIn(skipped, sql)
+
+        activity = Activity.objects.create(user=self.friend, book=self.dune, text="commented", backlink="http://testserver/")
+        FeedEntry.objects.create(owner=self.user, activity=activity, timestamp=activity.timestamp)
+        data, sql = self.get(reverse("activity-list"), fields="id")
+        self.assertEqual(data["results"], [{"id": activity.id}])
+        for skipped in ('"core_activity"."text"', '"core_activity"."backlink"', '"core_activity"."book_id"', "core_book"):
+            self.assertNotIn(skipped, sql)
+
+        data, sql = self.get(reverse("activity-list"), fields="user,book.user")
+        self.assertEqual(data["results"], [{"user": "friend", "book": {"user": "reader"}}])
+        for skipped in ('"core_activity"."text"', '"core_book"."title"', '"auth_user"."email"'):
+            self.assertNotIn(skipped, sql)
@@ -0,0 +1,140 @@
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core.fragments import fragment_cache
+from core.models import Book, Comment, Following, ReadingProgress, Review, Shelf
+
+
+class FragmentCacheTestMixin:
+    def setUp(self):
+        fragment_cache.cache.clear()
+        self.user = User.objects.create_user(username="reader", password="testpass")
+        self.shelf = Shelf.objects.create(user=self.user, title="Science fiction")
+        self.dune = Book.objects.create(user=self.user, isbn="9780441013593", title="Dune", author="Frank Herbert", shelf=self.shelf)
+        self.emma = Book.objects.create(user=self.user, isbn="9780141439587", title="Emma", author="Jane Austen")
+        self.review = Review.objects.create(book=self.dune, text="Great")
+        self.client.force_authenticate(self.user)
+
+    def lookups(self, url, **params):
+        # GET the url, returning the response and the fragment cache hits and misses it caused.
+        before = fragment_cache.stats()
+        response = self.client.get(url, params)
+        after = fragment_cache.stats()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, after["hits"] - before["hits"], after["misses"] - before["misses"]
+
+
+class FragmentCacheTest(FragmentCacheTestMixin, APITestCase):
+    def test_lists_are_assembled_from_cached_fragments(self):
+        url = reverse("book-list-create")
+        first, hits, misses = self.lookups(url)
+        self.assertEqual((hits, misses), (0, 2))
+
+        with mock.patch.object(fragment_cache.cache, "get_many", wraps=fragment_cache.cache.get_many) as get_many:
+            second, hits, misses = self.lookups(url)
+        self.assertEqual((hits, misses), (2, 0))
+        self.assertEqual(get_many.call_count, 1)
+        self.assertEqual(second.content, first.content)
+        self.assertGreater(fragment_cache.stats()["hit_ratio"], 0)
+
+    def test_changes_are_served_at_once(self):
+        url = reverse("book-list-create")
+        self.lookups(url)
+
+        self.dune.title = "Dune Messiah"
+        self.dune.save()
+        ReadingProgress.objects.create(book=self.emma, status="R", current_page=10)
+        Comment.objects.create(user=self.user, review=self.review, text="Agreed")
+
+        response, hits, misses = self.lookups(url)
+        self.assertEqual((hits, misses), (0, 2))
+        books = {book["id"]: book for book in response.data["results"]}
+        self.assertEqual(books[self.dune.id]["title"], "Dune Messiah")
+        self.assertEqual(books[self.dune.id]["review"]["comments"][0]["text"], "Agreed")
+        self.assertEqual(books[self.emma.id]["reading_progress"]["current_page"], 10)
+
+    def test_writes_answer_with_what_they_saved(self):
+        url = reverse("book-detail", args=[self.dune.id])
+        self.lookups(url)
+        response = self.client.patch(url, {"title": "Children of Dune"})
+        self.assertEqual(response.data["title"], "Children of Dune")
+        self.assertEqual(self.lookups(url)[0].data["title"], "Children of Dune")
+
+    def test_unshared_parts_are_hidden_from_other_viewers(self):
+        ReadingProgress.objects.create(book=self.dune, status="R", current_page=10, shared=True)
+        url = reverse("book-detail", args=[self.dune.id])
+        self.assertEqual(self.lookups(url)[0].data["review"]["text"], "Great")
+
+        follower = User.objects.create_user(username="follower", password="testpass")
+        Following.objects.create(user=follower).followed_users.add(self.user)
+        self.client.force_authenticate(follower)
+        response, hits, misses = self.lookups(url)
+        self.assertEqual((hits, misses), (1, 0))
+        self.assertIsNone(response.data["review"])
+        self.assertEqual(response.data["reading_progress"]["current_page"], 10)
+
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.lookups(url)[0].data["review"]["text"], "Great")
+
+    def test_shelves_and_their_books_are_fetched_together(self):
+        url = reverse("shelf-list-create")
+        self.lookups(reverse("book-list-create"))  # Caches the books.
+
+        with mock.patch.object(fragment_cache.cache, "get_many", wraps=fragment_cache.cache.get_many) as get_many:
+            response, hits, misses = self.lookups(url)
+        self.assertEqual(get_many.call_count, 1)
+        self.assertEqual((hits, misses), (1, 1))
+        self.assertEqual([book["title"] for book in response.data["results"][0]["books"]], ["Dune"])
+
+        self.shelf.delete()
+        response, hits, misses = self.lookups(reverse("book-detail", args=[self.dune.id]))
+        self.assertEqual(misses, 1)
+        self.assertIsNone(response.data["shelf"])
+
+    def test_reviews_follow_their_book(self):
+        url = reverse("review-list-create")
+        self.assertEqual(self.lookups(url)[0].data["results"][0]["book"]["title"], "Dune")
+        self.dune.title = "Dune Messiah"
+        self.dune.save()
+        response, hits, misses = self.lookups(url)
+        self.assertEqual((hits, misses), (0, 1))
+        self.assertEqual(response.data["results"][0]["book"]["title"], "Dune Messiah")
+
+    def test_saved_instances_hold_their_new_version(self):
+        version = Book.objects.get(pk=self.dune.pk).version
+        self.dune.save()
+        self.assertEqual(self.dune.version, version + 1)
+        self.review.book.save()  # Another instance of the same book.
+        self.assertEqual(self.review.book.version, version + 2)
+        self.assertEqual(Book.objects.get(pk=self.dune.pk).version, version + 2)
+
+    def test_disabled(self):
+        with mock.patch.dict(fragment_cache.config, {"ENABLED": False}):
+            self.assertEqual(self.lookups(reverse("book-list-create"))[1:], (0, 0))
+
+
+class FileBasedFragmentCacheTest(FragmentCacheTestMixin, APITestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache_settings = override_settings(CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "fragments": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": directory.name},
+        })
+        cache_settings.enable()
+        self.addCleanup(cache_settings.disable)
+        super().setUp()
+
+    def test_fragments_survive_in_files(self):
+        url = reverse("shelf-list-create")
+        first, hits, misses = self.lookups(url)
+        self.assertEqual((hits, misses), (0, 2))
+        second, hits, misses = self.lookups(url)
+        self.assertEqual((hits, misses), (2, 0))
+        self.assertEqual(second.content, first.content)
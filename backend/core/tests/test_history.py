@@ -0,0 +1,111 @@
+import io
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core import history
+from core.imports import LibraryImporter, read_text
+from core.models import Book, Following, ImportJob, ProgressEvent, ProgressRollup, ReadingProgress
+
+NOW = timezone.make_aware(datetime(2024, 6, 12, 20, 0))  # A Wednesday.
+
+
+def at(moment):
+    return mock.patch("django.utils.timezone.now", return_value=moment)
+
+
+class HistoryTestMixin:
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="testpass")
+        self.book = Book.objects.create(user=self.user, isbn="9780441013593", title="Dune", author="Frank Herbert", total_pages=400)
+
+    def read(self, progress, page, moment):
+        with at(moment):
+            progress.current_page = page
+            progress.save()
+
+
+class RecordTest(HistoryTestMixin, TestCase):
+    def test_page_changes_are_recorded_and_rolled_up(self):
+        with at(NOW - timedelta(days=2)):
+            progress = ReadingProgress.objects.create(book=self.book, status="R", current_page=10)
+        self.read(progress, 40, NOW - timedelta(days=1))
+        self.read(progress, 40, NOW - timedelta(days=1))  # Unchanged page: no event.
+        self.read(progress, 70, NOW)
+        self.read(progress, 65, NOW)  # Going back counts no pages.
+
+        self.assertEqual(list(ProgressEvent.objects.order_by("id").values_list("page", flat=True)), [10, 40, 70, 65])
+        days = ProgressRollup.objects.filter(period=ProgressRollup.PERIOD_DAY).order_by("start")
+        self.assertEqual(list(days.values_list("pages", "page", "events")), [(0, 10, 1), (30, 40, 1), (30, 65, 2)])
+        week = ProgressRollup.objects.get(period=ProgressRollup.PERIOD_WEEK)
+        self.assertEqual(week.start, NOW.date() - timedelta(days=2))  # Monday.
+        self.assertEqual((week.pages, week.page, week.events), (60, 65, 4))
+
+    def test_series_is_read_from_rollups(self):
+        with at(NOW - timedelta(days=20)):
+            progress = ReadingProgress.objects.create(book=self.book, status="R", current_page=0)
+        self.read(progress, 50, NOW - timedelta(days=10))
+        self.read(progress, 100, NOW - timedelta(days=1))
+
+        with at(NOW), self.assertNumQueries(3):
+            result = history.series(self.book, days=14)
+
+        self.assertEqual(result["period"], "day")
+        self.assertEqual(len(result["series"]), 14)
+        self.assertEqual(result["series"][0], {"start": "2024-05-30", "pages": 0, "page": 0})
+        self.assertEqual(result["series"][3], {"start": "2024-06-02", "pages": 50, "page": 50})
+        self.assertEqual(result["series"][-2], {"start": "2024-06-11", "pages": 50, "page": 100})
+        self.assertEqual(result["series"][-1]["page"], 100)
+        self.assertEqual(result["velocity"], round(100 / 14, 2))
+        self.assertEqual(result["projected_finish"], "2024-07-24")  # 300 pages left at 100 pages per 14 days.
+
+        with at(NOW):
+            weekly = history.series(self.book, days=365)
+        self.assertEqual(weekly["period"], "week")
+        self.assertEqual(sum(point["pages"] for point in weekly["series"]), 100)
+
+    def test_imported_progress_starts_the_history(self):
+        job = ImportJob.objects.create(user=self.user, format="csv")
+        LibraryImporter(job).run(read_text(io.BytesIO(b"title,author,status,current_page\nEmma,Jane Austen,reading,120\n")))
+
+        event = ProgressEvent.objects.get(book__title="Emma")
+        self.assertEqual(event.page, 120)
+        self.assertEqual(ProgressRollup.objects.filter(book__title="Emma", pages=0, page=120).count(), 2)
+
+
+class ReadingHistoryViewTest(HistoryTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.progress = ReadingProgress.objects.create(book=self.book, status="R", current_page=0)
+        self.read(self.progress, 30, timezone.now())
+        self.url = reverse("reading-history", args=[self.book.id])
+
+    def test_owner_sees_history(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, {"days": 7})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["current_page"], 30)
+        self.assertEqual(len(response.data["series"]), 7)
+        self.assertEqual(response.data["series"][-1]["pages"], 30)
+
+    def test_followers_see_shared_history_only(self):
+        follower = User.objects.create_user(username="follower", password="testpass")
+        Following.objects.create(user=follower).followed_users.add(self.user)
+        self.client.force_authenticate(follower)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+
+        self.progress.shared = True
+        self.progress.save()
+        self.assertEqual(self.client.get(self.url, {"period": "week"}).data["period"], "week")
+
+    def test_invalid_parameters(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(self.url, {"period": "month"}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {"days": "soon"}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {"days": "-3"}).status_code, status.HTTP_400_BAD_REQUEST)
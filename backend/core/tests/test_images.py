@@ -0,0 +1,115 @@
+import io
+import os
+import tempfile
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core import jobs
+from core.images import render_derivatives
+from core.models import Book, ImageAsset, Shelf
+
+SIZES = {"thumbnail": 20, "card": 60, "full": 160}
+
+
+def make_jpeg(width, height, orientation=None):
+    image = Image.new("RGB", (width, height), "red")
+    exif = Image.Exif()
+    exif[0x010F] = "Camera maker"
+    if orientation:
+        exif[0x0112] = orientation
+    output = io.BytesIO()
+    image.save(output, format="JPEG", exif=exif)
+    return output.getvalue()
+
+
+class RenderDerivativesTest(SimpleTestCase):
+    def render(self, content, **kwargs):
+        options = {"sizes": SIZES, "image_format": "WEBP", "quality": 80, "max_pixels": 10_000_000, **kwargs}
+        return {name: Image.open(io.BytesIO(data)) for name, data in render_derivatives(io.BytesIO(content), **options).items()}
+
+    def test_sizes_orientation_and_metadata(self):
+        rendered = self.render(make_jpeg(300, 100, orientation=6))  # Rotated 90 degrees by the camera.
+
+        self.assertEqual(rendered["full"].size, (53, 160))
+        self.assertEqual(rendered["card"].size, (20, 60))
+        self.assertEqual(rendered["thumbnail"].size, (7, 20))
+        for image in rendered.values():
+            self.assertEqual(image.format, "WEBP")
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_small_images_are_not_enlarged(self):
+        self.assertEqual(self.render(make_jpeg(40, 30))["full"].size, (40, 30))
+
+    def test_oversized_and_invalid_images(self):
+        with self.assertRaises(ValueError):
+            self.render(make_jpeg(300, 100), max_pixels=1000)
+        with self.assertRaises(OSError):
+            self.render(b"not an image")
+
+
+class ImagePipelineTest(APITestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        settings_override = override_settings(MEDIA_ROOT=self.media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(self.media.cleanup)
+
+        self.user = User.objects.create_user(username="reader", password="testpass")
+        self.book = Book.objects.create(user=self.user, isbn="1234567890123", title="Book", author="Someone")
+        self.shelf = Shelf.objects.create(user=self.user, title="Shelf")
+        self.client.force_authenticate(user=self.user)
+
+    def upload(self, content, **target):
+        response = self.client.post(
+            reverse("upload"), {"file": SimpleUploadedFile("cover.jpg", content), **target}, format="multipart"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["status"], ImageAsset.STATUS_PENDING)
+        self.assertEqual(jobs.run_pending(), 1)  # Process the upload like a job worker would.
+        return ImageAsset.objects.get(pk=response.data["id"])
+
+    def test_upload_generates_derivatives(self):
+        asset = self.upload(make_jpeg(2000, 1000), book=self.book.id)
+
+        self.assertEqual(asset.status, ImageAsset.STATUS_READY)
+        self.assertEqual(set(asset.derivatives), {"thumbnail", "card", "full"})
+        self.assertEqual(Image.open(default_storage.open(asset.derivatives["card"])).size, (600, 300))
+
+        response = self.client.get(reverse("upload-detail", args=[asset.id]))
+        self.assertTrue(response.data["derivatives"]["thumbnail"].endswith(f"/media/uploads/derivatives/{asset.id}/thumbnail.webp"))
+
+        response = self.client.get(reverse("book-detail", args=[self.book.id]))
+        self.assertEqual(response.data["image_derivatives"]["full"], f"http://testserver/media/{asset.derivatives['full']}")
+        response = self.client.get(reverse("shelf-list-create"))
+        self.assertIsNone(response.data["results"][0]["image_derivatives"])
+
+    def test_shelf_images(self):
+        asset = self.upload(make_jpeg(100, 100), shelf=self.shelf.id)
+        response = self.client.get(reverse("shelf-detail", args=[self.shelf.id]))
+        self.assertEqual(set(response.data["image_derivatives"]), set(asset.derivatives))
+
+    def test_invalid_upload_is_marked_failed(self):
+        with self.assertLogs("core.images", "WARNING"):
+            asset = self.upload(b"file_content", book=self.book.id)
+        self.assertEqual(asset.status, ImageAsset.STATUS_FAILED)
+        self.assertIsNone(self.client.get(reverse("book-detail", args=[self.book.id])).data["image_derivatives"])
+
+    def test_replacing_an_image_deletes_old_derivatives(self):
+        old = self.upload(make_jpeg(100, 100), book=self.book.id)
+        self.upload(make_jpeg(100, 100), book=self.book.id)
+
+        self.assertFalse(ImageAsset.objects.filter(pk=old.pk).exists())
+        for path in old.derivatives.values():
+            self.assertFalse(os.path.exists(os.path.join(self.media.name, path)))
+
+    def test_other_users_images_are_hidden(self):
+        asset = self.upload(make_jpeg(100, 100), book=self.book.id)
+        self.client.force_authenticate(user=User.objects.create_user(username="other", password="testpass"))
+        response = self.client.get(reverse("upload-detail", args=[asset.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,198 @@
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core import jobs
+from core.imports import LibraryImporter, detect_format, parse_rows, read_text
+from core.models import Activity, Book, ImportJob, ReadingProgress, Review, Shelf
+
+CSV = (
+    "title,author,isbn,total_pages,release_year,shelf,status,current_page,review\n"
+    "Dune,Frank Herbert,0441013597,412,1965,Sci-Fi,finished,412,Great\n"
+    "Emma,Jane Austen,,,1815,,want to read,,\n"
+)
+GOODREADS = (
+    "Book Id,Title,Author,ISBN,ISBN13,Number of Pages,Year Published,Original Publication Year,Bookshelves,Exclusive Shelf,My Review\n"
+    '1,Dune,Frank Herbert,"=""0441013597""","=""9780441013593""",412,2005,1965,"favourites, read",read,Loved it\n'
+    '2,Emma,Jane Austen,"=""""","=""""",,2003,1815,,to-read,\n'
+)
+
+
+def lines(text):
+    return read_text(io.BytesIO(text.encode()))
+
+
+class ParseRowsTest(TestCase):
+    def test_detect_format(self):
+        self.assertEqual(detect_format("books.csv", CSV.splitlines()[0]), "csv")
+        self.assertEqual(detect_format("goodreads_library_export.csv", GOODREADS.splitlines()[0]), "goodreads")
+        self.assertEqual(detect_format("books.jsonl", "title"), "jsonl")
+        self.assertEqual(detect_format("books.txt", '{"title": "Dune"}'), "jsonl")
+
+    def test_goodreads_rows(self):
+        rows = [record for _, record in parse_rows(lines(GOODREADS), "goodreads")]
+        self.assertEqual(rows[0]["isbn"], "9780441013593")
+        self.assertEqual(rows[0]["shelf"], "favourites")
+        self.assertEqual(rows[0]["status"], "F")
+        self.assertEqual(rows[0]["release_year"], 1965)
+        self.assertEqual(rows[0]["review"], "Loved it")
+        self.assertEqual(rows[1]["isbn"], "")
+        self.assertEqual(rows[1]["status"], "W")
+
+    def test_invalid_rows(self):
+        text = '{"title": "Dune", "total_pages": "many"}\nnot json\n\n[1]\n{"author": "Nobody"}\n{"title": "Emma", "status": "lost"}\n'
+        errors = [(number, str(error)) for number, error in parse_rows(lines(text), "jsonl")]
+        self.assertEqual([number for number, _ in errors], [1, 2, 4, 5, 6])
+        self.assertIn("total_pages must be a number", errors[0][1])
+        self.assertEqual(errors[3][1], "title is required")
+        self.assertIn("unknown status", errors[4][1])
+
+    def test_byte_order_mark_is_ignored(self):
+        rows = list(parse_rows(read_text(io.BytesIO(b"\xef\xbb\xbf" + CSV.encode())), "csv"))
+        self.assertEqual(rows[0][1]["title"], "Dune")
+
+
+class LibraryImporterTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="testpass")
+
+    def run_import(self, text, file_format, **config):
+        job = ImportJob.objects.create(user=self.user, format=file_format)
+        return LibraryImporter(job, config=config).run(lines(text))
+
+    def test_csv_import(self):
+        job = self.run_import(CSV, "csv")
+
+        self.assertEqual(job.status, ImportJob.STATUS_DONE)
+        self.assertEqual((job.rows_processed, job.books_created, job.duplicates, job.invalid), (2, 2, 0, 0))
+        dune = Book.objects.get(title="Dune")
+        self.assertEqual(dune.isbn, "9780441013593")  # Stored normalized to ISBN-13.
+        self.assertEqual(dune.shelf.title, "Sci-Fi")
+        self.assertEqual(dune.reading_progress.status, "F")
+        self.assertEqual(dune.review.text, "Great")
+        self.assertEqual(ReadingProgress.objects.get(book__title="Emma").status, "W")
+        self.assertFalse(Review.objects.filter(book__title="Emma").exists())
+
+    def test_duplicates_are_skipped(self):
+        Book.objects.create(user=self.user, isbn="9780441013593", title="Dune", author="Frank Herbert")
+        Book.objects.create(user=self.user, isbn="", title="emma", author="jane austen")
+        Book.objects.create(user=User.objects.create_user(username="other"), isbn="1234567890", title="Other", author="Someone")
+        text = (
+            '{"title": "Dune", "isbn": "0-441-01359-7"}\n'
+            '{"title": "Emma", "author": "Jane Austen"}\n'
+            '{"title": "Other", "isbn": "123-456-789-0"}\n'
+            '{"title": "Other again", "isbn": "1234567890"}\n'
+        )
+        job = self.run_import(text, "jsonl")
+
+        self.assertEqual((job.books_created, job.duplicates), (1, 3))
+        self.assertEqual(Book.objects.filter(user=self.user, title="Other").count(), 1)
+
+    def test_existing_shelves_are_reused(self):
+        shelf = Shelf.objects.create(user=self.user, title="Sci-Fi")
+        self.run_import(CSV, "csv")
+        self.assertEqual(Book.objects.get(title="Dune").shelf, shelf)
+        self.assertEqual(Shelf.objects.filter(user=self.user).count(), 1)
+
+    def test_chunks_and_progress(self):
+        text = "".join(json.dumps({"title": f"Book {i}", "isbn": f"978000000{i:04d}"}) + "\n" for i in range(10))
+        text += "not json\n"
+        job = ImportJob.objects.create(user=self.user, format="jsonl")
+        progress = []
+        LibraryImporter(job, config={"CHUNK_SIZE": 4, "MAX_ERRORS": 0}, progress=lambda job: progress.append(job.rows_processed)).run(lines(text))
+
+        self.assertEqual(progress, [4, 8, 11])
+        self.assertEqual((job.books_created, job.invalid, job.errors), (10, 1, []))
+        job.refresh_from_db()
+        self.assertEqual(job.rows_processed, 11)
+
+    def test_one_activity_per_import(self):
+        self.run_import(CSV, "csv")
+        self.assertEqual(Activity.objects.get(user=self.user).text, "reader imported 2 books")
+
+        self.run_import(CSV, "csv")  # Only duplicates.
+        self.assertEqual(Activity.objects.filter(user=self.user).count(), 1)
+
+
+class ImportEndpointTest(APITestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        settings_override = override_settings(
+            MEDIA_ROOT=os.path.join(self.media.name, "public"), PRIVATE_MEDIA_ROOT=os.path.join(self.media.name, "private")
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(self.media.cleanup)
+
+        self.user = User.objects.create_user(username="reader", password="testpass")
+        self.client.force_authenticate(user=self.user)
+
+    def upload(self, name, text):
+        response = self.client.post(
+            reverse("import-list-create"), {"file": SimpleUploadedFile(name, text.encode())}, format="multipart"
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], ImportJob.STATUS_PENDING)
+        jobs.run_pending()  # Run the import like a job worker would.
+        return response.data
+
+    def test_upload_and_poll(self):
+        job = self.upload("goodreads_library_export.csv", GOODREADS)
+        self.assertEqual(job["format"], "goodreads")
+
+        response = self.client.get(reverse("import-detail", args=[job["id"]]))
+        self.assertEqual(response.data["status"], ImportJob.STATUS_DONE)
+        self.assertEqual(response.data["books_created"], 2)
+        self.assertEqual(Book.objects.filter(user=self.user).count(), 2)
+
+        response = self.client.get(reverse("import-list-create"))
+        self.assertEqual([item["id"] for item in response.data["results"]], [job["id"]])
+
+    def test_uploads_are_private_and_deleted_once_imported(self):
+        with mock.patch.object(jobs, "run_pending"):
+            job = self.upload("books.csv", CSV)
+        self.assertNotIn("file", job)
+        path = ImportJob.objects.get(pk=job["id"]).file.path
+        self.assertTrue(path.startswith(os.path.join(self.media.name, "private")))
+        self.assertTrue(os.path.exists(path))
+
+        jobs.run_pending()
+        self.assertFalse(os.path.exists(path))
+        self.assertNotIn("file", self.client.get(reverse("import-detail", args=[job["id"]])).data)
+
+    def test_unreadable_file_fails_the_job(self):
+        with mock.patch.object(LibraryImporter, "run", side_effect=RuntimeError), self.assertLogs("core.imports", "ERROR"):
+            job = self.upload("books.csv", CSV)
+        job = ImportJob.objects.get(pk=job["id"])
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertFalse(os.path.exists(job.file.path))
+
+    def test_other_users_imports_are_hidden(self):
+        job = self.upload("books.csv", CSV)
+        self.client.force_authenticate(user=User.objects.create_user(username="other", password="testpass"))
+        self.assertEqual(self.client.get(reverse("import-detail", args=[job["id"]])).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(reverse("import-list-create")).data["results"], [])
+
+
+class ImportLibraryCommandTest(TestCase):
+    def test_command(self):
+        User.objects.create_user(username="reader", password="testpass")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "books.csv")
+            with open(path, "w") as file:
+                file.write(CSV + ",Nobody,,,,,,,\n")
+            output = io.StringIO()
+            call_command("import_library", "reader", path, "--chunk-size", "2", stdout=output)
+
+        self.assertIn("Imported 2 books (0 duplicates, 1 invalid rows skipped)", output.getvalue())
+        self.assertIn("line 4: title is required", output.getvalue())
+        self.assertEqual(Book.objects.filter(user__username="reader").count(), 2)
@@ -0,0 +1,130 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from core import jobs
+from core.models import Activity, Book, Comment, Job, ReadingProgress, Review, Shelf
+
+calls = []
+
+
+@jobs.task("tests.record")
+def record(value, fail=False):
+    Shelf.objects.create(user=User.objects.get(username="reader"), title=value)  # A write that must roll back on failure.
+    calls.append(value)
+    if fail:
+        raise RuntimeError("boom")
+
+
+@override_settings(JOB_QUEUE={"MAX_ATTEMPTS": 3, "RETRY_DELAY": 10, "LEASE_TIMEOUT": 60})
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+        User.objects.create_user(username="reader", password="testpass")
+
+    def test_successful_jobs_are_deleted(self):
+        jobs.enqueue("tests.record", value="one")
+        jobs.enqueue("tests.record", value="two")
+
+        self.assertEqual(jobs.run_pending(), 2)
+        self.assertEqual(calls, ["one", "two"])
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(jobs.run_pending(), 0)
+
+    def test_unknown_tasks_are_rejected(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue("tests.unknown")
+
+    def test_failed_jobs_are_retried_with_backoff_then_marked_failed(self):
+        job = jobs.enqueue("tests.record", value="flaky", fail=True)
+
+        for attempt, delay in [(1, 10), (2, 20)]:
+            with self.assertLogs("core.jobs", "ERROR"):
+                self.assertEqual(jobs.run_pending(), 1)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), (Job.STATUS_QUEUED, attempt))
+            self.assertAlmostEqual(job.run_at, timezone.now() + timedelta(seconds=delay), delta=timedelta(seconds=2))
+            self.assertEqual(job.last_error, "RuntimeError: boom")
+            self.assertEqual(jobs.run_pending(), 0)  # Not due yet.
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+
+        with self.assertLogs("core.jobs", "ERROR"):
+            jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_FAILED, 3))
+        self.assertEqual(len(calls), 3)
+        self.assertFalse(Shelf.objects.exists())  # Every failed attempt was rolled back.
+
+        self.assertEqual(jobs.retry_failed(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_QUEUED, 0))
+
+    def test_jobs_are_claimed_once(self):
+        jobs.enqueue("tests.record", value="one")
+        self.assertEqual(len(jobs.claim("worker-1", 10)), 1)
+        self.assertEqual(jobs.claim("worker-2", 10), [])
+
+    def test_jobs_of_dead_workers_are_run_again(self):
+        job = jobs.enqueue("tests.record", value="one")
+        jobs.claim("dead-worker", 10)
+        self.assertEqual(jobs.run_pending(), 0)
+
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(seconds=61))
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(calls, ["one"])
+
+    def test_run_jobs_command(self):
+        jobs.enqueue("tests.record", value="one")
+        output = StringIO()
+        call_command("run_jobs", "--once", stdout=output)
+        self.assertIn("Ran 1 jobs", output.getvalue())
+
+    def test_worker_stops_when_asked(self):
+        jobs.enqueue("tests.record", value="one")
+        with mock.patch("core.jobs.time.sleep") as sleep:
+            jobs.work("worker", should_stop=lambda: sleep.called)
+        self.assertEqual(calls, ["one"])
+
+
+class ActivityJobTest(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", password="testpass")
+        self.reader = User.objects.create_user(username="reader", password="testpass")
+        self.book = Book.objects.create(user=self.author, isbn="1234567890123", title="Dune", author="Frank Herbert")
+        self.client.force_authenticate(user=self.author)
+
+    def test_activities_are_created_by_jobs(self):
+        self.client.post(reverse("reading-list-create"), {"book": self.book.id, "status": "R"}, format="json")
+        progress = ReadingProgress.objects.get(book=self.book)
+        self.client.patch(reverse("reading-detail", args=[progress.id]), {"status": "F"}, format="json")
+        self.client.post(reverse("review-list-create"), {"book": self.book.id, "text": "Great", "shared": True}, format="json")
+        review = Review.objects.get(book=self.book)
+        self.client.force_authenticate(user=self.reader)
+        self.client.post(reverse("comment-list-create", args=[review.id]), {"book": self.book.id, "review": review.id, "text": "Agreed"}, format="json")
+
+        self.assertFalse(Activity.objects.exists())
+        self.assertEqual(Job.objects.count(), 4)
+        self.assertEqual(jobs.run_pending(), 4)
+        self.assertEqual(
+            list(Activity.objects.order_by("id").values_list("text", flat=True)),
+            [
+                "author started tracking their reading status for Dune",
+                "author updated their reading status for Dune",
+                "author wrote a review for Dune",
+                "reader replied to author's review of Dune",
+            ],
+        )
+        self.assertEqual(Activity.objects.get(comment__isnull=False).comment, Comment.objects.get())
+
+    def test_deleted_objects_get_no_activity(self):
+        self.client.post(reverse("reading-list-create"), {"book": self.book.id, "status": "R"}, format="json")
+        ReadingProgress.objects.all().delete()
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertFalse(Activity.objects.exists())
+        self.assertFalse(Job.objects.exists())
@@ -0,0 +1,249 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+from core import openlibrary
+from core.openlibrary import (AsyncSingleFlight, IsbnBatchResolver, OpenLibraryClient, OpenLibraryError,
+                              SearchResultCache, normalize_search_params)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeFetch:
+    def __init__(self, results=None, error=False):
+        self.results = results if results is not None else [{"title": "Book"}]
+        self.error = error
+        self.calls = []
+
+    def __call__(self, params):
+        self.calls.append(params)
+        if self.error:
+            raise OpenLibraryError("upstream unavailable")
+        return self.results
+
+
+class NormalizeSearchParamsTest(SimpleTestCase):
+    def test_isbn_is_stripped_of_separators(self):
+        self.assertEqual(normalize_search_params(isbn="0-14-311-75x"), {"isbn": "01431175X"})
+
+    def test_isbn_takes_precedence_over_title(self):
+        self.assertEqual(normalize_search_params(isbn="123", title="Title"), {"isbn": "123"})
+
+    def test_title_is_case_and_whitespace_insensitive(self):
+        self.assertEqual(normalize_search_params(title="  The   Hobbit "), {"title": "the hobbit"})
+
+    def test_empty(self):
+        self.assertEqual(normalize_search_params(), {})
+
+
+class SearchResultCacheTest(SimpleTestCase):
+    def setUp(self):
+        caches["openlibrary"].clear()
+        self.clock = FakeClock()
+        self.cache = SearchResultCache(
+            config={"ISBN_TTL": 1000, "TITLE_TTL": 10, "STALE_TTL": 100},
+            clock=self.clock,
+            background=lambda func: func(),  # Revalidate synchronously.
+        )
+
+    def test_miss_then_hit(self):
+        fetch = FakeFetch()
+        self.assertEqual(self.cache.get_or_fetch({"title": "book"}, fetch), [{"title": "Book"}])
+        self.assertEqual(self.cache.get_or_fetch({"title": "book"}, fetch), [{"title": "Book"}])
+        self.assertEqual(len(fetch.calls), 1)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["hit_ratio"], 0.5)
+
+    def test_empty_results_are_cached(self):
+        fetch = FakeFetch(results=[])
+        self.cache.get_or_fetch({"isbn": "1"}, fetch)
+        self.assertEqual(self.cache.get_or_fetch({"isbn": "1"}, fetch), [])
+        self.assertEqual(len(fetch.calls), 1)
+
+    def test_isbn_entries_outlive_title_entries(self):
+        fetch = FakeFetch()
+        self.cache.get_or_fetch({"isbn": "1"}, fetch)
+        self.cache.get_or_fetch({"title": "book"}, fetch)
+
+        self.clock.now += 50
+        self.assertFalse(self.cache.get({"isbn": "1"})[1])
+        self.assertTrue(self.cache.get({"title": "book"})[1])
+
+    def test_stale_entry_is_served_and_revalidated(self):
+        self.cache.get_or_fetch({"title": "book"}, FakeFetch(results=[{"title": "Old"}]))
+        self.clock.now += 20
+
+        fetch = FakeFetch(results=[{"title": "New"}])
+        self.assertEqual(self.cache.get_or_fetch({"title": "book"}, fetch), [{"title": "Old"}])
+        self.assertEqual(len(fetch.calls), 1)
+        self.assertEqual(self.cache.stats()["stale_hits"], 1)
+
+        # The refreshed entry is fresh again.
+        self.assertEqual(self.cache.get({"title": "book"}), ([{"title": "New"}], False))
+
+    def test_failed_revalidation_keeps_stale_entry(self):
+        self.cache.get_or_fetch({"title": "book"}, FakeFetch(results=[{"title": "Old"}]))
+        self.clock.now += 20
+
+        with self.assertLogs("core.openlibrary", level="WARNING"):
+            self.cache.get_or_fetch({"title": "book"}, FakeFetch(error=True))
+        self.assertEqual(self.cache.get({"title": "book"}), ([{"title": "Old"}], True))
+
+    def test_concurrent_revalidation_is_skipped(self):
+        deferred = []
+        cache = SearchResultCache(
+            config={"TITLE_TTL": 10, "STALE_TTL": 100}, clock=self.clock, background=deferred.append
+        )
+        cache.get_or_fetch({"title": "book"}, FakeFetch())
+        self.clock.now += 20
+
+        cache.get_or_fetch({"title": "book"}, FakeFetch())
+        cache.get_or_fetch({"title": "book"}, FakeFetch())
+        self.assertEqual(len(deferred), 1)
+
+    def test_fetch_errors_are_not_cached(self):
+        with self.assertRaises(OpenLibraryError):
+            self.cache.get_or_fetch({"title": "book"}, FakeFetch(error=True))
+        self.assertEqual(self.cache.get({"title": "book"}), (None, False))
+
+
+# Local stand-in for the Open Library search API that answers after a configurable delay.
+class FakeOpenLibraryServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency=0.0):
+        super().__init__(("127.0.0.1", 0), FakeOpenLibraryHandler)
+        self.latency = latency
+        self.requests = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/search.json"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+
+class FakeOpenLibraryHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        time.sleep(self.server.latency)
+        body = json.dumps({"docs": [{"title": "Fake Book", "author_name": ["Fake Author"]}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except ConnectionError:
+            pass  # The client gave up waiting, e.g. in the timeout test.
+
+    def log_message(self, *args):
+        pass
+
+
+class OpenLibraryClientTest(SimpleTestCase):
+    def test_search(self):
+        with FakeOpenLibraryServer() as server:
+            client = OpenLibraryClient(config={"SEARCH_URL": server.url})
+            results = client.search({"title": "fake"})
+        self.assertEqual(results[0]["title"], "Fake Book")
+        self.assertEqual(results[0]["author"], "Fake Author")
+
+    def test_concurrent_identical_searches_share_one_request(self):
+        with FakeOpenLibraryServer(latency=0.3) as server:
+            client = OpenLibraryClient(config={"SEARCH_URL": server.url})
+            with ThreadPoolExecutor(max_workers=10) as pool:
+                results = list(pool.map(lambda _: client.search({"title": "fake"}), range(10)))
+        self.assertEqual(len(server.requests), 1)
+        self.assertTrue(all(result == results[0] for result in results))
+
+    def test_different_searches_are_not_coalesced(self):
+        with FakeOpenLibraryServer(latency=0.1) as server:
+            client = OpenLibraryClient(config={"SEARCH_URL": server.url})
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                list(pool.map(lambda title: client.search({"title": title}), ["one", "two"]))
+        self.assertEqual(len(server.requests), 2)
+
+    def test_read_timeout(self):
+        with FakeOpenLibraryServer(latency=0.5) as server:
+            client = OpenLibraryClient(config={"SEARCH_URL": server.url, "READ_TIMEOUT": 0.1})
+            with self.assertRaises(OpenLibraryError):
+                client.search({"title": "fake"})
+
+    def test_async_search_coalesces_coroutines(self):
+        caches["openlibrary"].clear()
+        with FakeOpenLibraryServer(latency=0.3) as server:
+            client = OpenLibraryClient(config={"SEARCH_URL": server.url})
+
+            async def search_concurrently():
+                return await asyncio.gather(*(openlibrary.asearch_books(title="Fake") for _ in range(20)))
+
+            with mock.patch.object(openlibrary, "client", client), \
+                    mock.patch.object(openlibrary, "async_flight", AsyncSingleFlight()):
+                results = asyncio.run(search_concurrently())
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual(len(results), 20)
+        self.assertEqual(results[0][0]["title"], "Fake Book")
+
+
+class IsbnBatchResolverTest(SimpleTestCase):
+    def setUp(self):
+        caches["openlibrary"].clear()
+
+    def test_cached_isbns_are_yielded_before_upstream_searches(self):
+        openlibrary.search_cache.set({"isbn": "9780441013593"}, [{"title": "Cached"}])
+        with FakeOpenLibraryServer(latency=0.1) as server:
+            client = OpenLibraryClient(config={"SEARCH_URL": server.url})
+            with mock.patch.object(openlibrary, "client", client):
+                results = list(IsbnBatchResolver().resolve(["9780261102958", "9780441013593"]))
+
+        self.assertEqual([isbn for isbn, _, _ in results], ["9780441013593", "9780261102958"])
+        self.assertEqual(results[0][1], [{"title": "Cached"}])
+        self.assertEqual(results[1][1][0]["title"], "Fake Book")
+        self.assertEqual(len(server.requests), 1)
+
+    def test_upstream_concurrency_is_bounded(self):
+        with FakeOpenLibraryServer(latency=0.1) as server:
+            client = OpenLibraryClient(config={"SEARCH_URL": server.url})
+            resolver = IsbnBatchResolver(config={"CONCURRENCY": 2})
+            in_flight, peak = 0, 0
+            lock = threading.Lock()
+            fetch = client.search
+
+            def search(params):
+                nonlocal in_flight, peak
+                with lock:
+                    in_flight += 1
+                    peak = max(peak, in_flight)
+                try:
+                    return fetch(params)
+                finally:
+                    with lock:
+                        in_flight -= 1
+
+            isbns = [f"978000000{i:04d}" for i in range(6)]
+            with mock.patch.object(client, "search", search), mock.patch.object(openlibrary, "client", client):
+                results = list(resolver.resolve(isbns))
+
+        self.assertEqual(sorted(isbn for isbn, _, _ in results), isbns)
+        self.assertEqual(len(server.requests), 6)
+        self.assertEqual(peak, 2)
@@ -0,0 +1,109 @@
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+from core import feed
+from core.models import Book, FeedEntry, Following, ReadingProgress
+from core.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor
+
+
+class CursorTest(SimpleTestCase):
+    def test_round_trip_keeps_microseconds(self):
+        timestamp = timezone.now().replace(microsecond=123456)
+        self.assertEqual(decode_cursor(encode_cursor([timestamp, 7]), 2), [timestamp.isoformat(), 7])
+
+    def test_invalid_cursors(self):
+        for cursor in ("not a cursor", encode_cursor([1]), "W10", "%%%"):
+            with self.subTest(cursor=cursor), self.assertRaises(ValidationError):
+                decode_cursor(cursor, 2)
+
+
+class KeysetPaginationTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="testpass")
+        self.client.force_authenticate(user=self.user)
+
+    def collect(self, url, params=None):
+        # Follow next links to the end and return every page's results.
+        pages = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.data["results"])
+            if not response.data["next"]:
+                return pages
+            response = self.client.get(response.data["next"])
+
+    def test_books_are_paged_in_id_order(self):
+        books = Book.objects.bulk_create(
+            [Book(user=self.user, isbn=f"{i:013d}", title=f"Book {i}", author="Someone") for i in range(7)]
+        )
+
+        pages = self.collect(reverse("book-list-create"), {"limit": 3})
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual([book["id"] for page in pages for book in page], [book.id for book in books])
+
+    def test_search_results_are_paged_in_rank_order(self):
+        Book.objects.bulk_create(
+            [Book(user=self.user, isbn=f"{i:013d}", title=f"Dragon {i}", author="Someone") for i in range(5)]
+            + [Book(user=self.user, isbn="9999999999999", title="Other", author="Dragon Writer")]
+        )
+
+        pages = self.collect(reverse("book-list-create"), {"search": "dragon", "limit": 2})
+        titles = [book["title"] for page in pages for book in page]
+        self.assertEqual(len(titles), 6)
+        self.assertEqual(titles[-1], "Other")  # Title matches rank above author matches.
+
+    def test_feed_with_equal_timestamps_is_paged_without_gaps(self):
+        author = User.objects.create_user(username="author", password="testpass")
+        Following.objects.create(user=self.user).followed_users.add(author)
+        book = Book.objects.create(user=author, isbn="1234567890123", title="Book", author="Someone")
+        activities = [feed.create_activity(user=author, book=book, text=str(i), backlink="/") for i in range(12)]
+        FeedEntry.objects.filter(owner=self.user).update(timestamp=timezone.now())
+
+        pages = self.collect(reverse("activity-list"))
+        self.assertEqual([len(page) for page in pages], [5, 5, 2])
+        self.assertEqual(
+            [activity["id"] for page in pages for activity in page], [activity.id for activity in reversed(activities)]
+        )
+
+    def test_reading_progress_without_timestamp_is_paged(self):
+        books = Book.objects.bulk_create(
+            [Book(user=self.user, isbn=f"{i:013d}", title=f"Book {i}", author="Someone") for i in range(4)]
+        )
+        ReadingProgress.objects.bulk_create([ReadingProgress(book=book, status="R") for book in books[:2]])
+        ReadingProgress.objects.create(book=books[2], status="R")
+        ReadingProgress.objects.create(book=books[3], status="R")
+
+        pages = self.collect(reverse("reading-list-create"), {"limit": 1})
+        self.assertEqual([progress["book"]["id"] for page in pages for progress in page], [book.id for book in books])
+
+    def test_users_are_paged_by_username(self):
+        for name in ("carol", "alice", "bob"):
+            User.objects.create_user(username=name, password="testpass")
+
+        pages = self.collect(reverse("user-list"), {"limit": 2})
+        self.assertEqual([user["username"] for page in pages for user in page], ["alice", "bob", "carol", "reader"])
+
+    def test_limit_is_validated_and_capped(self):
+        url = reverse("book-list-create")
+        for limit in ("abc", "0", "-1"):
+            with self.subTest(limit=limit):
+                response = self.client.get(url, {"limit": limit})
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn("limit", response.data)
+
+        Book.objects.bulk_create(
+            [Book(user=self.user, isbn=f"{i:013d}", title=f"Book {i}", author="Someone") for i in range(MAX_PAGE_SIZE + 1)]
+        )
+        response = self.client.get(url, {"limit": MAX_PAGE_SIZE * 10})
+        self.assertEqual(len(response.data["results"]), MAX_PAGE_SIZE)
+        self.assertIsNotNone(response.data["next"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("book-list-create"), {"cursor": "garbage"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(str(response.data["cursor"]), "Invalid cursor.")
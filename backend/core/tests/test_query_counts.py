@@ -0,0 +1,79 @@
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core.models import Book, Comment, ReadingProgress, Review, Shelf
+from core.pagination import DEFAULT_PAGE_SIZE
+
+LIBRARY_SIZES = (10, 100, 1000, 10000)
+SHELVES_PER_USER = 4
+
+
+class QueryBudgetTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="testpass")
+        self.commenter = User.objects.create_user(username="commenter", password="testpass")
+        self.client.force_authenticate(user=self.user)
+
+    def create_library(self, size):
+        # Start from an empty library, then bulk create books with progress, a review and a comment each.
+        Book.objects.filter(user=self.user).delete()
+        Shelf.objects.filter(user=self.user).delete()
+
+        shelves = Shelf.objects.bulk_create(
+            [Shelf(user=self.user, title=f"Shelf {i}") for i in range(SHELVES_PER_USER)]
+        )
+        books = Book.objects.bulk_create(
+            [
+                Book(
+                    user=self.user,
+                    isbn=f"{i:013d}",
+                    title=f"Book {i}",
+                    author=f"Author {i % 50}",
+                    total_pages=300,
+                    release_year=2000 + i % 20,
+                    shelf=shelves[i % SHELVES_PER_USER],
+                )
+                for i in range(size)
+            ]
+        )
+        ReadingProgress.objects.bulk_create(
+            [ReadingProgress(book=book, status="R", current_page=10) for book in books]
+        )
+        reviews = Review.objects.bulk_create([Review(book=book, text="Good") for book in books])
+        Comment.objects.bulk_create(
+            [Comment(user=self.commenter, book=review.book, review=review, text="Agreed") for review in reviews]
+        )
+        return shelves, books
+
+    def test_list_and_detail_views_use_constant_queries(self):
+        # Every response first looks up the library version for its ETag, then loads:
+        # Shelves: shelves with owners, books with progress and review, comments with authors.
+        # Books: books with progress and review, comments with authors.
+        for size in LIBRARY_SIZES:
+            with self.subTest(size=size):
+                shelves, books = self.create_library(size)
+
+                with self.assertNumQueries(4):
+                    response = self.client.get(reverse("shelf-list-create"))
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(sum(len(shelf["books"]) for shelf in response.data["results"]), size)
+
+                with self.assertNumQueries(4):
+                    response = self.client.get(reverse("shelf-detail", args=[shelves[0].id]))
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+                with self.assertNumQueries(3):
+                    response = self.client.get(reverse("book-list-create"))
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(len(response.data["results"]), min(size, DEFAULT_PAGE_SIZE))
+                self.assertEqual(response.data["results"][0]["review"]["comments"][0]["user"], "commenter")
+
+                if response.data["next"]:
+                    with self.assertNumQueries(3):  # Following pages cost the same as the first.
+                        response = self.client.get(response.data["next"])
+                    self.assertEqual(response.data["results"][0]["id"], books[DEFAULT_PAGE_SIZE].id)
+
+                with self.assertNumQueries(3):
+                    response = self.client.get(reverse("book-detail", args=[books[0].id]))
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,162 @@
+import re
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from core import feed, history, jobs, stats
+from core.models import (Activity, Book, Comment, FeedEntry, Following, ImageAsset, ImportJob, ProgressEvent,
+                         ReadingProgress, Review, Shelf)
+from core.versions import bump_follower_feeds, owner_id
+
+# "SCAN core_book" (or "SCAN TABLE core_book AS U0" on older SQLite) reads every row of the table. Index scans
+# ("SCAN ... USING INDEX"), full-text searches and subquery scans are not full table scans.
+FULL_SCAN = re.compile(r"^SCAN (TABLE )?\w+( AS \w+)?$")
+
+
+# Records the statements that read rows (SELECT, UPDATE and DELETE) run inside it, with their parameters.
+class StatementRecorder:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().split(" ", 1)[0].upper() in ("SELECT", "UPDATE", "DELETE"):
+            self.statements.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+# Runs the hot queries of the views and of the model managers and helpers against a small library, and checks the
+# EXPLAIN QUERY PLAN of each for full table scans. Plans do not depend on the number of rows (there are no
+# ANALYZE statistics), so a query that scans here scans in production, where the table is large.
+@skipUnless(connection.vendor == "sqlite", "Reads SQLite query plans.")
+class QueryPlanTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="testpass")
+        self.friend = User.objects.create_user(username="friend", password="testpass")
+        Following.objects.create(user=self.user).followed_users.add(self.friend)
+        Following.objects.create(user=self.friend).followed_users.add(self.user)
+        for owner in (self.user, self.friend):
+            shelf = Shelf.objects.create(user=owner, title="Science fiction")
+            for number in range(3):
+                book = Book.objects.create(user=owner, isbn=f"978000000000{number}", title=f"Book {number}", author="Someone", shelf=shelf)
+                ReadingProgress.objects.create(book=book, status="R", current_page=10, shared=True)
+                review = Review.objects.create(book=book, text="Good", shared=True)
+                Comment.objects.create(user=self.user, book=book, review=review, text="Agreed")
+                feed.create_activity(user=owner, book=book, text="started reading", backlink="http://testserver/")
+        self.shelf = Shelf.objects.filter(user=self.user).first()
+        self.book = Book.objects.filter(user=self.user).first()
+        self.progress = self.book.reading_progress
+        self.review = self.book.review
+        self.comment = self.review.comments.first()
+        self.image = ImageAsset.objects.create(file="uploads/cover.jpg", book=self.book, status=ImageAsset.STATUS_READY)
+        self.import_job = ImportJob.objects.create(user=self.user, file="imports/library.csv", format="csv")
+        self.client.force_authenticate(self.user)
+
+    def plan(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertNoFullScans(self, run):
+        # Runs run() and fails with the statement and its plan when any statement it issued scans a table.
+        recorder = StatementRecorder()
+        with connection.execute_wrapper(recorder):
+            run()
+        self.assertTrue(recorder.statements)
+        for sql, params in recorder.statements:
+            plan = self.plan(sql, params)
+            scans = [detail for detail in plan if FULL_SCAN.match(detail)]
+            self.assertEqual(scans, [], f"Full table scan in:\n{sql}\n{params}\nPlan:\n" + "\n".join(plan))
+
+    def test_views(self):
+        get_urls = [
+            reverse("book-list-create"),
+            reverse("book-list-create") + "?search=Book",
+            reverse("book-list-create") + f"?shelf={self.shelf.id}",
+            reverse("book-list-create") + "?fields=id,title",
+            reverse("book-detail", args=[self.book.id]),
+            reverse("reading-history", args=[self.book.id]),
+            reverse("shelf-list-create"),
+            reverse("shelf-detail", args=[self.shelf.id]),
+            reverse("user-list") + "?relationship=followed",
+            reverse("user-list") + "?relationship=followers",
+            reverse("reading-stats"),
+            reverse("reading-list-create"),
+            reverse("reading-list-create") + "?status=R",
+            reverse("reading-list-create") + "?username=friend",
+            reverse("reading-detail", args=[self.progress.id]),
+            reverse("review-list-create"),
+            reverse("review-list-create") + "?username=friend",
+            reverse("review-list-create") + "?fields=id,text",
+            reverse("review-detail", args=[self.review.id]),
+            reverse("comment-list-create", args=[self.review.id]),
+            reverse("comment-detail", args=[self.review.id, self.comment.id]),
+            reverse("activity-list"),
+            reverse("activity-list") + "?fields=id,book.title",
+            reverse("upload"),
+            reverse("upload-detail", args=[self.image.id]),
+            reverse("import-list-create"),
+            reverse("import-detail", args=[self.import_job.id]),
+            reverse("library-export", args=["jsonl"]),
+        ]
+        for url in get_urls:
+            with self.subTest(url=url):
+                self.assertNoFullScans(lambda: self.read(url))
+
+        writes = {
+            "book update": ("patch", reverse("book-detail", args=[self.book.id]), {"title": "Renamed"}),
+            "reading update": ("patch", reverse("reading-detail", args=[self.progress.id]), {"current_page": 20}),
+            "review update": ("patch", reverse("review-detail", args=[self.review.id]), {"text": "Better"}),
+            "comment create": ("post", reverse("comment-list-create", args=[self.review.id]), {"text": "Indeed", "review": self.review.id}),
+            "unfollow": ("delete", reverse("user-follow", args=["friend"]), None),
+        }
+        for name, (method, url, data) in writes.items():
+            with self.subTest(write=name):
+                self.assertNoFullScans(lambda: self.write(method, url, data))
+
+    def test_managers_and_helpers(self):
+        queries = {
+            "books for user": lambda: list(Book.objects.for_user(self.user).with_related()),
+            "shelves with books": lambda: list(Shelf.objects.for_user(self.user).with_books()),
+            "progress of user and followed": lambda: list(ReadingProgress.objects.for_user_and_followed(self.user)),
+            "reviews of user and followed": lambda: list(Review.objects.for_user_and_followed(self.user)),
+            "comments of user and followed": lambda: list(Comment.objects.for_user_and_followed(self.user)),
+            "images of user": lambda: list(ImageAsset.objects.for_user(self.user)),
+            "feed backfill": lambda: feed.backfill(self.user, self.friend),
+            "feed trim": lambda: feed.trim([self.user.id]),
+            "feed removal": lambda: feed.remove(self.user, self.friend),
+            "history": lambda: history.series(self.book),
+            "latest progress event": lambda: ProgressEvent.objects.filter(book=self.book).order_by("-timestamp").first(),
+            "stats summary": lambda: stats.summary(self.user),
+            "due jobs": lambda: jobs.claim("worker", 10),
+            "owner of a comment": lambda: owner_id(Comment.objects.get(pk=self.comment.pk)),
+            "follower feed versions": lambda: bump_follower_feeds(self.user.id),
+            "feed entries of owner": lambda: list(FeedEntry.objects.filter(owner=self.user).order_by("-timestamp")[:5]),
+        }
+        for name, run in queries.items():
+            with self.subTest(query=name):
+                self.assertNoFullScans(run)
+
+    def test_composite_indexes_are_used(self):
+        plans = {
+            "activity_user_timestamp": Activity.objects.filter(user=self.friend).order_by("-timestamp")[:10],
+            "book_user_shelf": Book.objects.for_user(self.user).get_books_by_shelf(self.shelf.id),
+        }
+        for index, queryset in plans.items():
+            with self.subTest(index=index):
+                sql, params = queryset.query.sql_with_params()
+                plan = self.plan(sql, params)
+                self.assertTrue(any(f"INDEX {index} " in detail for detail in plan), plan)
+                self.assertFalse(any("TEMP B-TREE" in detail for detail in plan), plan)
+
+    def write(self, method, url, data):
+        response = getattr(self.client, method)(url, data)
+        self.assertLess(response.status_code, 300, url)
+
+    def read(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        if response.streaming:
+            b"".join(response.streaming_content)
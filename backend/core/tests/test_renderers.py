@@ -0,0 +1,116 @@
+import datetime
+import gzip
+import json
+from decimal import Decimal
+
+import brotli
+import msgpack
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.handlers.base import BaseHandler
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from core.compression import CompressionMiddleware, accepted_encodings
+from core.models import Book, Shelf
+from core.renderers import MessagePackRenderer, ORJSONRenderer
+
+DATA = {
+    "title": "Dune  ",
+    "read": datetime.datetime(2024, 6, 12, 20, 0, 0, 123456, tzinfo=datetime.timezone.utc),
+    "date": datetime.date(2024, 6, 12),
+    "rating": Decimal("4.5"),
+    "pages": [1, 2, None],
+}
+
+
+class RendererTest(SimpleTestCase):
+    def test_orjson_renders_like_json_renderer(self):
+        self.assertEqual(ORJSONRenderer().render(DATA), JSONRenderer().render(DATA))
+        indented = ORJSONRenderer().render(DATA, "application/json; indent=4")
+        self.assertEqual(json.loads(indented), json.loads(JSONRenderer().render(DATA)))
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_msgpack_renders_the_json_values(self):
+        self.assertEqual(msgpack.unpackb(MessagePackRenderer().render(DATA)), json.loads(JSONRenderer().render(DATA)))
+
+
+class ContentNegotiationTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="testpass")
+        shelf = Shelf.objects.create(user=self.user, title="Science fiction")
+        for number in range(30):
+            Book.objects.create(user=self.user, isbn=f"{number:013d}", title=f"Book {number}", author="Someone", shelf=shelf)
+        self.client.force_authenticate(self.user)
+        self.url = reverse("book-list-create")
+
+    def test_msgpack_is_negotiated(self):
+        as_json = self.client.get(self.url)
+        self.assertEqual(as_json["Content-Type"], "application/json")
+
+        as_msgpack = self.client.get(self.url, HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(as_msgpack.status_code, status.HTTP_200_OK)
+        self.assertEqual(as_msgpack["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(as_msgpack.content), json.loads(as_json.content))
+        self.assertLess(len(as_msgpack.content), len(as_json.content))
+        self.assertNotEqual(as_msgpack["ETag"], as_json["ETag"])
+
+    def test_large_responses_are_compressed(self):
+        plain = self.client.get(self.url)
+        self.assertNotIn("Content-Encoding", plain)
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, deflate, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(response.content), plain.content)
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(response["ETag"], "W/" + plain["ETag"])
+
+        not_modified = self.client.get(self.url, HTTP_ACCEPT_ENCODING="br", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(self.url, HTTP_ACCEPT="application/msgpack", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(len(msgpack.unpackb(gzip.decompress(response.content))["results"]), 30)
+
+
+class CompressionMiddlewareTest(SimpleTestCase):
+    def respond(self, response, accept_encoding="gzip, br"):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_accept_encoding_is_parsed(self):
+        self.assertEqual(accepted_encodings("gzip;q=0.8, br, identity;q=0"), {"gzip": 0.8, "br": 1.0, "identity": 0.0})
+        middleware = CompressionMiddleware(None)
+        self.assertEqual(middleware.choose_encoding("gzip, br"), "br")
+        self.assertEqual(middleware.choose_encoding("gzip, br;q=0.5"), "gzip")
+        self.assertEqual(middleware.choose_encoding("*, br;q=0"), "gzip")
+        self.assertIsNone(middleware.choose_encoding("identity"))
+        self.assertIsNone(middleware.choose_encoding(""))
+
+    def test_small_binary_and_streaming_responses_are_left_alone(self):
+        body = b'{"title": "Dune"}' * 100
+        self.assertEqual(self.respond(HttpResponse(b"{}", content_type="application/json")).content, b"{}")
+        self.assertNotIn("Content-Encoding", self.respond(HttpResponse(body, content_type="image/jpeg")))
+        streaming = self.respond(StreamingHttpResponse(iter([body]), content_type="application/json"))
+        self.assertNotIn("Content-Encoding", streaming)
+        self.assertEqual(self.respond(HttpResponse(body, content_type="application/json"))["Content-Encoding"], "br")
+
+    def test_async_responses_are_compressed(self):
+        body = b'{"title": "Dune"}' * 100
+
+        async def get_response(request):
+            return HttpResponse(body, content_type="application/json")
+
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+        response = async_to_sync(CompressionMiddleware(get_response))(request)
+        self.assertEqual(gzip.decompress(response.content), body)
+
+    @override_settings(DEBUG=True)
+    def test_middleware_runs_async_under_asgi(self):
+        # Django logs each middleware it has to wrap in a thread switch to serve ASGI requests.
+        with self.assertNoLogs("django.request", level="DEBUG"):
+            BaseHandler().load_middleware(is_async=True)
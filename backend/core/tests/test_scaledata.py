@@ -0,0 +1,90 @@
+from collections import Counter
+from datetime import date
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+
+from core.models import Activity, Book, Comment, FeedEntry, Following, LibraryVersion, ReadingProgress, Review, Shelf
+from core.scaledata import RowWriter, ScaleDataGenerator
+
+CONFIG = {"USERS": 60, "BOOKS_PER_USER": 10, "FOLLOWS_PER_USER": 5, "UNTIL": date(2024, 6, 30), "CHUNK_SIZE": 100}
+
+
+def snapshot():
+    return (
+        list(User.objects.order_by("id").values_list("username", "date_joined")),
+        list(Shelf.objects.order_by("id").values_list("user_id", "title", "version")),
+        list(Book.objects.order_by("id").values_list("user_id", "isbn", "title", "author", "shelf_id", "version")),
+        list(ReadingProgress.objects.order_by("id").values_list("book_id", "status", "timestamp")),
+        list(Comment.objects.order_by("id").values_list("user_id", "review_id", "text")),
+        list(Following.followed_users.through.objects.order_by("id").values_list("following_id", "user_id")),
+        list(Activity.objects.order_by("id").values_list("user_id", "text", "timestamp")),
+    )
+
+
+class ScaleDataGeneratorTest(TestCase):
+    def test_generated_rows_are_consistent(self):
+        counts = ScaleDataGenerator(seed=1, config=CONFIG).run()
+
+        self.assertEqual(counts["auth.User"], 60)
+        self.assertEqual(LibraryVersion.objects.count(), 60)
+        self.assertEqual(Following.objects.count(), 60)
+        self.assertEqual(counts["core.Book"], Book.objects.count())
+        self.assertEqual(
+            Activity.objects.count(), ReadingProgress.objects.count() + Review.objects.count() + Comment.objects.count()
+        )
+        self.assertFalse(Book.objects.exclude(shelf=None).exclude(shelf__user=F("user")).exists())
+        self.assertTrue(all(a.book.user_id == a.user_id for a in Activity.objects.filter(comment=None)[:50]))
+
+        # New rows get ids after the generated ones.
+        user = User.objects.create(username="after")
+        self.assertGreater(user.pk, User.objects.exclude(pk=user.pk).order_by("-pk").first().pk)
+        self.assertTrue(Shelf.objects.create(user=user, title="After").pk)
+
+    def test_same_seed_generates_same_rows(self):
+        ScaleDataGenerator(seed=7, config=CONFIG).run()
+        first = snapshot()
+        User.objects.all().delete()
+        ScaleDataGenerator(seed=7, config=CONFIG).run()
+        self.assertEqual(snapshot(), first)
+
+        User.objects.all().delete()
+        ScaleDataGenerator(seed=8, config=CONFIG).run()
+        self.assertNotEqual(snapshot(), first)
+
+    def test_follower_counts_and_libraries_are_skewed(self):
+        config = {**CONFIG, "USERS": 300, "MAX_BOOKS_PER_USER": 100}
+        ScaleDataGenerator(seed=3, config=config).run()
+
+        followers = sorted(Counter(User.objects.filter(followers__isnull=False).values_list("id", flat=True)).values())
+        self.assertGreater(followers[-1], 10 * followers[len(followers) // 2])
+
+        libraries = sorted(Counter(Book.objects.values_list("user_id", flat=True)).values())
+        self.assertEqual(libraries[-1], 100)  # Heavy readers hit the cap.
+        self.assertLess(libraries[len(libraries) // 2], 10)
+
+    def test_rows_are_written_in_chunks(self):
+        writer = RowWriter(chunk_size=4)
+        with self.assertNumQueries(0):
+            for user_id in range(1, 4):
+                writer.add(User(id=user_id, username=f"user{user_id}"))
+        writer.add(LibraryVersion(user_id=1))  # The fourth row writes the chunk, users first.
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(writer.counts[User], 3)
+        self.assertEqual(writer.buffered, 0)
+
+
+class GenerateScaleDataCommandTest(TestCase):
+    def test_command(self):
+        output = StringIO()
+        call_command(
+            "generate_scale_data", "--users", "20", "--books-per-user", "5", "--until", "2024-06-30", "--password",
+            "secret", "--feeds", stdout=output,
+        )
+        self.assertIn("auth.User: 20", output.getvalue())
+        user = User.objects.get(username=f"scale{User.objects.order_by('id').first().pk}")
+        self.assertTrue(user.check_password("secret"))
+        self.assertTrue(FeedEntry.objects.exists())
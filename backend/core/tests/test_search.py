@@ -0,0 +1,89 @@
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from core.models import Book
+from core.search import LikeSearchBackend, SqliteSearchBackend, get_search_backend, parse_query
+
+
+class ParseQueryTest(SimpleTestCase):
+    def test_unqualified_words_form_one_phrase(self):
+        self.assertEqual(parse_query("  Lord of  the "), [(None, "Lord of the")])
+
+    def test_qualifiers(self):
+        self.assertEqual(
+            parse_query('author:tolkien title:"the hobbit" year:1937 ring'),
+            [("author", "tolkien"), ("title", "the hobbit"), ("release_year", "1937"), (None, "ring")],
+        )
+
+    def test_unknown_qualifier_is_a_word(self):
+        self.assertEqual(parse_query("Re:Zero"), [(None, "Re:Zero")])
+
+    def test_isbn_separators_are_removed(self):
+        self.assertEqual(parse_query("978-0-441-01359-3"), [(None, "9780441013593")])
+        self.assertEqual(parse_query("isbn:0-261-10295-6"), [("isbn", "0261102956")])
+
+
+class BookSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="reader", password="testpass")
+        cls.hobbit = Book.objects.create(
+            user=cls.user, isbn="9780261102958", title="The Hobbit", author="J.R.R. Tolkien", release_year=1937
+        )
+        cls.silmarillion = Book.objects.create(
+            user=cls.user, isbn="9780261102736", title="The Silmarillion", author="J.R.R. Tolkien", release_year=1977
+        )
+        cls.tolkien_biography = Book.objects.create(
+            user=cls.user, isbn="9780261102774", title="Tolkien: A Biography", author="Humphrey Carpenter",
+            release_year=1977,
+        )
+        cls.dune = Book.objects.create(
+            user=cls.user, isbn="9780441013593", title="Dune", author="Frank Herbert", release_year=1965
+        )
+
+    def search(self, search_str):
+        return list(Book.objects.search_local(search_str))
+
+    def test_default_backend_on_sqlite(self):
+        self.assertIsInstance(get_search_backend(), SqliteSearchBackend)
+
+    def test_prefix_matching(self):
+        self.assertEqual(self.search("hobb"), [self.hobbit])
+        self.assertEqual(set(self.search("97802611027")), {self.silmarillion, self.tolkien_biography})
+
+    def test_title_matches_rank_above_author_matches(self):
+        self.assertEqual(self.search("tolkien")[0], self.tolkien_biography)
+        self.assertEqual(set(self.search("tolkien")), {self.hobbit, self.silmarillion, self.tolkien_biography})
+
+    def test_field_qualifiers(self):
+        self.assertEqual(set(self.search("author:tolkien")), {self.hobbit, self.silmarillion})
+        self.assertEqual(set(self.search("year:1977")), {self.silmarillion, self.tolkien_biography})
+        self.assertEqual(self.search("author:tolkien year:1977"), [self.silmarillion])
+        self.assertEqual(self.search("isbn:978-0-441-01359-3"), [self.dune])
+
+    def test_no_match(self):
+        self.assertEqual(self.search("nothing here"), [])
+        self.assertEqual(self.search("!!!"), [])
+
+    def test_index_follows_writes(self):
+        self.dune.title = "Children of Dune"
+        self.dune.save()
+        self.assertEqual(self.search("children"), [self.dune])
+
+        Book.objects.filter(pk=self.dune.pk).delete()
+        self.assertEqual(self.search("children"), [])
+
+        Book.objects.bulk_create([Book(user=self.user, isbn="9780000000002", title="Bulk Book", author="Someone")])
+        self.assertEqual([book.title for book in self.search("bulk")], ["Bulk Book"])
+
+    def test_combines_with_other_filters(self):
+        other = User.objects.create_user(username="other", password="testpass")
+        Book.objects.create(user=other, isbn="9780261102958", title="The Hobbit", author="J.R.R. Tolkien")
+        self.assertEqual(list(Book.objects.for_user(self.user).search_local("hobbit").with_related()), [self.hobbit])
+        self.assertEqual(list(Book.objects.search_local("hobbit", user=self.user)), [self.hobbit])
+        self.assertEqual(len(Book.objects.search_local("hobbit")), 2)
+
+    @override_settings(BOOK_SEARCH_BACKEND="core.search.LikeSearchBackend")
+    def test_like_backend(self):
+        self.assertIsInstance(get_search_backend(), LikeSearchBackend)
+        self.assertEqual(self.search("Hobbit"), [self.hobbit])
+        self.assertEqual(set(self.search("author:tolkien year:1977")), {self.silmarillion})
@@ -92,6 +92,7 @@ class ShelfSerializerTest(TestCase):
             "title": "User1 Shelf1",
             "description": "Description1",
             "image": None,
+            "image_derivatives": None,
             "books": [
                 {
                     "id": self.book1.id,
@@ -102,6 +103,7 @@ class ShelfSerializerTest(TestCase):
                     "total_pages": None,
                     "release_year": None,
                     "image": None,
+                    "image_derivatives": None,
                     "shelf": 1,
                     "reading_progress": None,
                     "review": None
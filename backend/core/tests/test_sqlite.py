@@ -0,0 +1,35 @@
+import os
+import tempfile
+
+from django.db import connections
+from django.test import SimpleTestCase, override_settings
+
+
+class SqliteProfileTest(SimpleTestCase):
+    def connect(self):
+        # A separate connection to a file database, so journal_mode=WAL can take effect.
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        connection = connections.create_connection("default")
+        connection.settings_dict = {**connection.settings_dict, "NAME": os.path.join(directory.name, "db.sqlite3")}
+        self.addCleanup(connection.close)
+        connection.connect()
+        return connection
+
+    def pragma(self, connection, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PROFILE="production", SQLITE_PRAGMAS={"cache_size": -2000})
+    def test_production_profile_applies_pragmas(self):
+        connection = self.connect()
+        self.assertEqual(self.pragma(connection, "journal_mode"), "wal")
+        self.assertEqual(self.pragma(connection, "synchronous"), 1)  # NORMAL
+        self.assertEqual(self.pragma(connection, "busy_timeout"), 5000)
+        self.assertEqual(self.pragma(connection, "cache_size"), -2000)
+
+    @override_settings(SQLITE_PROFILE="default")
+    def test_default_profile_keeps_sqlite_defaults(self):
+        connection = self.connect()
+        self.assertEqual(self.pragma(connection, "journal_mode"), "delete")
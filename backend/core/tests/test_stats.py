@@ -0,0 +1,129 @@
+import io
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core import stats
+from core.imports import LibraryImporter, read_text
+from core.models import Book, ImportJob, ReadingProgress, UserStat
+
+
+def counters(user):
+    return {(kind, key): value for kind, key, value in UserStat.objects.filter(user=user).values_list("kind", "key", "value")}
+
+
+class StatsTestMixin:
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="testpass")
+        self.dune = Book.objects.create(user=self.user, isbn="1", title="Dune", author="Frank Herbert", total_pages=400)
+        self.messiah = Book.objects.create(user=self.user, isbn="2", title="Messiah", author="Frank Herbert", total_pages=200)
+        self.emma = Book.objects.create(user=self.user, isbn="3", title="Emma", author="Jane Austen")
+        with mock.patch("django.utils.timezone.now", return_value=timezone.make_aware(datetime(2023, 12, 30))):
+            ReadingProgress.objects.create(book=self.dune, status="F", current_page=400)
+        ReadingProgress.objects.create(book=self.emma, status="R", current_page=50)
+
+
+class CountersTest(StatsTestMixin, TestCase):
+    def test_counters_follow_saves_and_deletes(self):
+        summary = stats.summary(self.user)
+        self.assertEqual(summary["books"], 3)
+        self.assertEqual(summary["pages_read"], 450)
+        self.assertEqual(summary["average_length"], 300)
+        self.assertEqual(summary["statuses"], {"W": 0, "R": 1, "F": 1, "N": 0})
+        self.assertEqual(summary["finished_per_year"], {"2023": 1})
+        self.assertEqual(summary["top_authors"], [{"author": "Frank Herbert", "books": 2}, {"author": "Jane Austen", "books": 1}])
+
+        progress = self.emma.reading_progress
+        progress.status, progress.current_page = "F", 300
+        progress.save()
+        this_year = str(timezone.now().year)
+        self.assertEqual(stats.summary(self.user)["finished_per_year"], {"2023": 1, this_year: 1})
+
+        self.messiah.author = "Brian Herbert"
+        self.messiah.save()
+        self.dune.delete()  # Also deletes its reading progress.
+
+        summary = stats.summary(self.user)
+        self.assertEqual(summary["books"], 2)
+        self.assertEqual(summary["pages_read"], 300)
+        self.assertEqual(summary["average_length"], 200)
+        self.assertEqual(summary["statuses"]["F"], 1)
+        self.assertEqual(summary["finished_per_year"], {this_year: 1})
+        self.assertEqual([author["author"] for author in summary["top_authors"]], ["Brian Herbert", "Jane Austen"])
+
+    def test_rebuild_matches_incremental_counters(self):
+        self.emma.delete()
+        incremental = {key: value for key, value in counters(self.user).items() if value}
+        stats.rebuild(self.user)
+        self.assertEqual(counters(self.user), incremental)
+
+    def test_summary_reads_counters_only(self):
+        with self.assertNumQueries(2):
+            stats.summary(self.user)
+
+    def test_import_rebuilds_counters(self):
+        job = ImportJob.objects.create(user=self.user, format="csv")
+        LibraryImporter(job).run(read_text(io.BytesIO(b"title,author,total_pages\nPersuasion,Jane Austen,250\n")))
+        self.assertEqual(stats.summary(self.user)["books"], 4)
+        self.assertEqual(counters(self.user)[("author", "Jane Austen")], 2)
+
+
+class ReadingStatsViewTest(StatsTestMixin, APITestCase):
+    def test_stats(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse("reading-stats"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["books"], 3)
+
+        other = User.objects.create_user(username="other", password="testpass")
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(reverse("reading-stats")).data["books"], 0)
+
+    def test_rebuild_stats_command(self):
+        UserStat.objects.all().delete()
+        output = StringIO()
+        call_command("rebuild_stats", "reader", stdout=output)
+        self.assertIn("1 users", output.getvalue())
+        self.assertEqual(stats.summary(self.user)["books"], 3)
+
+
+class UserStatMigrationTest(TransactionTestCase):
+    before = [("core", "0013_progress_history")]
+    after = [("core", "0014_userstat")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def test_existing_libraries_are_counted(self):
+        apps = self.migrate(self.before)
+        self.addCleanup(self.migrate, MigrationExecutor(connection).loader.graph.leaf_nodes())
+        user = apps.get_model("auth", "User").objects.create(username="reader")
+        apps.get_model("auth", "User").objects.create(username="newcomer")
+        Book = apps.get_model("core", "Book")
+        dune = Book.objects.create(user=user, isbn="9780441013593", title="Dune", author="Frank Herbert", total_pages=600)
+        Book.objects.create(user=user, isbn="9780141439587", title="Emma", author="Jane Austen")
+        apps.get_model("core", "ReadingProgress").objects.create(book=dune, status="R", current_page=120)
+
+        apps = self.migrate(self.after)
+        counters = {
+            (kind, key): value
+            for kind, key, value in apps.get_model("core", "UserStat").objects.filter(user_id=user.pk)
+            .values_list("kind", "key", "value")
+        }
+        self.assertEqual(counters[("total", "books")], 2)
+        self.assertEqual(counters[("total", "pages_read")], 120)
+        self.assertEqual(counters[("status", "R")], 1)
+        self.assertEqual(counters[("author", "Jane Austen")], 1)
@@ -0,0 +1,105 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.handlers.base import BaseHandler
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.models import Book, Review
+from core.serializers import BookSerializer
+from core.timing import RequestTimer, TimedListSerializer, _current_timer, phase
+
+
+def metrics(header):
+    # Parse a Server-Timing header into {name: (duration, description)}.
+    result = {}
+    for metric in header.split(", "):
+        name, *params = metric.split(";")
+        values = dict(param.split("=", 1) for param in params)
+        result[name] = (float(values["dur"]), values.get("desc"))
+    return result
+
+
+class PhaseTest(TestCase):
+    def test_phase_is_noop_outside_sampled_requests(self):
+        with phase("serialize"):
+            pass
+        self.assertIsNone(_current_timer.get())
+
+    def test_nested_phase_counts_once(self):
+        timer = RequestTimer()
+        token = _current_timer.set(timer)
+        try:
+            with phase("serialize"):
+                with phase("serialize"):
+                    pass
+                with phase("db"):
+                    pass
+        finally:
+            _current_timer.reset(token)
+        self.assertEqual(set(timer.durations), {"serialize", "db"})
+        self.assertGreaterEqual(timer.durations["serialize"], timer.durations["db"])
+
+    def test_many_serializers_are_timed(self):
+        self.assertIsInstance(BookSerializer([], many=True), TimedListSerializer)
+
+
+class ServerTimingMiddlewareTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="password123")
+        book = Book.objects.create(user=self.user, isbn="9780441013593", title="Dune", author="Frank Herbert")
+        Review.objects.create(book=book, text="Great")
+        self.client = APIClient()
+        self.client.cookies["access_token"] = str(RefreshToken.for_user(self.user).access_token)
+
+    @override_settings(SERVER_TIMING={"SAMPLE_RATE": 1.0, "HEADER": True})
+    def test_sampled_request_reports_phases(self):
+        with self.assertLogs("core.timing", level="INFO") as logs:
+            response = self.client.get(reverse("book-list-create"))
+
+        self.assertEqual(response.status_code, 200)
+        reported = metrics(response["Server-Timing"])
+        self.assertTrue({"auth", "db", "serialize", "render", "total"} <= set(reported))
+        self.assertRegex(reported["db"][1], r'^"\d+ queries"$')
+        self.assertTrue(all(duration <= reported["total"][0] for duration, _ in reported.values()))
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["view"], "book-list-create")
+        self.assertEqual(record["status"], 200)
+        self.assertGreater(record["queries"], 0)
+        self.assertEqual(set(record["phases_ms"]), set(reported) - {"total"})
+
+    @override_settings(SERVER_TIMING={"SAMPLE_RATE": 0})
+    def test_unsampled_request_is_not_measured(self):
+        with self.assertNoLogs("core.timing", level="INFO"):
+            response = self.client.get(reverse("book-list-create"))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Server-Timing", response)
+
+    def test_no_header_by_default(self):
+        # Measurements are only logged unless the Server-Timing header is turned on.
+        with override_settings(SERVER_TIMING={"SAMPLE_RATE": 1.0}), self.assertLogs("core.timing", level="INFO"):
+            response = self.client.get(reverse("user-name"))
+        self.assertNotIn("Server-Timing", response)
+
+    @override_settings(SERVER_TIMING={"SAMPLE_RATE": 1.0, "HEADER": True, "LOG": False})
+    def test_header_without_log(self):
+        with self.assertNoLogs("core.timing", level="INFO"):
+            response = self.client.get(reverse("user-name"))
+        self.assertIn("total", metrics(response["Server-Timing"]))
+
+    @override_settings(SERVER_TIMING={"SAMPLE_RATE": 1.0, "HEADER": True, "LOG": False}, MIDDLEWARE=["core.timing.ServerTimingMiddleware"])
+    async def test_asgi_request_reports_queries(self):
+        self.async_client.cookies["access_token"] = self.client.cookies["access_token"].value
+        response = await self.async_client.get(reverse("book-list-create"))
+        self.assertEqual(response.status_code, 200)
+        reported = metrics(response["Server-Timing"])
+        self.assertRegex(reported["db"][1], r'^"[1-9]\d* queries"$')
+
+    @override_settings(MIDDLEWARE=["core.timing.ServerTimingMiddleware"], DEBUG=True)
+    def test_runs_async_under_asgi(self):
+        # Django logs each middleware it has to wrap in a thread switch to serve ASGI requests.
+        with self.assertNoLogs("django.request", level="DEBUG"):
+            BaseHandler().load_middleware(is_async=True)
@@ -0,0 +1,129 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+from rest_framework.views import APIView
+from core import feed
+from core.models import Book, Comment, Following, LibraryVersion, Review, Shelf
+from core.serializers import BookSerializer
+from core.versions import ConditionalGetMixin, library_version
+
+
+class ConditionalGetTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="testpass")
+        self.friend = User.objects.create_user(username="friend", password="testpass")
+        self.shelf = Shelf.objects.create(user=self.user, title="Shelf")
+        self.book = Book.objects.create(user=self.user, isbn="1234567890123", title="Book", author="Someone", shelf=self.shelf)
+        self.client.force_authenticate(user=self.user)
+
+    def etag(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response["ETag"]
+
+    def assertNotModified(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_matching_etag_returns_304_without_serializing(self):
+        url = reverse("book-list-create")
+        response = self.client.get(url)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        with mock.patch.object(BookSerializer, "to_representation") as serialize, self.assertNumQueries(1):
+            self.assertNotModified(url, response["ETag"])
+        serialize.assert_not_called()
+
+    def test_writes_change_the_etag(self):
+        urls = [
+            reverse("book-list-create"),
+            reverse("book-detail", args=[self.book.id]),
+            reverse("shelf-list-create"),
+            reverse("shelf-detail", args=[self.shelf.id]),
+        ]
+        writes = [
+            lambda: Book.objects.create(user=self.user, isbn="1234567890124", title="Other", author="Someone"),
+            lambda: Review.objects.create(book=self.book, text="Good", shared=True),
+            lambda: Comment.objects.create(user=self.friend, book=self.book, review=self.book.review, text="Agreed"),
+            lambda: Shelf.objects.filter(pk=self.shelf.pk).first().save(),
+            lambda: Comment.objects.filter(book=self.book).delete(),
+        ]
+        etags = [self.etag(url) for url in urls]
+        for write in writes:
+            write()
+            for url, etag in zip(urls, etags):
+                with self.subTest(url=url):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code, status.HTTP_200_OK)
+            etags = [self.etag(url) for url in urls]
+
+    def test_other_users_writes_keep_the_etag(self):
+        url = reverse("book-list-create")
+        etag = self.etag(url)
+        Book.objects.create(user=self.friend, isbn="1234567890124", title="Other", author="Someone")
+        self.assertNotModified(url, etag)
+
+    def test_etag_depends_on_query_and_viewer(self):
+        url = reverse("book-list-create")
+        self.assertNotEqual(self.etag(url), self.etag(url, {"limit": 1}))
+
+        Review.objects.create(book=self.book, text="Good", shared=True)
+        detail = reverse("book-detail", args=[self.book.id])
+        etag = self.etag(detail)
+        self.client.force_authenticate(user=self.friend)
+        self.assertNotEqual(self.etag(detail), etag)
+
+    def test_no_etag_for_hidden_books_or_users_without_versions(self):
+        hidden = Book.objects.create(user=self.friend, isbn="1234567890124", title="Hidden", author="Someone")
+        response = self.client.get(reverse("book-detail", args=[hidden.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn("ETag", response)
+
+        LibraryVersion.objects.filter(user=self.user).delete()
+        response = self.client.get(reverse("book-list-create"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("ETag", response)
+
+    def test_no_etag_for_error_responses(self):
+        # Errors are not a representation clients could revalidate later, so they are neither tagged nor kept.
+        class UnavailableView(APIView):
+            def get(self, request):
+                return Response({"error": "Unavailable"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        class ConditionalUnavailableView(ConditionalGetMixin, UnavailableView):
+            def get_version(self):
+                return library_version(self.request.user)
+
+        request = APIRequestFactory().get("/books/")
+        force_authenticate(request, user=self.user)
+        response = ConditionalUnavailableView.as_view()(request)
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertNotIn("ETag", response)
+        self.assertNotIn("Cache-Control", response)
+
+
+class FeedConditionalGetTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="testpass")
+        self.author = User.objects.create_user(username="author", password="testpass")
+        self.book = Book.objects.create(user=self.author, isbn="1234567890123", title="Book", author="Someone")
+        Following.objects.create(user=self.user).followed_users.add(self.author)
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("activity-list")
+
+    def assertChanged(self, write):
+        etag = self.client.get(self.url)["ETag"]
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        write()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_feed_changes_change_the_etag(self):
+        self.assertChanged(lambda: feed.create_activity(user=self.author, book=self.book, text="New", backlink="/"))
+        self.assertChanged(lambda: Book.objects.filter(pk=self.book.pk).first().save())
+        self.assertChanged(lambda: self.client.delete(reverse("user-follow", args=["author"])))
@@ -13,8 +13,10 @@ from core.models import (
     Shelf,
 )
 from django.test import TestCase
+from django.core.cache import caches
 from django.core.files.uploadedfile import SimpleUploadedFile
 import requests_mock
+from rest_framework_simplejwt.tokens import RefreshToken
 
 
 class ShelfListViewTest(TestCase):
@@ -44,9 +46,9 @@ class ShelfListViewTest(TestCase):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(
-            len(response.data), 1
+            len(response.data["results"]), 1
         )  # Assuming the response.data contains the list of shelves
-        self.assertEqual(response.data[0]["title"], "User Shelf 1")
+        self.assertEqual(response.data["results"][0]["title"], "User Shelf 1")
 
     def test_list_shelves_unauthenticated(self):
         # Unauthenticated requests should not be allowed
@@ -151,19 +153,19 @@ class BookListViewTest(APITestCase):
     def test_list_books(self):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)  # Expecting 2 books for user1
+        self.assertEqual(len(response.data["results"]), 2)  # Expecting 2 books for user1
 
     def test_list_books_with_search(self):
         response = self.client.get(self.url, {"search": "Title 1"})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["title"], "Book Title 1")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["title"], "Book Title 1")
 
     def test_list_books_by_shelf(self):
         response = self.client.get(self.url, {"shelf": self.shelf1.id})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["shelf"], self.shelf1.id)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["shelf"], self.shelf1.id)
 
 
 class BookDetailViewTest(APITestCase):
@@ -242,6 +244,7 @@ class BookSearchViewTests(APITestCase):
         self.user = User.objects.create_user(username="testuser", password="testpass")
         self.client.force_authenticate(user=self.user)
         self.url = reverse("book-search")
+        caches["openlibrary"].clear()  # Start every test with an empty search cache.
 
         self.shelf = Shelf.objects.create(user=self.user, title="Test Shelf")
         self.book = Book.objects.create(
@@ -314,12 +317,125 @@ class BookSearchViewTests(APITestCase):
             self.assertEqual(response.status_code, status.HTTP_200_OK)
             self.assertEqual(len(response.data), 1)
 
+    def test_repeated_search_is_served_from_cache(self):
+        with requests_mock.Mocker() as m:
+            m.get("http://openlibrary.org/search.json", json={"docs": [{"title": "External Book"}]})
+
+            self.client.get(self.url, {"title": "The  Hobbit"})
+            response = self.client.get(self.url, {"title": "the hobbit "})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data[0]["title"], "External Book")
+            self.assertEqual(m.call_count, 1)
+
+    def test_search_upstream_error(self):
+        with requests_mock.Mocker() as m:
+            m.get("http://openlibrary.org/search.json", status_code=503)
+
+            with self.assertLogs("core.views", level="WARNING"):
+                response = self.client.get(self.url, {"title": "Test"})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data, [])
+
     def test_permission_denied_for_unauthenticated_user(self):
         self.client.logout()
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+class BookSearchAsyncViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.url = reverse("book-search-async")
+        caches["openlibrary"].clear()
+
+    def test_search_with_title(self):
+        self.client.cookies["access_token"] = str(RefreshToken.for_user(self.user).access_token)
+        with requests_mock.Mocker() as m:
+            m.get("http://openlibrary.org/search.json", json={"docs": [{"title": "External Book"}]})
+
+            response = self.client.get(self.url, {"title": "Test"})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.json()[0]["title"], "External Book")
+
+    def test_permission_denied_for_unauthenticated_user(self):
+        response = self.client.get(self.url, {"title": "Test"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.cookies["access_token"] = "invalid_token"
+        response = self.client.get(self.url, {"title": "Test"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class BookSearchBatchViewTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("book-search-batch")
+        caches["openlibrary"].clear()
+        self.book = Book.objects.create(user=self.user, title="Dune", author="Frank Herbert", isbn="0-441-01359-7")
+
+    def resolve(self, isbns):
+        response = self.client.post(self.url, {"isbns": isbns}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        return [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+
+    def test_resolve_batch(self):
+        with requests_mock.Mocker() as m:
+            m.get(
+                "http://openlibrary.org/search.json?isbn=9780261102958",
+                json={"docs": [{"title": "The Hobbit", "author_name": ["J.R.R. Tolkien"]}]},
+            )
+            m.get("http://openlibrary.org/search.json?isbn=9780441013593", json={"docs": [{"title": "Dune"}]})
+            m.get("http://openlibrary.org/search.json?isbn=9780000000002", json={"docs": []})
+            lines = self.resolve(["9780441013593", "0441013597", "978-0-261-10295-8", "9780000000002", "junk"])
+
+        self.assertEqual(len(lines), 4)  # Both forms of the Dune ISBN are resolved once.
+        by_isbn = {line["isbn"]: line for line in lines}
+        self.assertEqual(lines[0], {"isbn": "junk", "status": "invalid", "book": None, "in_library": False, "library_book": None})
+        self.assertEqual(by_isbn["9780441013593"]["status"], "found")
+        self.assertTrue(by_isbn["9780441013593"]["in_library"])
+        self.assertEqual(by_isbn["9780441013593"]["library_book"], self.book.id)
+        self.assertEqual(by_isbn["9780261102958"]["book"]["title"], "The Hobbit")
+        self.assertFalse(by_isbn["9780261102958"]["in_library"])
+        self.assertEqual(by_isbn["9780000000002"]["status"], "not_found")
+
+    def test_cached_isbns_are_not_searched_again(self):
+        with requests_mock.Mocker() as m:
+            m.get("http://openlibrary.org/search.json", json={"docs": [{"title": "Dune"}]})
+            self.resolve(["9780441013593"])
+            lines = self.resolve(["9780441013593"])
+            self.assertEqual(m.call_count, 1)
+        self.assertEqual(lines[0]["book"]["title"], "Dune")
+
+    def test_upstream_errors_are_reported_per_isbn(self):
+        with requests_mock.Mocker() as m:
+            m.get("http://openlibrary.org/search.json", status_code=503)
+            with self.assertLogs("core.views", level="WARNING"):
+                lines = self.resolve(["9780441013593"])
+        self.assertEqual(lines[0]["status"], "error")
+
+    async def test_lines_are_streamed_under_asgi(self):
+        # Django would collect a synchronous body into a list first, so ASGI requests get an async one.
+        self.async_client.cookies["access_token"] = str(RefreshToken.for_user(self.user).access_token)
+        with requests_mock.Mocker() as m:
+            m.get("http://openlibrary.org/search.json", json={"docs": [{"title": "Dune"}]})
+            response = await self.async_client.post(self.url, {"isbns": ["9780441013593", "junk"]}, content_type="application/json")
+            self.assertTrue(response.is_async)
+            lines = [json.loads(line) async for line in response.streaming_content]
+        self.assertEqual([line["status"] for line in lines], ["invalid", "found"])
+
+    def test_invalid_requests(self):
+        for data in ({}, {"isbns": []}, {"isbns": "9780441013593"}, {"isbns": ["9780441013593"] * 501}):
+            response = self.client.post(self.url, data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_permission_denied_for_unauthenticated_user(self):
+        self.client.logout()
+        response = self.client.post(self.url, {"isbns": ["9780441013593"]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
 class FollowUserViewTests(APITestCase):
 
     def setUp(self):
@@ -401,8 +517,8 @@ class ReadingProgressListViewTests(APITestCase):
     def test_list_reading_progress(self):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)  # user1 can see their own progress
-        self.assertEqual(response.data[0]["book"]["id"], self.book1.id)
+        self.assertEqual(len(response.data["results"]), 1)  # user1 can see their own progress
+        self.assertEqual(response.data["results"][0]["book"]["id"], self.book1.id)
 
     def test_create_reading_progress(self):
         data = {
@@ -423,7 +539,7 @@ class ReadingProgressListViewTests(APITestCase):
     def test_filter_reading_progress_by_status(self):
         response = self.client.get(self.url, {"status": "W"})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 0)  # user1 has no 'Want to Read' progress
+        self.assertEqual(len(response.data["results"]), 0)  # user1 has no 'Want to Read' progress
 
     def test_permission_denied_for_unauthenticated_user(self):
         self.client.logout()
@@ -517,9 +633,9 @@ class ReviewListViewTests(APITestCase):
     def test_list_reviews(self):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["book"]["id"], self.book1.id)
-        self.assertEqual(response.data[0]["text"], "This is a test review.")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["book"]["id"], self.book1.id)
+        self.assertEqual(response.data["results"][0]["text"], "This is a test review.")
 
     def test_create_review(self):
         data = {
@@ -636,9 +752,9 @@ class CommentListViewTests(APITestCase):
     def test_list_comments(self):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)  # user1 can see their own comment
-        self.assertEqual(response.data[0]["review"], self.review1.id)
-        self.assertEqual(response.data[0]["text"], "This is a test comment.")
+        self.assertEqual(len(response.data["results"]), 1)  # user1 can see their own comment
+        self.assertEqual(response.data["results"][0]["review"], self.review1.id)
+        self.assertEqual(response.data["results"][0]["text"], "This is a test comment.")
 
     def test_create_comment(self):
         data = {
@@ -775,6 +891,32 @@ class ImageAssetViewTests(APITestCase):
         response = self.client.post(self.url, data, format="multipart")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_list_only_own_image_assets(self):
+        other = User.objects.create_user(username="other", password="password")
+        other_book = Book.objects.create(user=other, isbn="9780000000002", title="Other Book")
+        other_image = ImageAsset.objects.create(
+            book=other_book, file=SimpleUploadedFile("image.jpg", b"file_content", content_type="image/jpeg")
+        )
+        own_image = ImageAsset.objects.create(
+            book=self.book, file=SimpleUploadedFile("image.jpg", b"file_content", content_type="image/jpeg")
+        )
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [item["id"] for item in response.data["results"]]
+        self.assertEqual(ids, [own_image.id])  # The other user's image is left out.
+        self.assertNotIn(other_image.id, ids)
+
+    def test_image_assets_require_authentication(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        image_file = SimpleUploadedFile(
+            "image.jpg", b"file_content", content_type="image/jpeg"
+        )
+        response = self.client.post(self.url, {"file": image_file, "book": self.book.id}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(ImageAsset.objects.count(), 0)
+
 
 class TestCookieTokenObtainPairView(APITestCase):
     def setUp(self):
@@ -0,0 +1,116 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core import writequeue
+from core.models import Following, Shelf
+from core.writequeue import WriteQueue, _Write
+
+
+class WriteQueueTest(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="testpass")
+        self.queue = WriteQueue(config={"ENABLED": True, "MAX_BATCH": 16, "MAX_DELAY": 0.05})
+        self.addCleanup(self.queue.close)
+
+    def create_shelf(self, title):
+        return Shelf.objects.create(user=self.user, title=title)
+
+    def test_writes_from_many_threads_are_committed_in_batches(self):
+        results = {}
+
+        def write(i):
+            results[i] = self.queue.run(self.create_shelf, f"Shelf {i}")
+
+        threads = [threading.Thread(target=write, args=(i,)) for i in range(32)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(Shelf.objects.count(), 32)
+        self.assertEqual({shelf.title for shelf in results.values()}, {f"Shelf {i}" for i in range(32)})
+        self.assertEqual(self.queue.writes, 32)
+        self.assertLess(self.queue.batches, 32)
+
+    def test_failures_are_raised_to_their_caller_only(self):
+        def fail():
+            self.create_shelf("Rolled back")
+            Shelf.objects.create(user_id=self.user.pk + 1000, title="No such user")
+
+        errors = []
+
+        def write(func, *args):
+            try:
+                self.queue.run(func, *args)
+            except IntegrityError as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=write, args=(self.create_shelf, "Kept"))]
+        threads.append(threading.Thread(target=write, args=(fail,)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(list(Shelf.objects.values_list("title", flat=True)), ["Kept"])
+
+    def test_writes_are_retried_once_after_a_failed_commit(self):
+        calls = []
+
+        def write(title):
+            calls.append(title)
+            return self.create_shelf(title)
+
+        def fail_in_savepoint():
+            calls.append("Failed")
+            self.create_shelf("Discarded")
+            raise ValueError("Invalid")
+
+        def fail_at_commit():
+            calls.append("Orphan")
+            Shelf.objects.create(user_id=self.user.pk + 1000, title="No such user")
+
+        batch = [_Write(write, ("A",), {}), _Write(fail_in_savepoint, (), {}), _Write(fail_at_commit, (), {})]
+        batch.append(_Write(write, ("B",), {}))
+        with self.assertLogs("core.writequeue", "WARNING"):
+            self.queue._commit(batch)
+
+        # The write that failed in its savepoint is not run again; the others are retried once each.
+        self.assertEqual(calls, ["A", "Failed", "Orphan", "B", "A", "Orphan", "B"])
+        self.assertEqual(sorted(Shelf.objects.values_list("title", flat=True)), ["A", "B"])
+        self.assertEqual(batch[0].future.result().title, "A")
+        self.assertIsInstance(batch[1].future.exception(), ValueError)
+        self.assertIsInstance(batch[2].future.exception(), IntegrityError)
+        self.assertEqual(batch[3].future.result().title, "B")
+
+    def test_writes_inside_a_transaction_run_inline(self):
+        with transaction.atomic():
+            self.queue.run(self.create_shelf, "Inline")
+        self.assertIsNone(self.queue._thread)
+        self.assertEqual(self.queue.writes, 0)
+
+    def test_follow_endpoint_uses_the_queue(self):
+        User.objects.create_user(username="author", password="testpass")
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        with mock.patch.object(writequeue, "write_queue", self.queue):
+            response = client.post(reverse("user-follow", args=["author"]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.queue.writes, 1)
+        self.assertTrue(Following.objects.filter(user=self.user, followed_users__username="author").exists())
+
+
+class DisabledWriteQueueTest(TestCase):
+    def test_disabled_queue_runs_writes_inline(self):
+        queue = WriteQueue(config={"ENABLED": False})
+        user = User.objects.create_user(username="reader", password="testpass")
+        shelf = queue.run(Shelf.objects.create, user=user, title="Inline")
+        self.assertEqual(Shelf.objects.get().pk, shelf.pk)
+        self.assertIsNone(queue._thread)
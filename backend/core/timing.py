@@ -0,0 +1,190 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack, nullcontext
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+# Default instrumentation configuration, overridable through settings.SERVER_TIMING.
+DEFAULT_SERVER_TIMING_SETTINGS = {
+    "SAMPLE_RATE": 0.01,  # Share of requests that are measured; the others only pay for one random number.
+    "HEADER": False,  # Send the measurements as a Server-Timing header (shown in the browser's network tab).
+    "LOG": True,  # Log one JSON line per measured request.
+}
+
+_current_timer = ContextVar("request_timer", default=None)
+
+
+# Accumulates the time spent in each phase of one request, and the number and time of its database queries.
+# Phases may overlap (queries run while serializing), and a phase entered again inside itself counts once.
+# Counters (e.g. cache hits) are added to the logged line.
+class RequestTimer:
+    def __init__(self):
+        self.durations = {}  # Seconds by phase name.
+        self.counters = {}
+        self.active = set()
+        self.queries = 0
+
+    def add(self, name, seconds):
+        self.durations[name] = self.durations.get(name, 0) + seconds
+
+    def __call__(self, execute, sql, params, many, context):
+        # Database execute wrapper (see connection.execute_wrapper()).
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.add("db", time.perf_counter() - start)
+
+    def header(self, total):
+        metrics = []
+        for name, seconds in self.durations.items():
+            description = f';desc="{self.queries} queries"' if name == "db" else ""
+            metrics.append(f"{name};dur={seconds * 1000:.1f}{description}")
+        metrics.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+class _Phase:
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.timer.active.add(self.name)
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.timer.add(self.name, time.perf_counter() - self.start)
+        self.timer.active.discard(self.name)
+
+
+def phase(name):
+    # Measure a block as the named phase of the current request; does nothing for requests that are not sampled.
+    timer = _current_timer.get()
+    if timer is None or name in timer.active:
+        return nullcontext()
+    return _Phase(timer, name)
+
+
+def count(name, amount=1):
+    # Add to a counter of the current request; does nothing for requests that are not sampled.
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.counters[name] = timer.counters.get(name, 0) + amount
+
+
+# Measures a sample of requests: total time, time per phase (auth, serialize, render, openlibrary, ...) and
+# database queries. Installed first in MIDDLEWARE so the total covers the other middleware. The body of a
+# streaming response is produced after the headers went out, so its queries are not included. Like Django's own
+# middleware it runs synchronously under WSGI and asynchronously under ASGI, without a thread switch per request.
+class ServerTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response, config=None):
+        self.get_response = get_response
+        self.config = {**DEFAULT_SERVER_TIMING_SETTINGS, **getattr(settings, "SERVER_TIMING", {}), **(config or {})}
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= self.config["SAMPLE_RATE"]:
+            return self.get_response(request)
+
+        timer = RequestTimer()
+        token = _current_timer.set(timer)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                self.wrap_queries(stack, timer)
+                response = self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        return self.finish(request, response, timer, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if random.random() >= self.config["SAMPLE_RATE"]:
+            return await self.get_response(request)
+
+        timer = RequestTimer()
+        token = _current_timer.set(timer)
+        start = time.perf_counter()
+        try:
+            # Database connections belong to a thread, and the sync views and ORM calls of an ASGI request run in
+            # its sync thread; the execute wrappers are installed on (and removed from) the connections there.
+            stack = ExitStack()
+            await sync_to_async(self.wrap_queries)(stack, timer)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            _current_timer.reset(token)
+        return self.finish(request, response, timer, time.perf_counter() - start)
+
+    def wrap_queries(self, stack, timer):
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(timer))
+
+    def finish(self, request, response, timer, total):
+        if self.config["HEADER"]:
+            response["Server-Timing"] = timer.header(total)
+        if self.config["LOG"]:
+            self.log(request, response, timer, total)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returned; time the rendering as its own phase.
+        timer = _current_timer.get()
+        if timer is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                timer.add("render", time.perf_counter() - start)
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def log(self, request, response, timer, total):
+        view = getattr(request, "resolver_match", None)
+        logger.info(json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "view": view.view_name if view else None,
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 2),
+            "phases_ms": {name: round(seconds * 1000, 2) for name, seconds in timer.durations.items()},
+            "queries": timer.queries,
+            "counters": timer.counters,
+        }))
+
+
+# Times reading .data of a serializer, or of a list of them, as the "serialize" phase of sampled requests.
+# Nested serializers run inside their parent's phase.
+class TimedSerializerMixin:
+    @property
+    def data(self):
+        with phase("serialize"):
+            return super().data
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        serializer = super().many_init(*args, **kwargs)
+        if type(serializer) is serializers.ListSerializer:
+            serializer.__class__ = TimedListSerializer
+        return serializer
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
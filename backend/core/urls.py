@@ -7,7 +7,10 @@ from .views import (
     BookDetailView,
     CommentDetailView,
     CommentListView,
+    ImageAssetDetailView,
     ImageAssetListCreateView,
+    ImportJobDetailView,
+    ImportJobListCreateView,
     ReadingProgressDetailView,
     ReadingProgressListView,
     ReviewDetailView,
@@ -16,7 +19,12 @@ from .views import (
     UserListView,
     ReviewListView,
     book_search,
+    book_search_async,
+    book_search_batch,
     follow_user,
+    reading_history,
+    reading_stats,
+    library_export,
     get_username,
     register_user,
 )
@@ -26,12 +34,17 @@ urlpatterns = [
     path("signup/", register_user, name="register_user"),
     path("books/", BookListView.as_view(), name="book-list-create"),
     path("books/<int:pk>/", BookDetailView.as_view(), name="book-detail"),
+    path("books/<int:pk>/history/", reading_history, name="reading-history"),
     path("books/search/", book_search, name="book-search"),
+    path("books/search/async/", book_search_async, name="book-search-async"),
+    path("books/search/batch/", book_search_batch, name="book-search-batch"),
     path("shelves/", ShelfListView.as_view(), name="shelf-list-create"),
     path("shelves/<int:pk>/", ShelfDetailView.as_view(), name="shelf-detail"),
     path("users/", UserListView.as_view(), name="user-list"),
     path("user/",get_username, name="user-name" ),
     path("users/follow/<str:username>/", follow_user, name="user-follow"),
+    path("stats/", reading_stats, name="reading-stats"),
+    path("export/<str:file_format>/", library_export, name="library-export"),
     path("reading/", ReadingProgressListView.as_view(), name="reading-list-create"),
     path(
         "reading/<int:pk>/", ReadingProgressDetailView.as_view(), name="reading-detail"
@@ -49,5 +62,8 @@ urlpatterns = [
         name="comment-detail",
     ),
     path("upload/", ImageAssetListCreateView.as_view(), name="upload"),
-    path('activities/', ActivityListView.as_view(), name='activity-list')
+    path("upload/<int:pk>/", ImageAssetDetailView.as_view(), name="upload-detail"),
+    path('activities/', ActivityListView.as_view(), name='activity-list'),
+    path("imports/", ImportJobListCreateView.as_view(), name="import-list-create"),
+    path("imports/<int:pk>/", ImportJobDetailView.as_view(), name="import-detail"),
 ]
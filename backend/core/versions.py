@@ -0,0 +1,73 @@
+import hashlib
+
+from django.db.models import F
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from .models import Book, LibraryVersion, Shelf
+
+
+def owner_id(instance):
+    # Books and shelves have an owner; reading progress, reviews, comments and images belong to their book's
+    # owner, comments posted without a book to their review's book's owner, and shelf images to the shelf's owner.
+    if not hasattr(instance, "book_id"):
+        return instance.user_id
+    if instance.book_id is None:
+        if getattr(instance, "shelf_id", None) is not None:
+            return Shelf.objects.filter(pk=instance.shelf_id).values_list("user_id", flat=True).first()
+        if getattr(instance, "review_id", None) is not None:
+            return Book.objects.filter(review__id=instance.review_id).values_list("user_id", flat=True).first()
+        return None
+    if instance._meta.get_field("book").is_cached(instance):
+        return instance.book.user_id if instance.book else None
+    return Book.objects.filter(pk=instance.book_id).values_list("user_id", flat=True).first()
+
+
+def bump_library(user_id):
+    # Users without a version row (e.g. created by bulk_create) are never sent an ETag, so they need no bump.
+    LibraryVersion.objects.filter(user_id=user_id).update(library=F("library") + 1)
+
+
+def bump_feeds(user_ids):
+    LibraryVersion.objects.filter(user_id__in=user_ids).update(feed=F("feed") + 1)
+
+
+def bump_follower_feeds(user_id):
+    # Feeds show the followed user's books, so changing or deleting them changes their followers' feeds.
+    LibraryVersion.objects.filter(user__following__followed_users=user_id).update(feed=F("feed") + 1)
+
+
+def library_version(user):
+    return LibraryVersion.objects.filter(user=user).values_list("library", flat=True).first()
+
+
+def feed_version(user):
+    return LibraryVersion.objects.filter(user=user).values_list("feed", flat=True).first()
+
+
+def make_etag(request, version):
+    # The same version, viewer, URL and media type always render the same bytes, so the ETag is strong.
+    key = f"{request.get_full_path()}|{request.user.pk}|{getattr(request, 'accepted_media_type', '')}|{version}"
+    return '"{}"'.format(hashlib.sha256(key.encode()).hexdigest()[:32])
+
+
+# Answers GET requests with 304 Not Modified when If-None-Match carries the current ETag, before any
+# queryset is evaluated or serializer runs. Views implement get_version(), returning None to skip ETags.
+class ConditionalGetMixin:
+    def get_version(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        version = self.get_version()
+        if version is None:
+            return super().get(request, *args, **kwargs)
+
+        etag = make_etag(request, version)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:  # Errors are no representation of the resource to revalidate.
+                return response
+        response["ETag"] = etag
+        # Responses are per user; browsers keep them but revalidate with If-None-Match on every use.
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
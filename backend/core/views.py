@@ -1,36 +1,71 @@
+import json
 import logging
-import requests
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import User
-from django.db.models import Q
-from django.http import JsonResponse
+from django.db import transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import F, Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import AuthenticationFailed, NotFound, ValidationError
 from rest_framework.generics import (CreateAPIView, DestroyAPIView,
                                      ListAPIView, RetrieveAPIView,
                                      UpdateAPIView)
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
+from . import exports, feed, history, jobs, stats
+from .auth import JWTAuthenticationFromCookie
+from .fieldsets import SparseFieldsViewMixin
 from .models import (Activity, Book, Comment, Following, ImageAsset,
-                     ReadingProgress, Review, Shelf)
-from .serializers import (ActivitySerializer, BookSerializer,
+                     ImportJob, ProgressRollup, ReadingProgress, Review, Shelf, only_selected)
+from .images import pipeline
+from .imports import start_import
+from .isbn import normalize_isbn
+from .openlibrary import OpenLibraryError, asearch_books, batch_resolver, resolve_isbns, search_books
+from .pagination import KeysetPagination
+from .versions import ConditionalGetMixin, feed_version, library_version
+from .writequeue import run_write
+from .serializers import (ActivitySerializer, BookSerializer, BookSerializerPlain,
                           CommentSerializer, ImageAssetSerializer,
+                          ImportJobSerializer,
                           ReadingProgressSerializer, ReviewSerializer,
                           ShelfSerializer, UserListSerializer, UserSerializer)
 
 logger = logging.getLogger(__name__)
-OPEN_LIBRARY_SEARCH_URL = "http://openlibrary.org/search.json"
+
+
+# The select_related() lookup for a book nested as BookSerializerPlain: its owner is joined only when shown.
+def book_lookup(selection):
+    if selection is None or (selection.expands("book") and selection.nested("book").includes("user")):
+        return "book__user"
+    return "book"
+
+
+# The columns of a book nested as BookSerializerPlain that a selection shows, for only() on the nesting model.
+def book_columns(selection):
+    book = selection.nested("book")
+    columns = [f"book__{name}" for name in BookSerializerPlain.Meta.fields if book.includes(name)]
+    if book.includes("user"):
+        columns.append("book__user__username")
+    return columns
 
 
 # View for listing and creating shelves for the authenticated user.
-class ShelfListView(ListAPIView, CreateAPIView):
+class ShelfListView(SparseFieldsViewMixin, ConditionalGetMixin, ListAPIView, CreateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = ShelfSerializer
 
+    def get_version(self):
+        return library_version(self.request.user)  # Shelves change with any write to the user's library.
+
     def get_queryset(self):
-        return Shelf.objects.for_user(user=self.request.user)  # Fetch shelves for the authenticated user.
+        # Fetch shelves for the authenticated user.
+        return Shelf.objects.for_user(user=self.request.user).with_books(self.get_selection())
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -40,6 +75,8 @@ class ShelfListView(ListAPIView, CreateAPIView):
 
 # View for retrieving, updating, and deleting a specific shelf for the authenticated user.
 class ShelfDetailView(
+    SparseFieldsViewMixin,
+    ConditionalGetMixin,
     RetrieveAPIView,
     UpdateAPIView,
     DestroyAPIView,
@@ -47,8 +84,12 @@ class ShelfDetailView(
     permission_classes = [IsAuthenticated]
     serializer_class = ShelfSerializer
 
+    def get_version(self):
+        return library_version(self.request.user)
+
     def get_queryset(self):
-        return Shelf.objects.for_user(user=self.request.user)  # Fetch the shelf for the authenticated user.
+        # Fetch the shelf for the authenticated user.
+        return Shelf.objects.for_user(user=self.request.user).with_books(self.get_selection())
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -57,22 +98,28 @@ class ShelfDetailView(
 
 
 # View for listing and creating books for the authenticated user, with search and filter options.
-class BookListView(ListAPIView, CreateAPIView):
+class BookListView(SparseFieldsViewMixin, ConditionalGetMixin, ListAPIView, CreateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = BookSerializer
+    keyset_ordering = ("id",)
+
+    def get_version(self):
+        return library_version(self.request.user)
 
     def get_queryset(self):
         books = Book.objects.for_user(user=self.request.user)  # Fetch books for the authenticated user.
 
         search_str = self.request.query_params.get("search", None)
         if search_str:
-            books = books.search_local(search_str)  # Search for books by ISBN, title, or author.
+            books = books.search_local(search_str, user=self.request.user)  # Search for books by ISBN, title, or author.
+            # Page through ranked results in rank order; backends that rank order by (rank, id).
+            self.keyset_ordering = books.query.order_by or self.keyset_ordering
 
         shelf = self.request.query_params.get("shelf", None)
         if shelf:
             books = books.get_books_by_shelf(shelf)  # Filter books by shelf.
 
-        return books
+        return books.with_related(self.get_selection())  # Load related objects up front to avoid per-book queries.
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -85,6 +132,8 @@ class BookListView(ListAPIView, CreateAPIView):
 
 # View for retrieving, updating, and deleting a specific book, including filtering by shared status.
 class BookDetailView(
+    SparseFieldsViewMixin,
+    ConditionalGetMixin,
     RetrieveAPIView,
     UpdateAPIView,
     DestroyAPIView,
@@ -92,7 +141,7 @@ class BookDetailView(
     permission_classes = [IsAuthenticated]
     serializer_class = BookSerializer
 
-    def get_queryset(self):
+    def get_visible_books(self):
         # Fetch books either owned by the user or shared by others (review or reading progress).
         return Book.objects.filter(
             Q(user=self.request.user)
@@ -100,6 +149,18 @@ class BookDetailView(
             | Q(reading_progress__shared=True)
         )
 
+    def get_queryset(self):
+        return self.get_visible_books().with_related(self.get_selection())
+
+    def get_version(self):
+        # The book's owner's library version, read in the same lookup that checks the book is visible.
+        return (
+            self.get_visible_books()
+            .filter(pk=self.kwargs["pk"])
+            .values_list("user__library_version__library", flat=True)
+            .first()
+        )
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context.update({"request": self.request})
@@ -113,39 +174,105 @@ def book_search(request):
     title_str = request.query_params.get("title", None)
     isbn_str = request.query_params.get("isbn", None)
 
-    search_results = []
-
     if not title_str and not isbn_str:
-        return Response(search_results, status=status.HTTP_200_OK)
-
-    # Remote search using the Open Library API.
-    remote_params = {"isbn": isbn_str} if isbn_str else {"title": title_str}
-    response = requests.get(OPEN_LIBRARY_SEARCH_URL, params=remote_params)
-
-    if response.status_code == 200:
-        data = response.json()
-        for doc in data.get("docs", []):
-            cover = doc.get("cover_i", None)
-            book_data = {
-                "isbn": isbn_str if isbn_str else doc.get("isbn", [None])[0],
-                "title": doc.get("title"),
-                "author": ", ".join(doc.get("author_name", [])),
-                "total_pages": doc.get("number_of_pages_median", None),
-                "release_year": doc.get("first_publish_year"),
-                "image": (
-                    f"https://covers.openlibrary.org/b/id/{cover}-L.jpg"
-                    if cover
-                    else None
-                ),
-            }
-            search_results.append(book_data)
+        return Response([], status=status.HTTP_200_OK)
+
+    # Remote search using the Open Library API, answered from the result cache when possible.
+    try:
+        search_results = search_books(isbn=isbn_str, title=title_str)
+    except OpenLibraryError:
+        logger.warning("Open Library search failed", exc_info=True)
+        search_results = []
 
     return Response(search_results, status=status.HTTP_200_OK)
 
 
+# The body of a StreamingHttpResponse from an iterator of strings. Under ASGI, Django reads a synchronous iterator
+# to its end before sending anything, so there the items are read one at a time by an async iterator instead.
+def streaming_body(request, items):
+    if isinstance(getattr(request, "_request", request), ASGIRequest):
+        return _read_in_sync_thread(items)
+    return items
+
+
+async def _read_in_sync_thread(items):
+    # Reads the next item in the sync thread, where database queries and blocking calls may run.
+    read = sync_to_async(next)
+    while (item := await read(items, None)) is not None:
+        yield item
+
+
+# Async variant of book_search for ASGI deployments, so waiting on Open Library does not block a worker.
+async def book_search_async(request):
+    if request.method != "GET":
+        return JsonResponse({"detail": f'Method "{request.method}" not allowed.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    # DRF views do not run async, so authenticate with the same cookie-based JWT authentication by hand.
+    try:
+        auth = await sync_to_async(JWTAuthenticationFromCookie().authenticate)(Request(request))
+    except AuthenticationFailed:
+        auth = None
+    if auth is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."}, status=status.HTTP_401_UNAUTHORIZED
+        )
+
+    try:
+        search_results = await asearch_books(isbn=request.GET.get("isbn"), title=request.GET.get("title"))
+    except OpenLibraryError:
+        logger.warning("Open Library search failed", exc_info=True)
+        search_results = []
+
+    return JsonResponse(search_results, safe=False)
+
+
+# API view resolving a batch of scanned ISBNs at once. Results are streamed back as JSON Lines, one line
+# per distinct ISBN as soon as it is resolved, each saying whether the book is already in the user's library.
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def book_search_batch(request):
+    isbns = request.data.get("isbns") if isinstance(request.data, dict) else None
+    if not isinstance(isbns, list) or not isbns:
+        raise ValidationError({"isbns": "A non-empty list of ISBNs is required."})
+    max_isbns = batch_resolver.config["MAX_ISBNS"]
+    if len(isbns) > max_isbns:
+        raise ValidationError({"isbns": f"At most {max_isbns} ISBNs can be resolved at once."})
+
+    invalid = [isbn for isbn in isbns if normalize_isbn(isbn) is None]
+    normalized = list(dict.fromkeys(filter(None, map(normalize_isbn, isbns))))  # Distinct, in scanning order.
+
+    # The user's books by normalized ISBN, since stored ISBNs may be ISBN-10s or contain separators.
+    library = {}
+    for book_id, isbn in Book.objects.filter(user=request.user).values_list("id", "isbn").iterator():
+        library.setdefault(normalize_isbn(isbn), book_id)
+    library.pop(None, None)
+
+    def lines():
+        for isbn in invalid:
+            yield {"isbn": isbn, "status": "invalid", "book": None, "in_library": False, "library_book": None}
+        for isbn, results, error in resolve_isbns(normalized):
+            if error is not None:
+                logger.warning("Open Library search for ISBN %s failed: %s", isbn, error)
+            yield {
+                "isbn": isbn,
+                "status": "error" if error is not None else "found" if results else "not_found",
+                "book": results[0] if results else None,
+                "in_library": isbn in library,
+                "library_book": library.get(isbn),
+            }
+
+    response = StreamingHttpResponse(
+        streaming_body(request, (json.dumps(line) + "\n" for line in lines())), content_type="application/x-ndjson"
+    )
+    response["X-Accel-Buffering"] = "no"  # Let nginx pass each line through as it is written.
+    return response
+
+
 # View to get a list of users based on different relationships (followers, followed).
 class UserListView(APIView):
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ("username", "id")
 
     def get(self, request, *args, **kwargs):
         search_str = self.request.query_params.get("search", None)
@@ -167,24 +294,41 @@ class UserListView(APIView):
         if search_str:
             users = users.filter(username__icontains=search_str)  # Filter users by username.
 
-        serializer = UserListSerializer(users, many=True)
-        return Response(serializer.data)
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(users, request, view=self)
+        serializer = UserListSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 
 # View to list activities for the user's followed users, ordered by timestamp.
-class ActivityListView(ListAPIView):
+class ActivityListView(SparseFieldsViewMixin, ConditionalGetMixin, ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = ActivitySerializer
+    keyset_ordering = ("-feed_timestamp", "-id")
+    page_size = 5
 
-    def get_queryset(self):
-        # Get the users followed by the current user.
-        try:
-            users = Following.objects.get(user=self.request.user).followed_users.all()
-        except Following.DoesNotExist:
-            users = User.objects.none()
+    def get_version(self):
+        return feed_version(self.request.user)
 
-        limit = self.request.query_params.get("limit", 5)
-        return Activity.objects.filter(user__in=users).order_by("-timestamp")[:limit]
+    def get_queryset(self):
+        # Read the user's materialized feed, which is filled when followed users create activities.
+        activities = Activity.objects.filter(feed_entries__owner=self.request.user).annotate(
+            feed_timestamp=F("feed_entries__timestamp")
+        )
+        selection = self.get_selection()
+        related = [book_lookup(selection)] if selection is None or selection.expands("book") else []
+        if selection is None or selection.includes("user"):
+            related.append("user")
+        if related:  # select_related() without arguments would follow every foreign key.
+            activities = activities.select_related(*related)
+        if selection is None:
+            return activities
+        always = ["id"]
+        if selection.includes("user"):
+            always.append("user__username")
+        if selection.expands("book"):
+            always += ["book", *book_columns(selection)]
+        return only_selected(activities, selection, always)
 
 
 # API view for following and unfollowing users.
@@ -201,10 +345,13 @@ def follow_user(request, username):
 
     if request.method == "POST":
         # Add the target user to the current user's followed list.
-        following, _ = Following.objects.get_or_create(user=request.user)
-        following.followed_users.add(target_user)
-        following.save()
+        def follow():
+            following, _ = Following.objects.get_or_create(user=request.user)
+            following.followed_users.add(target_user)
+            following.save()
+            feed.backfill(request.user, target_user)  # Show the followed user's recent activities right away.
 
+        run_write(follow)
         return Response({"message": "User followed successfully"}, status=status.HTTP_200_OK)
 
     else:
@@ -214,8 +361,12 @@ def follow_user(request, username):
         except Following.DoesNotExist:
             return Response({"message": "User unfollowed successfully"}, status=status.HTTP_200_OK)
 
-        following.followed_users.remove(target_user)
-        following.save()
+        def unfollow():
+            following.followed_users.remove(target_user)
+            following.save()
+            feed.remove(request.user, target_user)  # Drop the unfollowed user's activities from the feed.
+
+        run_write(unfollow)
 
         return Response({"message": "User unfollowed successfully"}, status=status.HTTP_200_OK)
 
@@ -224,12 +375,13 @@ def follow_user(request, username):
 class ReadingProgressListView(ListAPIView, CreateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = ReadingProgressSerializer
+    keyset_ordering = ("timestamp", "id")
+    page_size = 5
 
     def get_queryset(self):
         status = self.request.query_params.get("status", None)
         book = self.request.query_params.get("book", None)
         username_filter = self.request.query_params.get("username", None)
-        limit = self.request.query_params.get("limit", 5)
 
         # Filter reading progress by status, book, and username.
         if username_filter:
@@ -245,7 +397,7 @@ class ReadingProgressListView(ListAPIView, CreateAPIView):
         if book:
             reading_progress = reading_progress.filter(book=book)
 
-        return reading_progress.order_by("timestamp")[:limit]
+        return reading_progress.select_related("book__user")
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -253,16 +405,12 @@ class ReadingProgressListView(ListAPIView, CreateAPIView):
         return context
 
     def perform_create(self, serializer):
-        progress = serializer.save()
-
-        # Create a new activity for tracking reading progress.
-        Activity.objects.create(
-            user=self.request.user,
-            book=progress.book,
-            reading_progress=progress,
-            text=f"{self.request.user} started tracking their reading status for {progress.book.title}",
-            backlink=f"/books/{progress.book.id}",
-        )
+        # Queue the activity for tracking reading progress in the same transaction as the progress.
+        def write():
+            progress = serializer.save()
+            jobs.enqueue("feed.reading_progress_activity", user_id=self.request.user.pk, progress_id=progress.pk)
+
+        run_write(write)
 
 
 # View for retrieving, updating, and deleting a specific reading progress entry.
@@ -275,7 +423,7 @@ class ReadingProgressDetailView(
     serializer_class = ReadingProgressSerializer
 
     def get_queryset(self):
-        return ReadingProgress.objects.filter(book__user=self.request.user)
+        return ReadingProgress.objects.filter(book__user=self.request.user).select_related("book__user")
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -283,26 +431,72 @@ class ReadingProgressDetailView(
         return context
 
     def perform_update(self, serializer):
-        progress = serializer.save()
-
-        # Create a new activity for updating reading progress.
-        Activity.objects.create(
-            user=self.request.user,
-            book=progress.book,
-            reading_progress=progress,
-            text=f"{self.request.user} updated their reading status for {progress.book.title}",
-            backlink=f"/books/{progress.book.id}",
-        )
+        # Queue the activity for updating reading progress in the same transaction as the update.
+        def write():
+            progress = serializer.save()
+            jobs.enqueue(
+                "feed.reading_progress_activity", user_id=self.request.user.pk, progress_id=progress.pk, updated=True
+            )
+
+        run_write(write)
+
+
+# API view returning a book's reading history as a series for charting: pages read per day or week, the page
+# reached, the reading velocity and the projected finish date. Followers see it when the progress is shared.
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def reading_history(request, pk):
+    progress = (
+        ReadingProgress.objects.for_user_and_followed(user=request.user).filter(book=pk).select_related("book").first()
+    )
+    if progress is None:
+        raise NotFound()
+
+    period = request.query_params.get("period")
+    periods = {"day": ProgressRollup.PERIOD_DAY, "week": ProgressRollup.PERIOD_WEEK}
+    if period is not None and period not in periods:
+        raise ValidationError({"period": "Must be day or week."})
+    try:
+        days = int(request.query_params.get("days", 0)) or None
+    except ValueError:
+        raise ValidationError({"days": "Must be a number of days."})
+    if days is not None and days < 1:
+        raise ValidationError({"days": "Must be a positive number of days."})
+
+    return Response(history.series(progress.book, days=days, period=periods.get(period)))
+
+
+# API view returning the user's reading statistics, read from counters kept up to date on every write.
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def reading_stats(request):
+    return Response(stats.summary(request.user))
+
+
+# API view streaming the user's whole library as a JSON Lines or CSV download. Lines are written as the
+# books are read, chunk by chunk, so memory use stays the same however large the library is, under WSGI and ASGI.
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def library_export(request, file_format):
+    if file_format not in exports.FORMATS:
+        raise NotFound(f"Unknown export format: {file_format}")
+    exporter = exports.LibraryExporter(request.user)
+    body = streaming_body(request, exporter.chunks(file_format))
+    response = StreamingHttpResponse(body, content_type=exports.FORMATS[file_format])
+    filename = exports.export_filename(request.user, file_format, timezone.localdate())
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
 
 
 # View for listing and creating reviews.
-class ReviewListView(ListAPIView, CreateAPIView):
+class ReviewListView(SparseFieldsViewMixin, ListAPIView, CreateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = ReviewSerializer
+    keyset_ordering = ("date", "id")
+    page_size = 5
 
     def get_queryset(self):
         username_filter = self.request.query_params.get("username", None)
-        limit = self.request.query_params.get("limit", 5)
 
         # Filter reviews by username or get reviews for the current user's followed users.
         if username_filter:
@@ -312,7 +506,16 @@ class ReviewListView(ListAPIView, CreateAPIView):
         else:
             reviews = Review.objects.for_user_and_followed(user=self.request.user)
 
-        return reviews.order_by("date")[:limit]
+        # The book is always read: its version keys the review's cached fragment.
+        selection = self.get_selection()
+        reviews = reviews.select_related(None).select_related(book_lookup(selection))
+        if selection is None:
+            return reviews
+        # Keyset pagination reads the date of the last review on the page.
+        always = ["id", "date", "book", "book__version"]
+        if selection.expands("book"):
+            always += book_columns(selection)
+        return only_selected(reviews, selection, always)
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -320,20 +523,15 @@ class ReviewListView(ListAPIView, CreateAPIView):
         return context
 
     def perform_create(self, serializer):
-        review = serializer.save()
-
-        # Create a new activity for writing a review.
-        Activity.objects.create(
-            user=self.request.user,
-            book=review.book,
-            review=review,
-            text=f"{self.request.user} wrote a review for {review.book.title}",
-            backlink=f"/books/{review.book.id}",
-        )
+        # Queue the activity for writing a review in the same transaction as the review.
+        with transaction.atomic():
+            review = serializer.save()
+            jobs.enqueue("feed.review_activity", user_id=self.request.user.pk, review_id=review.pk)
 
 
 # View for retrieving, updating, and deleting a specific review.
 class ReviewDetailView(
+    SparseFieldsViewMixin,
     RetrieveAPIView,
     UpdateAPIView,
     DestroyAPIView,
@@ -342,7 +540,8 @@ class ReviewDetailView(
     serializer_class = ReviewSerializer
 
     def get_queryset(self):
-        return Review.objects.for_user_and_followed(user=self.request.user)
+        reviews = Review.objects.for_user_and_followed(user=self.request.user)
+        return reviews.select_related(None).select_related(book_lookup(self.get_selection()))
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -357,21 +556,17 @@ class CommentListView(ListAPIView, CreateAPIView):
 
     def get_queryset(self):
         review_id = self.kwargs["review_pk"]
-        return Comment.objects.for_user_and_followed(user=self.request.user).filter(review_id=review_id)
+        return Comment.objects.for_user_and_followed(user=self.request.user).filter(review_id=review_id).select_related("user")
 
     def perform_create(self, serializer):
         review_id = self.kwargs["review_pk"]
-        comment = serializer.save(review_id=review_id, user=self.request.user)
-
-        # Create a new activity for posting a comment.
-        Activity.objects.create(
-            user=self.request.user,
-            book=comment.book,
-            review=comment.review,
-            comment=comment,
-            text=f"{self.request.user} replied to {comment.book.user.username}'s review of {comment.book.title}",
-            backlink=f"/books/{comment.book.id}",
-        )
+
+        # Queue the activity for posting a comment in the same transaction as the comment.
+        def write():
+            comment = serializer.save(review_id=review_id, user=self.request.user)
+            jobs.enqueue("feed.comment_activity", comment_id=comment.pk)
+
+        run_write(write)
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -394,7 +589,7 @@ class CommentDetailView(
     def get_object(self):
         review_id = self.kwargs["review_pk"]
         comment_id = self.kwargs["comment_pk"]
-        return generics.get_object_or_404(Comment, review_id=review_id, id=comment_id)
+        return generics.get_object_or_404(Comment.objects.select_related("user"), review_id=review_id, id=comment_id)
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -451,9 +646,12 @@ def get_username(request):
 
 # View for listing and creating image assets (associated with books or shelves).
 class ImageAssetListCreateView(generics.ListCreateAPIView):
-    queryset = ImageAsset.objects.all()
+    permission_classes = [IsAuthenticated]
     serializer_class = ImageAssetSerializer
 
+    def get_queryset(self):
+        return ImageAsset.objects.for_user(self.request.user)  # Only the images of the user's books and shelves.
+
     def perform_create(self, serializer):
         # Validate that an image is associated with either a book or a shelf.
         book = serializer.validated_data.get("book")
@@ -469,7 +667,9 @@ class ImageAssetListCreateView(generics.ListCreateAPIView):
         if existing_image:
             existing_image.delete()
 
-        serializer.save()
+        with transaction.atomic():
+            asset = serializer.save()
+            pipeline.schedule(asset)  # Queue generating the resized derivatives with the upload.
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -477,3 +677,41 @@ class ImageAssetListCreateView(generics.ListCreateAPIView):
         self.perform_create(serializer)
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+
+# View for retrieving an image asset of the user's books or shelves, e.g. to poll until its derivatives are ready.
+class ImageAssetDetailView(RetrieveAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = ImageAssetSerializer
+
+    def get_queryset(self):
+        return ImageAsset.objects.for_user(self.request.user)
+
+
+# View for listing the user's library imports and starting a new one from an uploaded CSV, Goodreads or JSON Lines file.
+class ImportJobListCreateView(ListAPIView, CreateAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = ImportJobSerializer
+    keyset_ordering = ("-created_at", "-id")
+
+    def get_queryset(self):
+        return ImportJob.objects.filter(user=self.request.user).select_related("user")
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED  # The import runs in the background; poll the job for progress.
+        return response
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            job = serializer.save(user=self.request.user)
+            start_import(job)
+
+
+# View for polling the progress of one of the user's imports.
+class ImportJobDetailView(RetrieveAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = ImportJobSerializer
+
+    def get_queryset(self):
+        return ImportJob.objects.filter(user=self.request.user).select_related("user")
@@ -0,0 +1,142 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# Default write queue configuration, overridable through settings.WRITE_QUEUE.
+DEFAULT_WRITE_QUEUE_SETTINGS = {
+    "ENABLED": False,  # Off: writes run in the calling thread as before.
+    "MAX_BATCH": 64,  # Writes committed together in one transaction.
+    "MAX_DELAY": 0,  # Seconds the writer waits for more writes; 0 commits what queued up during the last commit.
+}
+
+
+class _Write:
+    def __init__(self, func, args, kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+
+
+# Funnels write transactions from every thread of the process through one writer thread and connection.
+# The writer runs the queued writes back to back, each in its own savepoint, and commits them together
+# (group commit), so SQLite sees one writer and one commit per batch instead of competing for the lock.
+class WriteQueue:
+    def __init__(self, config=None, using=DEFAULT_DB_ALIAS):
+        self.config = {**DEFAULT_WRITE_QUEUE_SETTINGS, **getattr(settings, "WRITE_QUEUE", {}), **(config or {})}
+        self.using = using
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+
+    @property
+    def enabled(self):
+        return self.config["ENABLED"]
+
+    def run(self, func, *args, **kwargs):
+        # Run func(*args, **kwargs) in a transaction and return its result or raise its exception. Writes
+        # inside an open transaction or on the writer thread itself run inline to keep their atomicity.
+        if (
+            not self.enabled
+            or connections[self.using].in_atomic_block
+            or threading.current_thread() is self._thread
+        ):
+            with transaction.atomic(using=self.using):
+                return func(*args, **kwargs)
+
+        write = _Write(func, args, kwargs)
+        self._ensure_writer()
+        self._queue.put(write)
+        return write.future.result()
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="write-queue", daemon=True)
+                self._thread.start()
+
+    def close(self):
+        # Stop the writer thread once the writes queued so far are committed.
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def _loop(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.config["MAX_DELAY"]
+            while len(batch) < self.config["MAX_BATCH"]:
+                try:
+                    timeout = deadline - time.monotonic()
+                    batch.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = None in batch
+            batch = [write for write in batch if write is not None]
+            if batch:
+                self._commit(batch)
+        connections[self.using].close()
+
+    def _commit(self, batch):
+        close_old_connections()  # Replace the writer's connection if it broke.
+        outcomes = []
+        try:
+            self._run_batch(batch, outcomes)
+        except Exception as error:
+            if len(batch) == 1:
+                outcomes = [(batch[0], None, error)]
+            else:
+                # The commit failed, e.g. on a foreign key that SQLite only checks at commit time, so none of the
+                # writes happened. Writes that failed in their savepoint keep their error and are not run again;
+                # the others run again one transaction each, so only the offending write fails.
+                logger.warning("Committing a batch of %s writes failed, committing them one by one", len(batch))
+                failed = [outcome for outcome in outcomes if outcome[2] is not None]
+                retried = [write for write, _, error in outcomes if error is None] + batch[len(outcomes):]
+                outcomes = failed
+                for write in retried:
+                    outcome = []
+                    try:
+                        self._run_batch([write], outcome)
+                    except Exception as error:
+                        outcome = [(write, None, error)]
+                    outcomes.extend(outcome)
+
+        with self._lock:
+            self.batches += 1
+            self.writes += len(batch)
+        for write, result, error in outcomes:
+            if error is None:
+                write.future.set_result(result)
+            else:
+                write.future.set_exception(error)
+
+    def _run_batch(self, batch, outcomes):
+        # Run the writes in one transaction, each in its own savepoint so a failing write only rolls back itself.
+        # Outcomes are appended as the writes run, so they are known even when the commit fails.
+        with transaction.atomic(using=self.using):
+            for write in batch:
+                try:
+                    with transaction.atomic(using=self.using):
+                        outcomes.append((write, write.func(*write.args, **write.kwargs), None))
+                except Exception as error:
+                    outcomes.append((write, None, error))
+
+
+write_queue = WriteQueue()
+
+
+def run_write(func, *args, **kwargs):
+    # Run a write transaction, through the process's single writer when settings.WRITE_QUEUE is enabled.
+    return write_queue.run(func, *args, **kwargs)
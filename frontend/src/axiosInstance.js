@@ -28,4 +28,16 @@ instance.interceptors.response.use(
   }
 );
 
+// List endpoints return one page at a time ({ next, results }); follow the
+// `next` links to collect every item of a list.
+export async function fetchAllPages(url, config) {
+  let response = await instance.get(url, config);
+  const results = [...response.data.results];
+  while (response.data.next) {
+    response = await instance.get(response.data.next);
+    results.push(...response.data.results);
+  }
+  return results;
+}
+
 export default instance;
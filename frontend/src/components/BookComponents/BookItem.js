@@ -61,7 +61,7 @@ function BookItem() {
 			{/* Left side: Book image */}
 			<div className='s12 m6 l5'>
 				<article className='no-padding'>
-					<ImageWithLoading src={book.image} alt={book.title} height={'large-height'} />  {/* Book cover image */}
+					<ImageWithLoading src={book.image_derivatives?.full || book.image} alt={book.title} height={'large-height'} />  {/* Book cover image */}
 				</article>
 			</div>
 			
@@ -55,7 +55,7 @@ const BookList = ({ shelfId, readingListStatus }) => {
 					<Link to={`/books/${book.id}`}>
 						<article className='no-padding'>
 							{/* Display the book's image with a loading state */}
-							<ImageWithLoading src={book.image} alt={book.title}/>
+							<ImageWithLoading src={book.image_derivatives?.card || book.image} alt={book.title}/>
 							<div className='padding'>
 								<h5>{book.title}</h5>  {/* Display the book's title */}
 								<p>{book.author}</p>  {/* Display the book's author */}
@@ -55,7 +55,7 @@ function ShelfItem() {
       <div className='grid no-space'>
         <div className='s6'>
           {/* Display the shelf's image */}
-          <img src={shelf.image} alt={shelf.title} className='responsive large-height' />
+          <img src={shelf.image_derivatives?.full || shelf.image} alt={shelf.title} className='responsive large-height' />
         </div>
 
         <div className='s6'>
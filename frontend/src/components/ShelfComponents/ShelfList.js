@@ -20,7 +20,7 @@ function ShelfList({ shelves }) {
 						<Link to={`${shelf.id}`}>
 							<article key={shelf.id} className='no-padding'>
 								<div className='responsive medium-height'>
-									<img src={shelf.image} alt={shelf.title} className='responsive' />
+									<img src={shelf.image_derivatives?.card || shelf.image} alt={shelf.title} className='responsive' />
 								</div>
 								<div className='padding' >
 									<h5>{shelf.title}</h5>
@@ -19,7 +19,7 @@ function Activity() {
             // Fetch activities from the API
             axiosInstance.get(`/activities/`)
                 .then((response) => {
-                    setActivities(response.data);  // Set the fetched activities in state
+                    setActivities(response.data.results);  // Set the fetched activities in state
                     setLoadingActivities(false);  // Stop loading once data is received
                 })
                 .catch((err) => {
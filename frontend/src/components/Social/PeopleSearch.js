@@ -22,7 +22,7 @@ function PeopleSearch() {
             // Make an API call to search for users based on the query parameter
             axiosInstance.get(`/users/`, { params: { search: search } })
                 .then((response) => {
-                    const users = response.data.filter((u) => u.username !== user);  // Filter out the current logged-in user
+                    const users = response.data.results.filter((u) => u.username !== user);  // Filter out the current logged-in user
                     setSearchResults(users);  // Set the search results in the state
                     setLoading(false);  // Stop loading after fetching data
                 })
@@ -16,7 +16,7 @@ function SharedReadingProgress({ username }) {
             // Fetch reading progress from the API for the given username
             axiosInstance.get(`/reading/`, { params: { username: username } })
                 .then((response) => {
-                    setReadingProgresses(response.data);  // Set the fetched reading progress in state
+                    setReadingProgresses(response.data.results);  // Set the fetched reading progress in state
                     setLoadingReadingProgresses(false);  // Stop loading once data is received
                 })
                 .catch((err) => {
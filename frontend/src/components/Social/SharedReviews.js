@@ -16,7 +16,7 @@ function SharedReviews({ username }) {
             // Fetch reviews from the API for the given username
             axiosInstance.get(`/reviews/`, { params: { username: username } })
                 .then((response) => {
-                    setReviews(response.data);  // Set the fetched reviews in state
+                    setReviews(response.data.results);  // Set the fetched reviews in state
                     setLoadingReviews(false);  // Stop loading once data is received
                 })
                 .catch((err) => {
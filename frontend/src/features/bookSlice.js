@@ -1,5 +1,5 @@
 import { createSlice, createAsyncThunk } from '@reduxjs/toolkit';
-import axiosInstance from '../axiosInstance';
+import axiosInstance, { fetchAllPages } from '../axiosInstance';
 import { selectFromObject } from '../utils/misc';
 
 const BOOK_FIELDS = [
@@ -40,8 +40,7 @@ export const fetchBooks = createAsyncThunk(
 	'books/fetchBooks',
 	async (_, { rejectWithValue }) => {
 		try {
-			const response = await axiosInstance.get('books/');
-			return response.data;
+			return await fetchAllPages('books/');
 		} catch (error) {
 			// Check if the error is from Axios and has a response
 			if (error.response) {
@@ -58,12 +57,11 @@ export const fetchBooksForShelf = createAsyncThunk(
 	'books/fetchBooksForShelf',
 	async (shelfId, { rejectWithValue }) => {
 		try {
-			const response = await axiosInstance.get('books/', {
+			return await fetchAllPages('books/', {
 				params: {
 					shelf: shelfId,
 				},
 			});
-			return response.data;
 		} catch (error) {
 			// Check if the error is from Axios
 			if (error.response) {
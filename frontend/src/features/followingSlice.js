@@ -1,16 +1,14 @@
 import { createSlice, createAsyncThunk } from '@reduxjs/toolkit';
-import axiosInstance from '../axiosInstance';
+import axiosInstance, { fetchAllPages } from '../axiosInstance';
 
 
 // Thunk to fetch all followed users
 export const fetchFollowedUsers = createAsyncThunk('following/fetchFollowedUsers', async () => {
-  const response = await axiosInstance.get('users/?relationship=followed');
-  return response.data;
+  return fetchAllPages('users/', { params: { relationship: 'followed' } });
 });
 
 export const fetchFollowers = createAsyncThunk('following/fetchFollowers', async () => {
-  const response = await axiosInstance.get('users/?relationship=followers');
-  return response.data;
+  return fetchAllPages('users/', { params: { relationship: 'followers' } });
 });
 
 // Thunk to follow a user
@@ -1,5 +1,5 @@
 import { createSlice, createAsyncThunk } from '@reduxjs/toolkit';
-import axiosInstance from '../axiosInstance';
+import axiosInstance, { fetchAllPages } from '../axiosInstance';
 
 // Thunk to fetch a single shelf
 export const fetchShelf = createAsyncThunk('shelves/fetchShelf', async (id) => {
@@ -9,8 +9,7 @@ export const fetchShelf = createAsyncThunk('shelves/fetchShelf', async (id) => {
 
 // Thunk to fetch all shelves
 export const fetchShelves = createAsyncThunk('shelves/fetchShelves', async () => {
-  const response = await axiosInstance.get('shelves/');
-  return response.data;
+  return fetchAllPages('shelves/');
 });
 
 // Thunk to create a new shelf